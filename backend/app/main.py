@@ -16,7 +16,7 @@ from contextlib import asynccontextmanager
 # Import our modular components
 from backend.utils.config import get_settings
 from backend.utils.logging_config import setup_logging, get_logger
-from backend.services import AIService, CrisisDetectionService, SessionService
+from backend.services.container import container
 from backend.models import MentalHealthResources
 from backend.app.routes import chat_router, webhook_router, health_router
 
@@ -32,14 +32,13 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting Mazungumzo AI application...")
     
-    # Initialize services
-    app.state.ai_service = AIService()
-    app.state.crisis_service = CrisisDetectionService()
-    app.state.session_service = SessionService()
+    # Initialize services once; routes read them from the same container
+    await container.startup("ai", "crisis", "session_repository", "sessions", "whatsapp", "system_sampler")
+    app.state.services = container
     app.state.resources = MentalHealthResources.get_kenya_resources()
     
     # Health check for AI services
-    ai_healthy = await app.state.ai_service.health_check()
+    ai_healthy = await container.ai.health_check()
     if ai_healthy:
         logger.info("✅ AI services are healthy")
     else:
@@ -51,7 +50,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Shutting down Mazungumzo AI application...")
-    # Cleanup if needed
+    await container.shutdown()
     logger.info("✅ Application shutdown complete")
 
 
@@ -4,18 +4,18 @@ Chat API routes for Mazungumzo AI
 Handles web-based chat interactions
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from typing import List
 import asyncio
 from datetime import datetime
 
 from ...models.chat_models import ChatMessage, ChatResponse
 from ...models.session_models import MessageRole
-from ...services.ai_service import ai_service
-from ...services.crisis_service import crisis_service
-from ...services.session_service import session_service
+from ...services.container import container
+from ...services.generation_profiles import compose_for_channel, generation_profile
 from ...utils.logging_config import get_logger, log_user_interaction, log_async_performance
 from ...utils.config import settings
+from ...utils.cancellation import CLIENT_CLOSED_REQUEST, ClientDisconnected, run_until_disconnect
 
 # Create router
 chat_router = APIRouter(prefix="/chat", tags=["chat"])
@@ -24,7 +24,7 @@ logger = get_logger("chat_routes")
 
 @chat_router.post("/", response_model=ChatResponse)
 @log_async_performance("chat_endpoint")
-async def chat_endpoint(chat_request: ChatMessage):
+async def chat_endpoint(chat_request: ChatMessage, http_request: Request):
     """
     Main chat endpoint for web interface
     Processes messages and returns AI responses with crisis detection
@@ -38,38 +38,41 @@ async def chat_endpoint(chat_request: ChatMessage):
         logger.info(f"💬 Chat request from {user_id[:8]}... on {platform}: {message[:50]}...")
         
         # Get or create user session
-        session = session_service.get_or_create_session(user_id, platform)
+        session = container.sessions.get_or_create_session(user_id, platform)
         
         # Update language preference if provided
         if language != session.language_preference:
-            session_service.update_language_preference(user_id, language)
+            container.sessions.update_language_preference(user_id, language)
+        
+        # Token-budgeted prior turns from the session's incremental prompt state,
+        # read before this message is added (it is sent separately)
+        prompt_window = container.context.window(user_id)
         
         # Add user message to session
-        session_service.add_message_to_session(
+        container.sessions.add_message_to_session(
             user_id, MessageRole.USER, message, platform,
             {"timestamp": datetime.now().isoformat(), "language": language}
         )
         
         # Crisis detection
-        is_crisis, confidence, detected_keywords = crisis_service.detect_crisis(message, session)
-        
-        # Get conversation context
-        conversation_context = session_service.get_conversation_context(user_id)
+        is_crisis, confidence, detected_keywords = container.crisis.detect_crisis(message, session)
         
-        # Generate AI response
-        ai_response = await ai_service.generate_response(
+        # Generate AI response (cancelled if the client disconnects)
+        ai_response = await run_until_disconnect(http_request, container.ai.generate_response(
             message=message,
-            conversation_history=conversation_context,
             language=language,
             is_crisis=is_crisis,
-            user_id=user_id
-        )
+            user_id=user_id,
+            prompt_window=prompt_window,
+            platform=platform
+        ), stage="chat")
         
         # Add AI response to session
-        session_service.add_message_to_session(
+        container.sessions.add_message_to_session(
             user_id, MessageRole.ASSISTANT, ai_response, platform,
             {
                 "timestamp": datetime.now().isoformat(),
+                "provider": ai_response.provider,
                 "is_crisis": is_crisis,
                 "confidence": confidence,
                 "detected_keywords": detected_keywords
@@ -79,12 +82,14 @@ async def chat_endpoint(chat_request: ChatMessage):
         # Get appropriate resources if crisis detected
         resources = []
         if is_crisis:
-            resources = crisis_service.get_appropriate_resources(confidence, detected_keywords)
+            resources = container.crisis.get_appropriate_resources(confidence, detected_keywords)
             
             # Add crisis response template if confidence is high
             if confidence >= 0.6:
-                crisis_template = crisis_service.get_crisis_response_template(confidence, language)
-                ai_response = crisis_template + "\n\n" + ai_response
+                crisis_template = container.crisis.get_crisis_response_template(confidence, language)
+                ai_response = compose_for_channel(
+                    ai_response, generation_profile(platform, is_crisis).max_chars, prefix=crisis_template
+                )
         
         # Log successful interaction
         log_user_interaction(logger, user_id, "chat_completed", platform)
@@ -98,6 +103,8 @@ async def chat_endpoint(chat_request: ChatMessage):
             session_id=user_id
         )
         
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         logger.error(f"❌ Chat processing error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Chat processing failed")
@@ -107,8 +114,8 @@ async def chat_endpoint(chat_request: ChatMessage):
 async def get_session_info(user_id: str):
     """Get session information for a user"""
     try:
-        session_summary = session_service.get_session_summary(user_id)
-        risk_profile = session_service.get_user_risk_profile(user_id)
+        session_summary = container.sessions.get_session_summary(user_id)
+        risk_profile = container.sessions.get_user_risk_profile(user_id)
         
         return {
             "session": session_summary,
@@ -127,7 +134,7 @@ async def update_language(user_id: str, language: str):
         if language not in ["en", "sw"]:
             raise HTTPException(status_code=400, detail="Unsupported language. Use 'en' or 'sw'")
         
-        session = session_service.update_language_preference(user_id, language)
+        session = container.sessions.update_language_preference(user_id, language)
         return {
             "message": f"Language updated to {language}",
             "user_id": user_id,
@@ -144,7 +151,7 @@ async def update_language(user_id: str, language: str):
 async def get_chat_history(user_id: str, limit: int = 20):
     """Get chat history for a user (limited for privacy)"""
     try:
-        conversation_context = session_service.get_conversation_context(user_id, limit)
+        conversation_context = container.sessions.get_conversation_context(user_id, limit)
         
         # Format for API response (exclude sensitive metadata)
         history = []
@@ -170,7 +177,7 @@ async def clear_session(user_id: str):
     """Clear/reset a user's session (for privacy/testing)"""
     try:
         # Note: In a real implementation, you might want authentication for this
-        session_service.session_manager._sessions.pop(user_id, None)
+        container.sessions.repository.delete(user_id)
         
         log_user_interaction(logger, user_id, "session_cleared", "api")
         
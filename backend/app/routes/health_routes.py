@@ -6,27 +6,27 @@ Health check and system status routes for Mazungumzo AI
 from fastapi import APIRouter, HTTPException, status
 from datetime import datetime, timedelta
 import asyncio
-import psutil
 import os
-from typing import Dict, Any
+import sys
+from typing import Dict, Any, Optional
 
 from backend.models.chat_models import APIHealthResponse
-from backend.services.ai_service import AIService
-from backend.services.session_service import SessionService
+from backend.services.container import container
 from backend.utils.config import get_settings
 from backend.utils.logging_config import get_logger, log_error_with_context
+from backend.utils.single_flight import SingleFlightCache
 
 router = APIRouter(prefix="/health", tags=["health"])
 logger = get_logger("health")
 settings = get_settings()
 
-# Service instances for health checks
-ai_service = AIService()
-session_service = SessionService()
-
-# Cache for health check results
-_health_cache = {}
-_cache_ttl = 60  # Cache for 60 seconds
+# Cache for health check results: one computation at a time, stale results
+# are served while a single refresh runs
+health_cache = SingleFlightCache(
+    "health",
+    ttl=settings.health_cache_ttl,
+    stale_ttl=settings.health_cache_stale
+)
 
 
 @router.get("/", response_model=APIHealthResponse)
@@ -57,49 +57,7 @@ async def detailed_health_check():
     Detailed health check with service status
     """
     try:
-        # Check cache first
-        cache_key = "detailed_health"
-        if (cache_key in _health_cache and 
-            datetime.utcnow() - _health_cache[cache_key]["timestamp"] < timedelta(seconds=_cache_ttl)):
-            return _health_cache[cache_key]["data"]
-        
-        # Perform health checks
-        health_data = {
-            "status": "healthy",
-            "timestamp": datetime.utcnow().isoformat(),
-            "version": settings.APP_VERSION,
-            "environment": settings.ENVIRONMENT,
-            "services": {},
-            "system": await get_system_metrics(),
-            "uptime": get_uptime()
-        }
-        
-        # Check AI service health
-        ai_health = await check_ai_service_health()
-        health_data["services"]["ai"] = ai_health
-        
-        # Check session service health
-        session_health = await check_session_service_health()
-        health_data["services"]["sessions"] = session_health
-        
-        # Check database health (if applicable)
-        db_health = await check_database_health()
-        health_data["services"]["database"] = db_health
-        
-        # Determine overall status
-        service_statuses = [service["status"] for service in health_data["services"].values()]
-        if "unhealthy" in service_statuses:
-            health_data["status"] = "unhealthy"
-        elif "degraded" in service_statuses:
-            health_data["status"] = "degraded"
-        
-        # Cache the result
-        _health_cache[cache_key] = {
-            "data": health_data,
-            "timestamp": datetime.utcnow()
-        }
-        
-        return health_data
+        return await health_cache.get("detailed_health", compute_detailed_health)
         
     except Exception as e:
         log_error_with_context(logger, e)
@@ -109,6 +67,40 @@ async def detailed_health_check():
         )
 
 
+async def compute_detailed_health() -> Dict[str, Any]:
+    """
+    Run every health check (the AI check makes a live provider call)
+    """
+    health_data = {
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "version": settings.APP_VERSION,
+        "environment": settings.ENVIRONMENT,
+        "services": {},
+        "system": await get_system_metrics(),
+        "uptime": get_uptime()
+    }
+    
+    # Run the service checks concurrently
+    ai_health, session_health, db_health = await asyncio.gather(
+        check_ai_service_health(),
+        check_session_service_health(),
+        check_database_health()
+    )
+    health_data["services"]["ai"] = ai_health
+    health_data["services"]["sessions"] = session_health
+    health_data["services"]["database"] = db_health
+    
+    # Determine overall status
+    service_statuses = [service["status"] for service in health_data["services"].values()]
+    if "unhealthy" in service_statuses:
+        health_data["status"] = "unhealthy"
+    elif "degraded" in service_statuses:
+        health_data["status"] = "degraded"
+    
+    return health_data
+
+
 @router.get("/readiness")
 async def readiness_check():
     """
@@ -117,7 +109,7 @@ async def readiness_check():
     try:
         # Check if all critical services are ready
         checks = await asyncio.gather(
-            check_ai_service_health(),
+            health_cache.get("ai", check_ai_service_health),
             check_session_service_health(),
             return_exceptions=True
         )
@@ -163,9 +155,11 @@ async def liveness_check():
 
 
 @router.get("/metrics")
-async def get_metrics():
+async def get_metrics(history_seconds: Optional[float] = None):
     """
     Basic application metrics
+    
+    Pass history_seconds to include the buffered system samples from that window.
     """
     try:
         metrics = {
@@ -175,6 +169,9 @@ async def get_metrics():
             "uptime": get_uptime()
         }
         
+        if history_seconds is not None:
+            metrics["system_history"] = container.system_sampler.history(history_seconds)
+        
         return metrics
         
     except Exception as e:
@@ -191,6 +188,7 @@ async def check_ai_service_health() -> Dict[str, Any]:
     """
     try:
         # Test AI service with a simple health check
+        ai_service = container.ai
         health_result = await ai_service.health_check()
         
         return {
@@ -215,7 +213,7 @@ async def check_session_service_health() -> Dict[str, Any]:
     """
     try:
         # Test session service
-        session_count = await session_service.get_active_session_count()
+        session_count = await container.sessions.get_active_session_count()
         
         return {
             "status": "healthy",
@@ -256,32 +254,11 @@ async def check_database_health() -> Dict[str, Any]:
 async def get_system_metrics() -> Dict[str, Any]:
     """
     Get system performance metrics
+    
+    Returns the latest background sample, so this never blocks the event loop.
     """
     try:
-        # CPU and memory metrics
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-        
-        return {
-            "cpu": {
-                "percent": cpu_percent,
-                "count": psutil.cpu_count()
-            },
-            "memory": {
-                "total": memory.total,
-                "available": memory.available,
-                "percent": memory.percent,
-                "used": memory.used
-            },
-            "disk": {
-                "total": disk.total,
-                "used": disk.used,
-                "free": disk.free,
-                "percent": (disk.used / disk.total) * 100
-            },
-            "load_average": os.getloadavg() if hasattr(os, 'getloadavg') else None
-        }
+        return container.system_sampler.latest()
         
     except Exception as e:
         logger.warning(f"Failed to get system metrics: {e}")
@@ -294,18 +271,14 @@ async def get_application_metrics() -> Dict[str, Any]:
     """
     try:
         # Get session statistics
-        session_stats = await session_service.get_session_statistics()
+        session_stats = await container.sessions.get_session_statistics()
         
         return {
             "sessions": session_stats,
             "cache": {
-                "health_cache_size": len(_health_cache),
-                "cache_ttl_seconds": _cache_ttl
+                "health": health_cache.get_stats()
             },
-            "process": {
-                "pid": os.getpid(),
-                "threads": len(psutil.Process().threads())
-            }
+            "process": container.system_sampler.latest().get("process")
         }
         
     except Exception as e:
@@ -319,6 +292,7 @@ def get_uptime() -> Dict[str, Any]:
     """
     try:
         # Get process start time
+        import psutil
         process = psutil.Process()
         start_time = datetime.fromtimestamp(process.create_time())
         uptime = datetime.now() - start_time
@@ -343,7 +317,7 @@ async def get_version():
         return {
             "version": settings.APP_VERSION,
             "environment": settings.ENVIRONMENT,
-            "python_version": f"{psutil.sys.version_info.major}.{psutil.sys.version_info.minor}.{psutil.sys.version_info.micro}",
+            "python_version": f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
@@ -10,9 +10,7 @@ import hashlib
 from typing import Dict, Any
 
 from backend.models.chat_models import WhatsAppWebhookData
-from backend.services.whatsapp_service import WhatsAppService
-from backend.services.session_service import SessionService
-from backend.services.crisis_service import CrisisDetectionService
+from backend.services.container import container
 from backend.utils.config import get_settings
 from backend.utils.logging_config import get_logger, log_user_interaction, log_error_with_context
 
@@ -20,11 +18,6 @@ webhook_router = APIRouter(prefix="/webhook", tags=["webhook"])
 logger = get_logger("webhook")
 settings = get_settings()
 
-# Initialize services
-whatsapp_service = WhatsAppService()
-session_service = SessionService()
-crisis_service = CrisisDetectionService()
-
 
 def verify_webhook_signature(payload: bytes, signature: str) -> bool:
     """Verify webhook signature from WhatsApp/Twilio"""
@@ -128,13 +121,13 @@ async def process_whatsapp_message(message_data: Dict[str, Any]):
             log_user_interaction(logger, user_phone, "whatsapp_message", "whatsapp")
             
             # Get or create session
-            session_id = await session_service.get_or_create_session(
+            session_id = await container.sessions.get_or_create_session(
                 user_id=user_phone,
                 platform="whatsapp"
             )
             
             # Check for crisis indicators
-            crisis_result = await crisis_service.detect_crisis(message_text)
+            crisis_result = await container.crisis.detect_crisis(message_text)
             
             if crisis_result.is_crisis:
                 # Handle crisis situation
@@ -157,19 +150,19 @@ async def handle_crisis_message(user_phone: str, message: str, crisis_result):
         log_crisis_detection(logger, user_phone, crisis_result.confidence, crisis_result.keywords)
         
         # Send immediate crisis resources
-        crisis_response = await crisis_service.get_crisis_resources(
+        crisis_response = await container.crisis.get_crisis_resources(
             country="Kenya",  # Default for now
             urgent=True
         )
         
         # Send crisis response via WhatsApp
-        await whatsapp_service.send_message(
+        await container.whatsapp.send_message(
             to=user_phone,
             message=crisis_response.message
         )
         
         # Update session with crisis flag
-        await session_service.update_session_risk(
+        await container.sessions.update_session_risk(
             user_id=user_phone,
             risk_level="high",
             crisis_indicators=crisis_result.keywords
@@ -185,30 +178,26 @@ async def handle_normal_message(user_phone: str, message: str, session_id: str):
     """
     try:
         # Get AI response
-        from backend.services.ai_service import AIService
-        ai_service = AIService()
+        ai_service = container.ai
         
         # Get conversation history
-        history = await session_service.get_conversation_history(session_id)
+        history = await container.sessions.get_conversation_history(session_id)
         
         # Generate AI response
         ai_response = await ai_service.generate_response(
             message=message,
             conversation_history=history,
-            user_context={
-                "platform": "whatsapp",
-                "country": "Kenya"
-            }
+            platform="whatsapp"
         )
         
         # Send response via WhatsApp
-        await whatsapp_service.send_message(
+        await container.whatsapp.send_message(
             to=user_phone,
             message=ai_response.message
         )
         
         # Update conversation history
-        await session_service.add_message(
+        await container.sessions.add_message(
             session_id=session_id,
             message=message,
             response=ai_response.message,
@@ -243,13 +232,13 @@ async def handle_twilio_webhook(request: Request):
         log_user_interaction(logger, user_phone, "sms_message", "sms")
         
         # Process similar to WhatsApp but via SMS
-        session_id = await session_service.get_or_create_session(
+        session_id = await container.sessions.get_or_create_session(
             user_id=user_phone,
             platform="sms"
         )
         
         # Check for crisis
-        crisis_result = await crisis_service.detect_crisis(message_text)
+        crisis_result = await container.crisis.detect_crisis(message_text)
         
         if crisis_result.is_crisis:
             await handle_crisis_sms(user_phone, message_text, crisis_result)
@@ -272,7 +261,7 @@ async def handle_crisis_sms(user_phone: str, message: str, crisis_result):
         from backend.utils.logging_config import log_crisis_detection
         log_crisis_detection(logger, user_phone, crisis_result.confidence, crisis_result.keywords)
         
-        crisis_response = await crisis_service.get_crisis_resources(
+        crisis_response = await container.crisis.get_crisis_resources(
             country="Kenya",
             urgent=True
         )
@@ -288,24 +277,20 @@ async def handle_crisis_sms(user_phone: str, message: str, crisis_result):
 async def handle_normal_sms(user_phone: str, message: str, session_id: str):
     """Handle normal SMS conversation"""
     try:
-        from backend.services.ai_service import AIService
-        ai_service = AIService()
+        ai_service = container.ai
         
-        history = await session_service.get_conversation_history(session_id)
+        history = await container.sessions.get_conversation_history(session_id)
         
         ai_response = await ai_service.generate_response(
             message=message,
             conversation_history=history,
-            user_context={
-                "platform": "sms",
-                "country": "Kenya"
-            }
+            platform="sms"
         )
         
         # Send SMS response (implement SMS sending)
         logger.info(f"📤 SMS response sent to {user_phone[:8]}...")
         
-        await session_service.add_message(
+        await container.sessions.add_message(
             session_id=session_id,
             message=message,
             response=ai_response.message,
@@ -0,0 +1,113 @@
+# backend/benchmarks/bench_chat_e2e.py
+"""
+Benchmark: end-to-end /api/v1/chat throughput and latency
+
+Starts the mock LLM provider (simulators/mock_llm.py) on a local port,
+points AIService at it, and drives the chat endpoint in-process at several
+concurrency levels. Session data is written to a throwaway directory.
+
+Run from the backend directory:
+    python benchmarks/bench_chat_e2e.py --requests 200 --concurrency 1,8,32 --ttft lognormal:200:0.3
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from simulators.mock_llm import add_config_arguments, config_from_args, create_mock_llm
+from simulators.reporting import RunRecorder, format_summary
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _start_mock(args):
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        create_mock_llm(config_from_args(args), seed=args.seed),
+        host="127.0.0.1", port=port, log_level="warning"
+    ))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task, f"http://127.0.0.1:{port}"
+
+
+async def drive(client, total: int, concurrency: int, platform: str = "web") -> RunRecorder:
+    """Send `total` chat requests with at most `concurrency` in flight"""
+    recorder = RunRecorder()
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker():
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            payload = {
+                "message": "Nina wasiwasi kuhusu kazi" if i % 3 == 0 else "I feel stressed about exams",
+                "user_id": f"bench_user_{i % 50}",
+                "language": "sw" if i % 3 == 0 else "en",
+                "platform": platform,
+            }
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/v1/chat", json=payload)
+                outcome = "ok" if response.status_code == 200 else f"HTTP_{response.status_code}"
+            except Exception as e:
+                outcome = type(e).__name__
+            recorder.record((time.perf_counter() - start) * 1000, outcome)
+
+    recorder.start()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    recorder.finish()
+    return recorder
+
+
+async def main(args):
+    server, task, mock_url = await _start_mock(args)
+
+    # Configure the app before importing it: settings are read at import time
+    os.environ["CEREBRAS_API_KEY"] = "mock"
+    os.environ["CEREBRAS_BASE_URL"] = mock_url
+    os.environ.pop("OPENROUTER_API_KEY", None)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.chdir(tempfile.mkdtemp(prefix="mazungumzo-bench-"))
+
+    import httpx
+    import main as app_main
+
+    try:
+        async with httpx.AsyncClient(app=app_main.app, base_url="http://bench", timeout=60) as client:
+            await drive(client, min(args.requests, 20), 4)  # warm up
+            for concurrency in args.concurrency:
+                recorder = await drive(client, args.requests, concurrency, args.platform)
+                print(format_summary(f"/api/v1/chat platform={args.platform} concurrency={concurrency}", recorder.summary()))
+    finally:
+        server.should_exit = True
+        await task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end chat benchmark against the mock LLM")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 8, 32])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--platform", default="web", help="Delivery channel sent with each request (web/whatsapp/sms)")
+    add_config_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+# backend/benchmarks/bench_import_time.py
+"""
+Benchmark: worker cold start (import time of the app module)
+
+Imports the app in fresh interpreters with `python -X importtime` and
+reports the median cumulative import time, the slowest top-level imports,
+and which heavy optional dependencies were loaded at import. Those
+dependencies (httpx, psutil, twilio) are imported by the services that use
+them on first use; their own cold import cost is measured separately so the
+saving is visible.
+
+Run from the backend directory:
+    python benchmarks/bench_import_time.py [runs] [module]
+"""
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).parent.parent
+DEFERRED = ("httpx", "psutil", "twilio.rest", "twilio.request_validator")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(module: str) -> Tuple[float, List[Tuple[int, str]], List[str]]:
+    """(cumulative ms, [(cumulative us, name) for top-level imports], loaded deferred modules)"""
+    probe = f"import sys, {module}; print(','.join(m for m in {DEFERRED!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+        env={**os.environ, "LOG_LEVEL": "WARNING"},
+    )
+    top_level: Dict[str, int] = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if name == module:
+            total_us = cumulative
+        elif indent <= 3:  # direct children of the probe
+            top_level[name] = top_level.get(name, 0) + cumulative
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return total_us / 1000, sorted(((us, name) for name, us in top_level.items()), reverse=True), loaded
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    module = sys.argv[2] if len(sys.argv) > 2 else "main"
+
+    samples, slowest, loaded = [], [], []
+    for _ in range(runs):
+        total_ms, slowest, loaded = import_profile(module)
+        samples.append(total_ms)
+
+    print(f"import {module}: median {statistics.median(samples):.0f} ms "
+          f"(min {min(samples):.0f}, max {max(samples):.0f}, {runs} runs)\n")
+    print("Slowest imports (last run, cumulative):")
+    for us, name in slowest[:10]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    print(f"\nDeferred dependencies loaded at import: {', '.join(loaded) or 'none'}")
+    for dependency in DEFERRED:
+        costs = [import_profile(dependency)[0] for _ in range(3)]
+        print(f"  {dependency:26s} {statistics.median(costs):7.1f} ms when imported cold")
+
+
+if __name__ == "__main__":
+    main()
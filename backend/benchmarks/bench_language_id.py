@@ -0,0 +1,117 @@
+# backend/benchmarks/bench_language_id.py
+"""
+Benchmark: built-in language identifier vs langdetect
+
+Measures accuracy on a held-out labelled set of English, Swahili and Somali
+messages (none of which appear in the identifier's seed text), plus a set
+of code-switched messages, and per-call latency for both engines.
+
+Run from the backend directory:
+    python benchmarks/bench_language_id.py [repeats]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.language_id import _identify_normalized, identify_language
+
+LABELLED = [
+    ("en", "I haven't eaten properly in days"),
+    ("en", "Everything is falling apart and I can't cope"),
+    ("en", "My boss shouted at me again today"),
+    ("en", "I just want someone to listen"),
+    ("en", "Thanks, that actually helped a lot"),
+    ("en", "How do I talk to my mother about this?"),
+    ("en", "I'm scared of what might happen tomorrow"),
+    ("en", "We buried my brother last week"),
+    ("en", "Hello"),
+    ("en", "I feel much better now"),
+    ("en", "Nobody at church knows how I really feel"),
+    ("en", "The rent is due and I have nothing"),
+    ("sw", "Sijala vizuri kwa siku kadhaa"),
+    ("sw", "Kila kitu kinaharibika na siwezi kustahimili"),
+    ("sw", "Bosi wangu alinifokea tena leo"),
+    ("sw", "Nataka tu mtu wa kunisikiliza"),
+    ("sw", "Asante, hiyo imenisaidia sana"),
+    ("sw", "Nitaongea vipi na mama yangu kuhusu hili?"),
+    ("sw", "Naogopa kitakachotokea kesho"),
+    ("sw", "Tulimzika kaka yangu wiki iliyopita"),
+    ("sw", "Habari"),
+    ("sw", "Najisikia vizuri zaidi sasa"),
+    ("sw", "Hakuna mtu kanisani anajua ninavyojisikia kweli"),
+    ("sw", "Kodi ya nyumba inadaiwa na sina kitu"),
+    ("so", "Dhowr maalmood ma aanan si fiican u cunin"),
+    ("so", "Wax walba way burburayaan mana la qabsan karo"),
+    ("so", "Madaxayga ayaa mar kale igu qayliyay maanta"),
+    ("so", "Waxaan rabaa qof i dhagaysta oo keliya"),
+    ("so", "Mahadsanid, taasi aad bay ii caawisay"),
+    ("so", "Sideen hooyaday ugala hadlaa arrintan?"),
+    ("so", "Waxaan ka baqayaa waxa berri dhici kara"),
+    ("so", "Walaalkay ayaan aasnay toddobaadkii hore"),
+]
+
+CODE_SWITCHED = [
+    "Niko stressed sana na hii job",
+    "Sijui what to do anymore, niko tired",
+    "Msee I'm feeling down lakini nitakuwa sawa",
+    "Nimechoka with everything bana",
+    "Leo I had a panic attack kazini",
+]
+
+
+def time_per_call(fn, texts, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (repeats * len(texts)) * 1e6
+
+
+def main(repeats: int):
+    texts = [text for _, text in LABELLED]
+
+    def ours_uncached(text):
+        _identify_normalized.cache_clear()
+        return identify_language(text).language
+
+    ours_correct = sum(identify_language(text).language == label for label, text in LABELLED)
+    ours_uncached_us = time_per_call(ours_uncached, texts, repeats)
+    _identify_normalized.cache_clear()
+    ours_cached_us = time_per_call(lambda t: identify_language(t).language, texts, repeats)
+    switched = sum(identify_language(text).code_switched for text in CODE_SWITCHED)
+
+    print(f"Language ID benchmark ({len(LABELLED)} labelled messages, {repeats} repeats)")
+    print(f"built-in  accuracy {ours_correct}/{len(LABELLED)}  "
+          f"text-cache cold {ours_uncached_us:8.1f} µs/call  warm {ours_cached_us:6.2f} µs/call  "
+          f"code-switch flagged {switched}/{len(CODE_SWITCHED)}")
+
+    try:
+        from langdetect import DetectorFactory, detect
+        from langdetect.lang_detect_exception import LangDetectException
+    except ImportError:
+        print("langdetect not installed; skipping comparison")
+        return
+
+    DetectorFactory.seed = 0
+
+    def langdetect_label(text):
+        try:
+            return detect(text)
+        except LangDetectException:
+            return "unknown"
+
+    cold_start = time.perf_counter()
+    langdetect_label("warm up profiles")
+    cold_ms = (time.perf_counter() - cold_start) * 1000
+
+    ld_correct = sum(langdetect_label(text) == label for label, text in LABELLED)
+    ld_us = time_per_call(langdetect_label, texts, repeats)
+    print(f"langdetect accuracy {ld_correct}/{len(LABELLED)}  "
+          f"per call {ld_us:8.1f} µs  first-call profile load {cold_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,52 @@
+# backend/benchmarks/bench_local_responder.py
+"""
+Benchmark: degraded-mode replies from the local responder
+
+Times LocalResponder.respond() over a mix of English and Swahili messages
+(topic words, Kenyan expressions, greetings, nothing recognisable) at the
+web and SMS reply budgets, and prints one sample reply per message.
+
+Run from the backend directory:
+    python benchmarks/bench_local_responder.py [replies]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.generation_profiles import generation_profile
+from services.local_responder import LocalResponder
+
+MESSAGES = [
+    ("I can't sleep and I feel so tired and empty", "en"),
+    ("Nina wasiwasi mwingi kuhusu mtihani wa kesho", "sw"),
+    ("My boss keeps piling on pressure at work", "en"),
+    ("Sina pesa ya karo na madeni yanazidi", "sw"),
+    ("Nimechoka na maisha haya", "sw"),
+    ("Mambo", "sw"),
+    ("I just don't know what to say", "en"),
+]
+
+
+def main():
+    replies = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    responder = LocalResponder()
+    for platform in ("web", "sms"):
+        max_chars = generation_profile(platform).max_chars
+        start = time.perf_counter()
+        for i in range(replies):
+            message, language = MESSAGES[i % len(MESSAGES)]
+            responder.respond(message, language, max_chars, f"user{i % 100}")
+        per_reply_us = (time.perf_counter() - start) / replies * 1e6
+        print(f"{platform:4} ({max_chars} chars): {per_reply_us:6.1f} µs per reply")
+
+    print()
+    for message, language in MESSAGES:
+        reply = responder.respond(message, language, generation_profile("sms").max_chars)
+        print(f"[{reply.topic}] {message!r}\n    -> {reply.text} ({len(reply.text)} chars)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# backend/benchmarks/bench_logging.py
+"""
+Benchmark: logging overhead per chat request
+
+Replays the log lines one chat turn produces (session and interaction
+lines, an API call line, a handful of service INFO lines) against a real
+file handler, and reports the time spent in the request thread:
+- direct: synchronous handlers, every event logged (the previous setup)
+- queued: QueueHandler/QueueListener, every event logged
+- queued + sampled: as above with high-volume events rate-limited
+- queued + json: JSON formatter on the listener thread
+
+Run from the backend directory:
+    python benchmarks/bench_logging.py [requests]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils import logging_config
+from utils.logging_config import get_logger, log_api_call, log_user_interaction, setup_logging, stop_logging
+
+
+def one_request(logger: logging.Logger, i: int):
+    user_id = f"user-{i % 500}"
+    log_user_interaction(logger, user_id, "session_resumed", "whatsapp")
+    logger.info(f"💬 Message received from {user_id} (42 chars)")
+    logger.info("🔍 Crisis check complete: no crisis")
+    log_api_call(logger, "Cerebras", "chat/completions", "SUCCESS", 812.5)
+    logger.info(f"✅ Response generated for {user_id}")
+    log_user_interaction(logger, user_id, "chat_completed", "whatsapp")
+
+
+def run(label: str, requests: int, log_file: str, **options) -> float:
+    # Console output goes to devnull so the terminal doesn't dominate the timing
+    real_stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        setup_logging(level="INFO", log_file=log_file, use_colors=False, **options)
+        logger = get_logger("bench")
+        start = time.perf_counter()
+        for i in range(requests):
+            one_request(logger, i)
+        request_path = time.perf_counter() - start
+        stop_logging()
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+    per_request_us = request_path / requests * 1e6
+    print(f"{label:24s} {per_request_us:8.1f} µs/request in the request thread")
+    return per_request_us
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "bench.log")
+        print(f"{requests} requests, 6 log events each\n")
+        direct = run("direct", requests, log_file)
+        queued = run("queued", requests, log_file, queued=True)
+        sampled = run("queued + sampled", requests, log_file, queued=True, sample_per_second=10, sample_burst=20)
+        run("queued + json", requests, log_file, queued=True, json_format=True)
+        print(f"\nqueued: {direct / queued:.1f}x less request-thread time, "
+              f"queued + sampled: {direct / sampled:.1f}x")
+        suppressed = sum(child.value for child in logging_config.LOGS_SUPPRESSED._children.values())
+        print(f"Sampled events suppressed: {int(suppressed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# backend/benchmarks/bench_prompt_assembly.py
+"""
+Benchmark: building the AI request body for one chat turn
+
+Compares, for a session with a full history:
+- rebuild: the previous path (pick the system prompt, walk the history into
+  a list of dicts, json-encode the whole request body)
+- incremental: the session PromptBuilder window joined with the pre-rendered
+  system prompt and the encoded request prefix
+
+Also checks both paths produce the same request.
+
+Run from the backend directory:
+    python benchmarks/bench_prompt_assembly.py [turns]
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.session_models import MessageRole
+from services.prompt_builder import encode_messages, request_body, request_prefix, system_prompt
+from services.session_repository import MemorySessionBackend, SessionRepository
+from utils.config import get_system_prompt, settings
+
+USER_TEXT = "Nimekuwa na wasiwasi mwingi kuhusu kazi na familia, sijui nianzie wapi. " * 2
+ASSISTANT_TEXT = "Pole sana, inaeleweka kuhisi hivyo. Tuzungumze hatua moja baada ya nyingine. " * 3
+
+
+def rebuild(history, message: str, language: str) -> bytes:
+    messages = [{"role": "system", "content": get_system_prompt(language)}]
+    for msg in history[-settings.max_conversation_history:]:
+        if msg.role in [MessageRole.USER, MessageRole.ASSISTANT]:
+            messages.append({"role": msg.role.value, "content": msg.content})
+    messages.append({"role": "user", "content": message})
+    return json.dumps({
+        "model": settings.cerebras_model,
+        "max_tokens": settings.max_tokens,
+        "temperature": settings.temperature,
+        "messages": messages,
+    }).encode("utf-8")
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repository = SessionRepository(MemorySessionBackend(), max_messages=50)
+    for i in range(25):
+        repository.append("bench", MessageRole.USER, f"{i} {USER_TEXT}")
+        repository.append("bench", MessageRole.ASSISTANT, f"{i} {ASSISTANT_TEXT}")
+    prefix = request_prefix(
+        model=settings.cerebras_model, max_tokens=settings.max_tokens, temperature=settings.temperature
+    )
+
+    old = json.loads(rebuild(repository.history("bench"), USER_TEXT, "en"))
+    new = json.loads(request_body(prefix, encode_messages(
+        system_prompt("en"), repository.prompt_window("bench", settings.max_conversation_history), USER_TEXT
+    )))
+    assert old == new, "request bodies differ"
+
+    start = time.perf_counter()
+    for _ in range(turns):
+        rebuild(repository.history("bench"), USER_TEXT, "en")
+    rebuild_us = (time.perf_counter() - start) / turns * 1e6
+
+    start = time.perf_counter()
+    for _ in range(turns):
+        window = repository.prompt_window("bench", settings.max_conversation_history)
+        request_body(prefix, encode_messages(system_prompt("en"), window, USER_TEXT))
+    incremental_us = (time.perf_counter() - start) / turns * 1e6
+
+    print(f"history window: {settings.max_conversation_history} messages, "
+          f"~{repository.prompt_builder('bench').token_estimate} tokens kept")
+    print(f"rebuild:     {rebuild_us:7.1f} µs per request")
+    print(f"incremental: {incremental_us:7.1f} µs per request ({rebuild_us / incremental_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# backend/benchmarks/bench_retrieval.py
+"""
+Benchmark: BM25 retrieval over the local coping/resources corpus
+
+Reports:
+- index build time (corpus assembly + indexing, best of several builds)
+- memory held by the index (tracemalloc, after the corpus is released)
+- query latency (p50/p99/mean) for a mix of English and Swahili messages,
+  for the raw index search and for KnowledgeBase.context(), which also
+  renders the system message injected into the prompt
+
+Run from the backend directory:
+    python benchmarks/bench_retrieval.py [queries]
+"""
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.retrieval import BM25Index, KnowledgeBase, default_corpus
+from utils.config import settings
+
+QUERIES = [
+    ("I can't sleep at night and I feel tired all the time", "en"),
+    ("Nina wasiwasi na hofu kuhusu mtihani wa kesho", "sw"),
+    ("My mother died last month and I can't stop crying", "en"),
+    ("I had a panic attack at work, my heart was racing", "en"),
+    ("Sina pesa na madeni yananisumbua sana", "sw"),
+    ("Where can I find a counsellor in Eldoret?", "en"),
+    ("nimechoka na pombe", "sw"),
+    ("hello", "en"),
+]
+
+
+def timed(fn, runs: int) -> np.ndarray:
+    samples = np.empty(runs)
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(i)
+        samples[i] = time.perf_counter() - start
+    return samples * 1e6
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    corpus = default_corpus()
+    BM25Index(corpus)  # warm up
+    builds = timed(lambda _: BM25Index(default_corpus()), 50)
+    index_only = timed(lambda _: BM25Index(corpus), 50)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    index = BM25Index(default_corpus())
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    index_bytes = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    print(f"corpus: {len(index)} snippets, {len(index.postings)} terms, "
+          f"{sum(len(p) for p in index.postings.values())} postings")
+    print(f"build:  {builds.min() / 1000:.2f} ms (corpus + index), {index_only.min() / 1000:.2f} ms (index only)")
+    print(f"memory: {index_bytes / 1024:.1f} KiB")
+
+    k, min_score = settings.retrieval_top_k, settings.retrieval_min_score
+    search = timed(lambda i: index.search(QUERIES[i % len(QUERIES)][0], k, QUERIES[i % len(QUERIES)][1], min_score), runs)
+    knowledge = KnowledgeBase()
+    knowledge.index  # build outside the timed loop
+    context = timed(lambda i: knowledge.context(*QUERIES[i % len(QUERIES)]), runs)
+
+    for name, samples in (("search", search), ("context", context)):
+        p50, p99 = np.percentile(samples, [50, 99])
+        print(f"{name:8} p50={p50:6.1f} µs  p99={p99:6.1f} µs  mean={samples.mean():6.1f} µs")
+
+    print()
+    for query, language in QUERIES:
+        hits = index.search(query, k, language, min_score)
+        print(f"{query!r}: " + (", ".join(f"{snippet.doc_id} ({score:.1f})" for score, snippet in hits) or "-"))
+
+
+if __name__ == "__main__":
+    main()
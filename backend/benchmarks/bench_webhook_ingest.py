@@ -0,0 +1,99 @@
+# backend/benchmarks/bench_webhook_ingest.py
+"""
+Benchmark: Twilio webhook ingestion cost per request
+
+Compares the old path (form parse + signature check, then a second form
+parse to build the message) with the single-read ingestion dependency.
+
+Run from the backend directory:
+    python benchmarks/bench_webhook_ingest.py [iterations]
+"""
+
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+from urllib.parse import urlencode
+
+# Make backend modules importable and give the validator a token to sign with
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "ACbenchmark")
+os.environ.setdefault("TWILIO_AUTH_TOKEN", "benchmark-token")
+
+from starlette.requests import Request
+
+from webhooks import WhatsAppMessage, get_twilio_validator, ingest_twilio_webhook
+
+URL = "http://testserver/api/v1/webhook/whatsapp"
+PARAMS = {
+    "From": "whatsapp:+254700000001",
+    "To": "whatsapp:+14155238886",
+    "Body": "Habari, nina wasiwasi kuhusu kazi yangu",
+    "MessageSid": "SM" + "0" * 32,
+    "AccountSid": "ACbenchmark",
+    "NumMedia": "0",
+    "ProfileName": "Benchmark",
+    "WaId": "254700000001",
+}
+
+
+def make_request(body: bytes, signature: str) -> Request:
+    """Build a Starlette request that replays the given body"""
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "path": "/api/v1/webhook/whatsapp",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", b"application/x-www-form-urlencoded"),
+            (b"x-twilio-signature", signature.encode()),
+        ],
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request(scope, receive)
+
+
+async def legacy_ingest(request: Request) -> WhatsAppMessage:
+    """The previous double form read: validate, then parse again"""
+    form_data = await request.form()
+    if not get_twilio_validator().validate(str(request.url), form_data, request.headers.get("X-Twilio-Signature", "")):
+        raise RuntimeError("signature mismatch")
+    form_data = await request.form()
+    return WhatsAppMessage(**form_data)
+
+
+async def run(label: str, ingest, body: bytes, signature: str, iterations: int):
+    # Warm up
+    for _ in range(100):
+        await ingest(make_request(body, signature))
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await ingest(make_request(body, signature))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed / iterations * 1e6:8.1f} µs/request")
+
+
+async def main(iterations: int):
+    body = urlencode(PARAMS).encode()
+    signature = get_twilio_validator().compute_signature(URL, PARAMS)
+
+    print(f"Webhook ingestion benchmark ({iterations} iterations, {len(body)} byte body)")
+    await run("legacy (form x2)", legacy_ingest, body, signature, iterations)
+    await run("single-read ingestion", ingest_twilio_webhook, body, signature, iterations)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -5,29 +5,49 @@ Main FastAPI application for Mazungumzo AI
 
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, FileResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, List
 import logging
+import re
 import time
 import asyncio
 
 from utils.config import settings, get_system_prompt, validate_environment
-from services.json_database import db, get_user_session, add_message, log_crisis, get_stats
+from services.json_database import get_user_session, add_message, log_crisis, get_stats, get_crisis_resources
 from services.advanced_features import (
     enhance_ai_response,
     advanced_service,
     voice_service,
     community_service
 )
+from services.local_responder import local_responder
+from services.media_pipeline import MediaURLNotAllowed
+from services.message_analysis import analyze_message
+from services.retrieval import knowledge_base
+from services.mood_tracker import mood_tracker
+from services.system_metrics import system_sampler
+from services.language_id import _identify_normalized
+from utils.logging_config import setup_logging, stop_logging
+from utils.metrics import metrics, HTTP_DURATION, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from utils.single_flight import SingleFlightCache
+from utils.tracing import span, start_trace, end_trace
+from utils.cancellation import CLIENT_CLOSED_REQUEST, ClientDisconnected, run_until_disconnect
+from services.tts_cache import tts_cache
 from webhooks import router as webhook_router
-from services.ai_service import AIService
-from models.session_models import MessageRole, ConversationMessage
+from services.container import container
+from models.session_models import MessageRole
 
 # Configure logging
-logging.basicConfig(
+setup_logging(
     level=settings.log_level,
-    format=settings.log_format
+    log_file=settings.log_file,
+    use_colors=False,
+    json_format=settings.log_json,
+    queued=settings.log_queue,
+    sample_per_second=settings.log_sample_per_second,
+    sample_burst=settings.log_sample_burst,
+    console_format=settings.log_format
 )
 logger = logging.getLogger(__name__)
 
@@ -55,6 +75,7 @@ class ChatRequest(BaseModel):
     message: str
     user_id: str
     language: Optional[str] = "en"
+    platform: Optional[str] = "web"  # web, whatsapp or sms (sets the reply length budget)
 
 class VoiceRequest(BaseModel):
     audio_url: str
@@ -73,13 +94,34 @@ class StatsResponse(BaseModel):
     stats: Dict
     resources: List[str]
 
+# Language ID cache effectiveness (functools.lru_cache counters, read at scrape time)
+metrics.counter("language_id_cache_hits_total", "Language identifications served from cache",
+                callback=lambda: _identify_normalized.cache_info().hits)
+metrics.counter("language_id_cache_misses_total", "Language identifications computed",
+                callback=lambda: _identify_normalized.cache_info().misses)
+
 # Middleware for request timing
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
+    start_time = time.perf_counter()
+    status_code = 500
+    trace = token = None
+    if settings.tracing_server_timing or settings.tracing_sample_rate > 0:
+        trace, token = start_trace(f"{request.method} {request.url.path}", settings.tracing_sample_rate)
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        process_time = time.perf_counter() - start_time
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        route_path = route.path if route is not None else "unmatched"
+        HTTP_DURATION.labels(request.method, route_path, status_code).observe(process_time)
+        if trace is not None:
+            end_trace(trace, token, method=request.method, route=route_path, status=status_code)
     response.headers["X-Process-Time"] = str(process_time)
+    if trace is not None and settings.tracing_server_timing:
+        response.headers["Server-Timing"] = trace.server_timing(process_time)
     return response
 
 # Routes
@@ -88,86 +130,110 @@ async def root():
     """Health check endpoint"""
     return {"status": "healthy", "version": settings.app_version}
 
-@app.post("/api/v1/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Main chat endpoint with advanced features"""
-    try:
-        # Get or create user session
-        session = await get_user_session(request.user_id)
-        if not session:
-            session = await db.create_user_session(request.user_id)
+async def chat_turn(request: ChatRequest, http_request: Optional[Request] = None) -> Dict:
+    """
+    One chat turn: analyze the message, store it, generate and store the reply
+
+    With http_request, generation is cancelled (ClientDisconnected) if that
+    client disconnects; without it the turn always runs to completion.
+    """
+    # Analyze the message once; crisis, mood and language stages share the result.
+    # analysis.language is the turn's effective language: what the user wrote in,
+    # or the declared language when the text is inconclusive
+    with span("analysis"):
+        analysis = await analyze_message(request.message, request.user_id, declared_language=request.language)
+        language = analysis.language.language
+        if analysis.crisis.is_crisis:
+            await log_crisis(request.user_id, request.message, analysis.crisis.confidence)
+    
+    # Get or create user session
+    with span("session"):
+        if not await get_user_session(request.user_id):
+            await container.db.create_user_session(request.user_id)
+        
+        # Token-budgeted prior turns (plus rolling summary), read before this message is added
+        prompt_window = container.context.window(request.user_id)
         
         # Add user message to history
         await add_message(
             request.user_id,
             MessageRole.USER,
             request.message,
-            request.language
+            language
         )
-        
-        # Get conversation history and format it for the AI service
-        raw_history = session.get("conversation_history", [])
-        conversation_history = []
-        
-        for msg in raw_history:
-            conversation_history.append(ConversationMessage(
-                role=MessageRole(msg["role"]),
-                content=msg["content"],
-                timestamp=msg.get("timestamp"),
-                metadata={"language": msg.get("language", request.language)}
-            ))
-        
-        # Generate AI response using the AI service
-        ai_service = AIService()
-        ai_response = await ai_service.generate_response(
+    
+    # Generate AI response using the AI service (cancelled if the client disconnects)
+    with span("ai"):
+        generation = container.ai.generate_response(
             message=request.message,
-            conversation_history=conversation_history,
-            language=request.language,
-            user_id=request.user_id
+            language=language,
+            is_crisis=analysis.crisis.is_crisis,
+            user_id=request.user_id,
+            prompt_window=prompt_window,
+            platform=request.platform
         )
-        
-        # Add AI response to history
+        if http_request is not None:
+            ai_response = await run_until_disconnect(http_request, generation, stage="chat")
+        else:
+            ai_response = await generation
+    
+    # Add AI response to history, with the provider that generated it
+    with span("persist"):
         await add_message(
             request.user_id,
             MessageRole.ASSISTANT,
             ai_response,
-            request.language
+            language,
+            {"provider": ai_response.provider}
         )
-        
-        # Enhance response with advanced features
+    
+    # Enhance response with advanced features
+    with span("enhance"):
         enhanced = await enhance_ai_response(
             request.message,
             request.user_id,
-            ai_response
+            ai_response,
+            analysis,
+            platform=request.platform
         )
+    enhanced["language"] = language
+    return enhanced
+
+@app.post("/api/v1/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, http_request: Request):
+    """Main chat endpoint with advanced features"""
+    try:
+        return await chat_turn(request, http_request)
         
-        return enhanced
-        
+    except ClientDisconnected:
+        # Nobody is listening; the reply was neither generated in full nor stored
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         logger.error(f"Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/v1/voice")
-async def process_voice(request: VoiceRequest):
+async def process_voice(request: VoiceRequest, http_request: Request):
     """Process voice messages"""
     try:
         # Transcribe voice message
         transcription = await voice_service.process_voice_message(
             request.audio_url,
-            request.user_id
+            request.user_id,
+            request.language
         )
         
         # Process transcription through chat
-        chat_response = await chat(ChatRequest(
+        chat_response = await chat_turn(ChatRequest(
             message=transcription,
             user_id=request.user_id,
             language=request.language
-        ))
+        ), http_request)
         
         # Convert response to voice
         voice_url = await voice_service.convert_response_to_voice(
             chat_response["response"],
-            request.language
+            chat_response["language"]
         )
         
         return {
@@ -176,32 +242,99 @@ async def process_voice(request: VoiceRequest):
             "voice_url": voice_url
         }
         
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except MediaURLNotAllowed as e:
+        logger.warning(f"Voice media URL refused: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Voice processing error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Voice reply keys are SHA-256 hex digests; anything else never reaches the filesystem
+VOICE_KEY = re.compile(r"[0-9a-f]{64}")
+
+@app.get("/api/v1/voice/audio/{filename}")
+async def get_voice_audio(filename: str):
+    """Serve a cached voice reply"""
+    key, _, _ = filename.partition(".")
+    path = tts_cache.lookup(key) if VOICE_KEY.fullmatch(key) else None
+    if not path:
+        raise HTTPException(status_code=404, detail="Voice reply not found")
+    return FileResponse(path, media_type=f"audio/{tts_cache.extension}")
+
+# Shared read caches: one computation per key, stale values served while refreshing
+stats_cache = SingleFlightCache("stats", ttl=settings.stats_cache_ttl, stale_ttl=settings.stats_cache_stale)
+resources_cache = SingleFlightCache(
+    "resources", ttl=settings.resources_cache_ttl, stale_ttl=settings.resources_cache_stale
+)
+
+async def compute_usage_stats() -> Dict:
+    stats = await get_stats()
+    stats["voice_pipeline"] = voice_service.get_pipeline_stats()
+    stats["tts_cache"] = voice_service.get_voice_cache_stats()
+    stats["ai_providers"] = container.ai.router.get_stats()
+    stats["local_responder"] = local_responder.get_stats()
+    stats["retrieval"] = knowledge_base.get_stats()
+    stats["mood_tracking"] = mood_tracker.get_stats()
+    stats["population_analytics"] = container.population_analytics.get_stats()
+    stats["read_caches"] = {"stats": stats_cache.get_stats(), "resources": resources_cache.get_stats()}
+    resources = await get_crisis_resources()
+    
+    return {
+        "stats": stats,
+        "resources": resources
+    }
+
 @app.get("/api/v1/stats", response_model=StatsResponse)
 async def get_usage_stats():
     """Get usage statistics and resources"""
     try:
-        stats = await get_stats()
-        resources = await db.get_crisis_resources()
-        
-        return {
-            "stats": stats,
-            "resources": resources
-        }
+        return await stats_cache.get("usage", compute_usage_stats)
         
     except Exception as e:
         logger.error(f"Stats error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/analytics/cohorts")
+async def get_cohort_analytics(
+    group_by: str = "platform,language",
+    window_hours: Optional[float] = None,
+    hours: int = 24
+):
+    """Mood trend, crisis and escalation breakdowns by cohort, plus hourly crisis rates"""
+    fields = [field.strip() for field in group_by.split(",") if field.strip()]
+    try:
+        report = container.population_analytics.report(fields, window_hours, hours)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return JSONResponse(
+        content=report,
+        headers={"Cache-Control": f"private, max-age={settings.analytics_cache_seconds}"}
+    )
+
+@app.get("/api/v1/system/metrics")
+async def get_system_metrics(history_seconds: Optional[float] = None):
+    """Latest background system sample, optionally with recent history"""
+    metrics = {"latest": system_sampler.latest()}
+    if history_seconds is not None:
+        metrics["history"] = system_sampler.history(history_seconds)
+    return metrics
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of in-process metrics"""
+    return Response(metrics.render(), headers={"Content-Type": METRICS_CONTENT_TYPE})
+
 @app.get("/api/v1/resources")
 async def get_resources(category: Optional[str] = None):
     """Get mental health resources"""
     try:
-        resources = await db.get_mental_health_resources(category)
-        return resources
+        return await resources_cache.get(
+            category,
+            lambda: container.db.get_mental_health_resources(category)
+        )
         
     except Exception as e:
         logger.error(f"Resources error: {str(e)}")
@@ -229,9 +362,13 @@ async def startup_event():
             for issue in issues:
                 logger.warning(f"- {issue}")
         
-        # Initialize database
-        db._initialize_files()
-        db._load_all_to_cache()
+        # Build services once: database, AI client, mood snapshots, system sampler, media workers
+        await container.startup("session_repository", "db", "ai", "mood_tracker", "population_analytics", "system_sampler", "media_pipeline")
+        
+        # Pre-synthesize repeated voice replies
+        warmed = await voice_service.warm_voice_cache()
+        if warmed:
+            logger.info(f"🗣️ Voice cache warmed with {warmed} phrases")
         
         logger.info("✅ Application startup complete")
         
@@ -243,12 +380,15 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     try:
-        # Cleanup old sessions
-        await db.cleanup_old_sessions(settings.session_cleanup_hours)
+        # Stop services in reverse order: media workers, sampler, snapshots, AI client, session cleanup
+        await container.shutdown()
         logger.info("✅ Application shutdown complete")
         
     except Exception as e:
         logger.error(f"Shutdown error: {str(e)}")
+    finally:
+        # Drain queued log records before the process exits
+        stop_logging()
 
 if __name__ == "__main__":
     import uvicorn
@@ -61,41 +61,3 @@ class UserSession(BaseModel):
         }
         self.crisis_flags.append(crisis_flag)
 
-
-class SessionManager:
-    """In-memory session manager (replace with Redis/DB in production)"""
-    
-    def __init__(self):
-        self._sessions: Dict[str, UserSession] = {}
-    
-    def get_session(self, user_id: str, platform: str = "web") -> UserSession:
-        """Get or create user session"""
-        if user_id not in self._sessions:
-            self._sessions[user_id] = UserSession(
-                user_id=user_id,
-                platform=platform
-            )
-        return self._sessions[user_id]
-    
-    def update_session(self, session: UserSession):
-        """Update session data"""
-        session.last_activity = datetime.now()
-        self._sessions[session.user_id] = session
-    
-    def get_active_users_count(self) -> int:
-        """Get count of active users"""
-        return len(self._sessions)
-    
-    def get_total_conversations_count(self) -> int:
-        """Get total number of conversation messages"""
-        return sum(len(session.conversation_history) for session in self._sessions.values())
-    
-    def cleanup_old_sessions(self, hours: int = 24):
-        """Remove sessions older than specified hours"""
-        cutoff_time = datetime.now().timestamp() - (hours * 3600)
-        old_sessions = [
-            user_id for user_id, session in self._sessions.items()
-            if session.last_activity.timestamp() < cutoff_time
-        ]
-        for user_id in old_sessions:
-            del self._sessions[user_id]
@@ -5,6 +5,8 @@ from pathlib import Path
 # Add the project root directory to Python path
 project_root = str(Path(__file__).parent.parent)
 sys.path.insert(0, project_root)
+# Service modules import each other as top-level packages (utils., services., models.)
+sys.path.insert(0, str(Path(__file__).parent))
 
 if __name__ == "__main__":
     import uvicorn
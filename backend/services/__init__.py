@@ -3,18 +3,19 @@
 Service modules for Mazungumzo AI
 """
 
-from .json_database import db, get_user_session, add_message, log_crisis, get_stats
+from .json_database import get_user_session, get_history, get_prompt_window, add_message, log_crisis, get_stats
 from .advanced_features import (
     enhance_ai_response,
     advanced_service,
     voice_service,
     community_service
 )
-from .ai_service import ai_service
+from .container import container
 
 __all__ = [
-    'db',
     'get_user_session',
+    'get_history',
+    'get_prompt_window',
     'add_message',
     'log_crisis',
     'get_stats',
@@ -22,5 +23,5 @@ __all__ = [
     'advanced_service',
     'voice_service',
     'community_service',
-    'ai_service'
+    'container'
 ]
@@ -0,0 +1,120 @@
+# backend/services/adaptive_timeouts.py
+"""
+Adaptive AI provider timeouts for Mazungumzo AI
+
+A fixed 15 s timeout is far too long when a provider normally answers in
+one second and has started hanging. AdaptiveTimeouts keeps a rolling
+window of recent latencies per (provider, model):
+- time to first byte (first streamed chunk)
+- full completion time (successful calls)
+
+and derives the timeouts for the next call from a high quantile of each,
+times a safety multiplier, clamped to configured floors and ceilings.
+Until a window has enough samples the configured AI_TIMEOUT is used.
+"""
+
+import time
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional, Tuple
+
+from utils.config import settings
+from utils.metrics import metrics
+
+AI_TIMEOUT_SECONDS = metrics.gauge(
+    "ai_timeout_seconds", "Current adaptive AI timeouts by provider, model and kind", ["provider", "model", "kind"]
+)
+
+
+class TimeoutBudget(NamedTuple):
+    connect: float
+    ttfb: float  # first byte of a streamed reply, and the longest gap between chunks
+    total: float  # whole call, including reading the reply
+
+    def read_timeout(self, streaming: bool) -> float:
+        """Per-read timeout: a non-streamed reply only arrives once it is complete"""
+        return self.ttfb if streaming else self.total
+
+
+class LatencyWindow:
+    """The most recent latency samples, with quantiles over them"""
+
+    __slots__ = ("samples",)
+
+    def __init__(self, size: int):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int) -> Optional[float]:
+        if len(self.samples) < min_samples:
+            return None
+        import numpy as np  # deferred: not needed until enough samples exist
+
+        return float(np.quantile(np.fromiter(self.samples, float, len(self.samples)), q))
+
+
+def _clamp(value: float, floor: float, ceiling: float) -> float:
+    return min(max(value, floor), ceiling)
+
+
+class AdaptiveTimeouts:
+    """Per (provider, model) timeout budgets derived from recent latency quantiles"""
+
+    def __init__(self):
+        self._windows: Dict[Tuple[str, str, str], LatencyWindow] = {}
+        # (provider, model) -> (budget, computed at)
+        self._budgets: Dict[Tuple[str, str], Tuple[TimeoutBudget, float]] = {}
+
+    def _window(self, provider: str, model: str, kind: str) -> LatencyWindow:
+        key = (provider, model, kind)
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = LatencyWindow(settings.ai_timeout_window)
+        return window
+
+    def observe_ttfb(self, provider: str, model: str, seconds: float):
+        self._window(provider, model, "ttfb").add(seconds)
+
+    def observe_completion(self, provider: str, model: str, seconds: float):
+        self._window(provider, model, "total").add(seconds)
+
+    def budget(self, provider: str, model: str) -> TimeoutBudget:
+        """Timeouts for the next call (recomputed at most every AI_TIMEOUT_REFRESH seconds)"""
+        key = (provider, model)
+        cached = self._budgets.get(key)
+        now = time.monotonic()
+        if cached is not None and now - cached[1] < settings.ai_timeout_refresh:
+            return cached[0]
+        budget = self._compute(provider, model)
+        self._budgets[key] = (budget, now)
+        for kind, value in zip(TimeoutBudget._fields, budget):
+            AI_TIMEOUT_SECONDS.labels(provider, model, kind).set(value)
+        return budget
+
+    def _compute(self, provider: str, model: str) -> TimeoutBudget:
+        fixed = _clamp(settings.ai_timeout, settings.ai_total_timeout_floor, settings.ai_total_timeout_ceiling)
+        if not settings.ai_timeout_adaptive:
+            return TimeoutBudget(min(settings.ai_connect_timeout, fixed), fixed, fixed)
+
+        q, multiplier, min_samples = settings.ai_timeout_quantile, settings.ai_timeout_multiplier, settings.ai_timeout_min_samples
+
+        total_q = self._window(provider, model, "total").quantile(q, min_samples)
+        total = fixed if total_q is None else _clamp(
+            total_q * multiplier, settings.ai_total_timeout_floor, settings.ai_total_timeout_ceiling
+        )
+
+        ttfb_q = self._window(provider, model, "ttfb").quantile(q, min_samples)
+        ttfb = min(settings.ai_ttfb_timeout_ceiling, total) if ttfb_q is None else _clamp(
+            ttfb_q * multiplier, settings.ai_ttfb_timeout_floor, settings.ai_ttfb_timeout_ceiling
+        )
+        ttfb = min(ttfb, total)
+
+        return TimeoutBudget(min(settings.ai_connect_timeout, ttfb), ttfb, total)
+
+    def get_stats(self) -> Dict:
+        stats = {}
+        for (provider, model), (budget, _) in self._budgets.items():
+            windows = {kind: len(self._window(provider, model, kind).samples) for kind in ("ttfb", "total")}
+            stats[f"{provider}/{model}"] = {**budget._asdict(), "samples": windows}
+        return stats
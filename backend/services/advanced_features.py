@@ -10,9 +10,18 @@ import asyncio
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import logging
-from langdetect import detect
 import re
 
+from services.container import container
+from services.generation_profiles import compose_for_channel, generation_profile
+from services.language_id import language_identifier
+from services.media_pipeline import media_pipeline
+from services.message_analysis import MessageAnalysis, analyze_message
+from services.mood_tracker import mood_tracker
+from services.tts_cache import tts_cache
+from utils.config import settings
+from utils.constants import RESPONSE_TEMPLATES, TIME_BASED_RESPONSES
+
 logger = logging.getLogger(__name__)
 
 class AdvancedMentalHealthService:
@@ -21,7 +30,7 @@ class AdvancedMentalHealthService:
     """
     
     def __init__(self):
-        self.mood_tracking = {}
+        self.mood_tracking = mood_tracker
         self.conversation_patterns = {}
         self.cultural_contexts = self.load_cultural_contexts()
         
@@ -47,66 +56,36 @@ class AdvancedMentalHealthService:
             }
         }
     
-    async def analyze_mood_progression(self, user_id: str, message: str) -> Dict:
+    async def analyze_mood_progression(
+        self,
+        user_id: str,
+        message: str,
+        analysis: Optional[MessageAnalysis] = None
+    ) -> Dict:
         """
         Track user mood over time for better personalized support
         This shows AI learning and adaptation
         """
         
-        # Simple mood keywords (in production, use sentiment analysis)
-        positive_words = ["happy", "good", "better", "hopeful", "furaha", "nzuri"]
-        negative_words = ["sad", "bad", "worse", "hopeless", "huzuni", "mbaya"]
-        
-        message_lower = message.lower()
-        
-        # Calculate mood score
-        positive_score = sum(1 for word in positive_words if word in message_lower)
-        negative_score = sum(1 for word in negative_words if word in message_lower)
-        
-        mood_score = positive_score - negative_score
-        
-        # Store mood history
-        if user_id not in self.mood_tracking:
-            self.mood_tracking[user_id] = []
-        
-        mood_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "score": mood_score,
-            "message_length": len(message),
-            "language": await self.detect_language(message)
-        }
+        if analysis is None:
+            analysis = await analyze_message(message, user_id)
         
-        self.mood_tracking[user_id].append(mood_entry)
-        
-        # Keep only last 10 entries
-        self.mood_tracking[user_id] = self.mood_tracking[user_id][-10:]
-        
-        # Analyze trend
-        recent_scores = [entry["score"] for entry in self.mood_tracking[user_id][-5:]]
-        trend = "improving" if len(recent_scores) > 1 and recent_scores[-1] > recent_scores[0] else "stable"
+        mood_score = analysis.mood.score
+        snapshot = self.mood_tracking.record(user_id, mood_score, analysis.language_name)
         
         return {
             "current_mood": mood_score,
-            "trend": trend,
-            "session_length": len(self.mood_tracking[user_id]),
-            "recommendation": self.get_mood_recommendation(mood_score, trend)
+            "trend": snapshot.trend,
+            "session_length": snapshot.count,
+            "recommendation": self.get_mood_recommendation(mood_score, snapshot.trend)
         }
     
-    async def detect_language(self, text: str) -> str:
+    async def detect_language(self, text: str, user_id: Optional[str] = None) -> str:
         """
         Detect message language for better cultural response
+        Uses the built-in n-gram identifier with a sticky per-user preference
         """
-        try:
-            detected = detect(text)
-            # Map common East African language codes
-            language_map = {
-                "sw": "swahili",
-                "en": "english",
-                "so": "somali"  # Some Kenyan communities
-            }
-            return language_map.get(detected, "english")
-        except:
-            return "english"
+        return language_identifier.detect(text, user_id).name
     
     def get_mood_recommendation(self, mood_score: int, trend: str) -> str:
         """
@@ -123,31 +102,41 @@ class AdvancedMentalHealthService:
         self, 
         message: str, 
         user_id: str, 
-        base_ai_response: str
+        base_ai_response: str,
+        analysis: Optional[MessageAnalysis] = None,
+        mood_analysis: Optional[Dict] = None,
+        platform: str = "web"
     ) -> str:
         """
         Enhance AI response with cultural context and personalization
+        Pass the turn's mood_analysis when it was already recorded, so the
+        message is not counted twice. The notes are only added where they
+        fit the platform's reply budget.
         """
         
+        if analysis is None:
+            analysis = await analyze_message(message, user_id)
+        
         # Analyze mood
-        mood_analysis = await self.analyze_mood_progression(user_id, message)
-        language = mood_analysis.get("language", "english")
+        if mood_analysis is None:
+            mood_analysis = await self.analyze_mood_progression(user_id, message, analysis)
+        language = analysis.language_name
         
-        # Add cultural context
-        enhanced_response = base_ai_response
+        notes = []
         
         # Add mood-aware suffix
         if mood_analysis["trend"] == "improving":
             if language == "swahili":
-                enhanced_response += "\n\nNaona unaboresha kidogo. Hii ni nzuri sana! 🌟"
+                notes.append("Naona unaboresha kidogo. Hii ni nzuri sana! 🌟")
             else:
-                enhanced_response += "\n\nI notice you're improving a bit. That's wonderful! 🌟"
+                notes.append("I notice you're improving a bit. That's wonderful! 🌟")
         
         # Add cultural wisdom
-        if "family" in message.lower() or "familia" in message.lower():
-            enhanced_response += f"\n\n💝 {self.cultural_contexts['cultural_references']['family_importance']}"
+        if analysis.mentions_family:
+            notes.append(f"💝 {self.cultural_contexts['cultural_references']['family_importance']}")
         
-        return enhanced_response
+        profile = generation_profile(platform, analysis.crisis.is_crisis)
+        return compose_for_channel(base_ai_response, profile.max_chars, extras=notes)
     
     async def generate_conversation_insights(self, user_id: str) -> Dict:
         """
@@ -155,36 +144,32 @@ class AdvancedMentalHealthService:
         Shows AI learning capabilities
         """
         
-        if user_id not in self.mood_tracking:
+        mood = self.mood_tracking.get(user_id)
+        if mood is None:
             return {"status": "new_user", "insights": []}
         
-        mood_history = self.mood_tracking[user_id]
-        
         insights = []
         
         # Session length insight
-        if len(mood_history) > 5:
-            insights.append(f"Engaged in {len(mood_history)} meaningful exchanges")
+        if mood.count > 5:
+            insights.append(f"Engaged in {mood.count} meaningful exchanges")
         
         # Mood trend insight
-        recent_scores = [entry["score"] for entry in mood_history[-3:]]
-        if len(recent_scores) > 1:
-            if recent_scores[-1] > recent_scores[0]:
-                insights.append("Mood trending positively during conversation")
-            elif recent_scores[-1] < recent_scores[0]:
-                insights.append("May need additional support - mood declining")
+        if mood.trend == "improving":
+            insights.append("Mood trending positively during conversation")
+        elif mood.trend == "declining":
+            insights.append("May need additional support - mood declining")
         
         # Language preference
-        languages = [entry.get("language", "english") for entry in mood_history]
-        primary_lang = max(set(languages), key=languages.count)
-        if primary_lang == "swahili":
+        if mood.primary_language == "swahili":
             insights.append("Prefers Swahili communication")
         
         return {
             "status": "active_user",
             "insights": insights,
-            "session_score": sum(entry["score"] for entry in mood_history),
-            "primary_language": primary_lang
+            "session_score": mood.score_sum,
+            "average_mood": round(mood.average, 2),
+            "primary_language": mood.primary_language
         }
 
 
@@ -197,39 +182,49 @@ class VoiceMessageService:
     def __init__(self):
         self.supported_formats = [".mp3", ".ogg", ".wav", ".m4a"]
     
-    async def process_voice_message(self, audio_url: str, user_id: str) -> str:
+    async def process_voice_message(self, audio_url: str, user_id: str, language: str = "sw") -> str:
         """
-        Process WhatsApp voice messages (mock implementation for demo)
-        In production, would use speech-to-text service
+        Process WhatsApp voice messages
+        Streams the media to disk and transcribes it in the worker pool
         """
+        transcription = await media_pipeline.process(audio_url, language)
         
-        # Mock transcription for demo
-        mock_transcriptions = [
-            "Nimehisi vibaya sana leo", # I feel very bad today
-            "Nahitaji msaada wa haraka", # I need help urgently  
-            "Familia yangu hainielezi", # My family doesn't understand me
-            "Nina wasiwasi mkuu kuhusu kazi" # I have big worries about work
-        ]
-        
-        import random
-        transcription = random.choice(mock_transcriptions)
-        
-        logger.info(f"🎤 Mock voice transcription for {user_id}: {transcription}")
+        logger.info(f"🎤 Voice transcription for {user_id} ({len(transcription)} chars)")
         
         return transcription
     
+    def get_pipeline_stats(self) -> Dict:
+        """Download and transcription statistics for the voice pipeline"""
+        return media_pipeline.get_stats()
+    
     async def convert_response_to_voice(self, text: str, language: str = "sw") -> str:
         """
-        Convert text response to voice (mock for demo)
-        In production, would use text-to-speech service
+        Convert text response to voice
+        Audio is content-addressed, so repeated phrases are never re-synthesized
         """
         
-        # Mock voice response URL
-        mock_voice_url = f"https://api.mazungumzo.demo/voice/{hash(text)}.mp3"
+        key, _ = await tts_cache.get_or_synthesize(text, language)
+        voice_url = f"{settings.voice_public_base_url.rstrip('/')}/{key}.{tts_cache.extension}"
         
-        logger.info(f"🗣️ Mock voice response generated: {mock_voice_url}")
+        logger.info(f"🗣️ Voice response ready: {voice_url}")
         
-        return mock_voice_url
+        return voice_url
+    
+    async def warm_voice_cache(self) -> int:
+        """Pre-synthesize frequently repeated replies (crisis, welcome, fallback)"""
+        ai_service = container.ai
+        phrases = []
+        for templates in list(RESPONSE_TEMPLATES.values()) + list(TIME_BASED_RESPONSES.values()):
+            phrases.extend((text, language) for language, text in templates.items())
+        for language in ("en", "sw"):
+            for is_crisis in (False, True):
+                phrases.append((ai_service._get_fallback_response(language, is_crisis), language))
+        
+        return await tts_cache.warm(phrases)
+    
+    def get_voice_cache_stats(self) -> Dict:
+        """Hit ratio and bytes saved for synthesized replies"""
+        return tts_cache.get_stats()
 
 
 class CommunityFeatures:
@@ -289,20 +284,58 @@ voice_service = VoiceMessageService()
 community_service = CommunityFeatures()
 
 
+# Map analysis topics to peer support groups
+TOPIC_SUPPORT_PATTERNS = {
+    "financial": "economic_anxiety",
+    "work_stress": "economic_anxiety",
+    "relationships": "family_conflict",
+}
+
+
+def suggest_support_pattern(analysis: MessageAnalysis) -> str:
+    """Pick a peer support pattern from the message's topics"""
+    if analysis.mentions_family:
+        return "family_conflict"
+    for topic in analysis.topics:
+        if topic in TOPIC_SUPPORT_PATTERNS:
+            return TOPIC_SUPPORT_PATTERNS[topic]
+    return "general_support"
+
+
 # Integration with main app
-async def enhance_ai_response(message: str, user_id: str, base_response: str) -> Dict:
+async def enhance_ai_response(
+    message: str,
+    user_id: str,
+    base_response: str,
+    analysis: Optional[MessageAnalysis] = None,
+    platform: str = "web"
+) -> Dict:
     """
     Main function to enhance responses with advanced features
-    Call this from your main chat endpoint
+    Call this from your main chat endpoint. Pass the message's analysis if
+    the caller already has one so the text is not analyzed again.
     """
     
     try:
+        if analysis is None:
+            analysis = await analyze_message(message, user_id)
+        
         # Get mood analysis
-        mood_analysis = await advanced_service.analyze_mood_progression(user_id, message)
+        mood_analysis = await advanced_service.analyze_mood_progression(user_id, message, analysis)
+        mood = advanced_service.mood_tracking.get(user_id)
+        container.population_analytics.record_turn(
+            user_id,
+            platform,
+            analysis.language.language,
+            mood.average,
+            mood.trend,
+            analysis.crisis.confidence,
+            analysis.crisis.is_crisis
+        )
         
         # Generate personalized response
         enhanced_response = await advanced_service.generate_personalized_response(
-            message, user_id, base_response
+            message, user_id, base_response, analysis, mood_analysis, platform
         )
         
         # Get conversation insights
@@ -310,7 +343,7 @@ async def enhance_ai_response(message: str, user_id: str, base_response: str) ->
         
         # Suggest community support if appropriate
         community_suggestion = await community_service.suggest_peer_support(
-            user_id, "general_support"
+            user_id, suggest_support_pattern(analysis)
         )
         
         return {
@@ -326,4 +359,4 @@ async def enhance_ai_response(message: str, user_id: str, base_response: str) ->
         return {
             "response": base_response,
             "error": "Advanced features temporarily unavailable"
-        }
\ No newline at end of file
+        }
@@ -1,32 +1,82 @@
 # backend/services/ai_service.py
 """
 AI Service for Mazungumzo AI
-Handles communication with Cerebras and OpenRouter APIs
+Handles communication with the configured OpenAI-compatible providers
+(Cerebras, OpenRouter and any AI_PROVIDERS entries), routed per request
 """
 
-import httpx
 import asyncio
+import json
+import time
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
-from utils.config import settings, get_system_prompt
+from utils.config import settings
 from utils.logging_config import get_logger, log_async_performance, log_api_call, log_error_with_context
-from utils.constants import SYSTEM_PROMPTS
-from models.session_models import ConversationMessage, MessageRole
+from utils.tracing import span
+from models.session_models import ConversationMessage
+from utils.metrics import (
+    AI_CANCELLED, AI_CANCELLED_SECONDS_SAVED, AI_DURATION, AI_EARLY_STOPS, AI_LOCAL_REPLIES, AI_TURNS_SERVED,
+    PROMPT_TOKENS, PROMPT_TOKENS_SAVED
+)
+from services.adaptive_timeouts import AdaptiveTimeouts
+from services.context_window import provider_budget
+from services.generation_profiles import GenerationProfile, fit_to_channel, generation_profile
+from services.local_responder import local_responder
+from services.providers import ProviderConfig, ProviderRegistry, ProviderRouter, provider_registry
+from services.prompt_builder import (
+    SUMMARY_PROMPT, PromptWindow, RenderedPrompt, encode_message, encode_messages, estimate_tokens,
+    request_body, request_prefix, system_prompt, window_from_history
+)
+from services.retrieval import knowledge_base
+
+
+class AIReply(str):
+    """Reply text that also records which provider generated it ("local" for the local responder)"""
+    
+    def __new__(cls, text: str, provider: str):
+        reply = super().__new__(cls, text)
+        reply.provider = provider
+        return reply
 
 
 class AIService:
-    """Service for AI chat completions using Cerebras and OpenRouter"""
+    """Service for AI chat completions across the configured OpenAI-compatible providers"""
     
-    def __init__(self):
+    def __init__(self, registry: ProviderRegistry = None):
         self.logger = get_logger("ai_service")
-        self.cerebras_available = settings.has_cerebras_config
-        self.openrouter_available = settings.has_openrouter_config
+        self.registry = registry or provider_registry
+        self.router = ProviderRouter(self.registry)
+        self._client = None
+        self._inflight = 0
         
-        if not (self.cerebras_available or self.openrouter_available):
+        # Request body prefixes (model and sampling parameters), encoded on first use
+        self._profile_prefixes: Dict[Tuple[str, GenerationProfile], bytes] = {}
+        self._summary_prefixes: Dict[str, bytes] = {}
+        self.timeouts = AdaptiveTimeouts()
+        
+        if not self.router:
             self.logger.warning("⚠️ No AI services configured")
         else:
-            self.logger.info(f"✅ AI Service initialized - Cerebras: {self.cerebras_available}, OpenRouter: {self.openrouter_available}")
+            names = ", ".join(f"{p.title} ({p.model})" for p in self.router.providers)
+            self.logger.info(f"✅ AI Service initialized - providers: {names}")
+    
+    @property
+    def current_provider(self) -> Optional[str]:
+        """Provider the router currently ranks best"""
+        return self.router.preferred
+    
+    def _http(self):
+        """Shared HTTP client (pooled connections); httpx is imported on first use"""
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient()
+        return self._client
+    
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     @log_async_performance("ai_generate_response")
     async def generate_response(
@@ -35,8 +85,10 @@ class AIService:
         conversation_history: List[ConversationMessage] = None,
         language: str = "en",
         is_crisis: bool = False,
-        user_id: str = None
-    ) -> str:
+        user_id: str = None,
+        prompt_window: PromptWindow = None,
+        platform: str = "web"
+    ) -> AIReply:
         """
         Generate AI response using available services
         
@@ -46,167 +98,264 @@ class AIService:
             language: Preferred language (en/sw)
             is_crisis: Whether this is a crisis situation
             user_id: User identifier for logging
+            prompt_window: Budgeted, pre-encoded history from the context window
+                manager (used instead of conversation_history when given)
+            platform: Delivery channel (web/whatsapp/sms); sets the reply length budget
             
         Returns:
-            AI-generated response
+            AI-generated response (its .provider names the provider that served it)
         """
         
-        # Prepare conversation context
-        messages = self._prepare_messages(message, conversation_history, language, is_crisis)
+        # Prepare conversation context; each provider narrows it to its own token budget
+        if prompt_window is None:
+            prompt_window = window_from_history(
+                conversation_history, settings.max_conversation_history, provider_budget()
+            )
+        system = system_prompt(language, is_crisis)
+        profile = generation_profile(platform, is_crisis)
+        max_chars = profile.max_chars if profile.stream else None
+        with span("ai.retrieve"):
+            knowledge = knowledge_base.context(message, language)
+        prompt_tokens = system.tokens + prompt_window.tokens + estimate_tokens(message)
+        if knowledge is not None:
+            prompt_tokens += knowledge.tokens
         
-        # Try Cerebras first (faster)
-        if self.cerebras_available:
-            try:
-                response = await self._call_cerebras(messages, user_id)
-                if response:
-                    return response
-            except Exception as e:
-                self.logger.warning(f"Cerebras API failed, falling back to OpenRouter: {str(e)}")
+        # Degraded mode: answer locally rather than queue behind saturated providers (never for crisis)
+        if not is_crisis:
+            reason = self._degraded_reason()
+            if reason:
+                return self._local_reply(message, language, profile, user_id, reason)
         
-        # Fallback to OpenRouter
-        if self.openrouter_available:
-            try:
-                response = await self._call_openrouter(messages, user_id)
-                if response:
-                    return response
-            except Exception as e:
-                self.logger.error(f"OpenRouter API also failed: {str(e)}")
+        # Router order: best provider (spread by weighted choice) first, the others as fallbacks
+        self._inflight += 1
+        try:
+            for provider in self.router.rank(prompt_tokens, profile.max_tokens):
+                try:
+                    with span("ai.prepare"):
+                        messages = self._prepare_messages(provider.name, system, prompt_window, message, knowledge)
+                    with span(f"ai.{provider.name}"):
+                        response = await self._call_provider(
+                            provider, messages, self._profile_prefix(provider, profile), user_id, max_chars
+                        )
+                    if response:
+                        self.router.served(provider.name)
+                        AI_TURNS_SERVED.labels(provider.name).inc()
+                        return AIReply(response, provider.name)
+                except Exception as e:
+                    self.logger.warning(f"{provider.title} API failed, trying the next provider: {str(e)}")
+        finally:
+            self._inflight -= 1
         
-        # Final fallback response
-        return self._get_fallback_response(language, is_crisis)
+        # Final fallback response: helplines for a crisis, otherwise a local reply
+        if is_crisis:
+            AI_TURNS_SERVED.labels("fallback").inc()
+            return AIReply(self._get_fallback_response(language, is_crisis), "fallback")
+        return self._local_reply(message, language, profile, user_id, "providers_failed")
+    
+    def _degraded_reason(self) -> Optional[str]:
+        """Why a non-crisis turn should skip the providers (None: use them)"""
+        if not self.router:
+            return "no_providers"
+        if settings.ai_max_inflight and self._inflight >= settings.ai_max_inflight:
+            return "overload"
+        if self.router.saturated:
+            return "rate_limited"
+        return None
+    
+    def _local_reply(
+        self, message: str, language: str, profile: GenerationProfile, user_id: str, reason: str
+    ) -> AIReply:
+        with span("ai.local"):
+            reply = local_responder.respond(message, language, profile.max_chars, user_id)
+        AI_LOCAL_REPLIES.labels(reason).inc()
+        AI_TURNS_SERVED.labels("local").inc()
+        self.logger.info(f"🧩 Local reply ({reason}, topic {reply.topic})")
+        return AIReply(reply.text, "local")
     
     def _prepare_messages(
         self, 
-        message: str, 
-        conversation_history: List[ConversationMessage] = None,
-        language: str = "en",
-        is_crisis: bool = False
-    ) -> List[Dict[str, str]]:
-        """Prepare messages array for AI API"""
+        provider: str,
+        system: RenderedPrompt,
+        prompt_window: PromptWindow,
+        message: str,
+        knowledge: RenderedPrompt = None
+    ) -> bytes:
+        """
+        Encoded messages array for one provider: history fitted to its budget,
+        retrieved snippets (knowledge) after the system prompt, token counts recorded
+        """
         
-        # Choose appropriate system prompt
-        if is_crisis:
-            system_prompt = SYSTEM_PROMPTS["crisis"]
-        elif language != "en":
-            system_prompt = SYSTEM_PROMPTS["multilingual"] 
-        else:
-            system_prompt = get_system_prompt(language)
+        window = prompt_window.fit(provider_budget(provider))
+        prompt_tokens = system.tokens + window.tokens + estimate_tokens(message)
+        if knowledge is not None:
+            prompt_tokens += knowledge.tokens
+        PROMPT_TOKENS.labels(provider).inc(prompt_tokens)
+        PROMPT_TOKENS_SAVED.labels(provider).inc(window.dropped_tokens)
+        self.logger.debug(
+            f"🧮 {provider} prompt ~{prompt_tokens} tokens "
+            f"({len(window.messages)} history messages, ~{window.dropped_tokens} left out)"
+        )
         
-        messages = [{"role": "system", "content": system_prompt}]
+        return encode_messages(system, window, message, knowledge)
+    
+    def _profile_prefix(self, provider: ProviderConfig, profile: GenerationProfile) -> bytes:
+        """Request prefix for a provider and generation profile, encoded on first use"""
+        key = (provider.name, profile)
+        prefix = self._profile_prefixes.get(key)
+        if prefix is None:
+            params = {
+                "model": provider.model,
+                "max_tokens": profile.max_tokens,
+                "temperature": settings.temperature,
+            }
+            if profile.stop:
+                params["stop"] = list(profile.stop)
+            if profile.stream:
+                params["stream"] = True
+            prefix = self._profile_prefixes[key] = request_prefix(**params)
+        return prefix
+    
+    def _summary_prefix(self, provider: ProviderConfig) -> bytes:
+        prefix = self._summary_prefixes.get(provider.name)
+        if prefix is None:
+            prefix = self._summary_prefixes[provider.name] = request_prefix(
+                model=provider.model, max_tokens=settings.context_summary_tokens, temperature=0.2
+            )
+        return prefix
+    
+    async def _post_completion(
+        self, provider: ProviderConfig, body: bytes, max_chars: int = None
+    ) -> Tuple[int, Optional[str], Optional[str]]:
+        """
+        POST a chat completion: (status code, reply text, error body)
         
-        # Add conversation history (limited to recent messages)
-        if conversation_history:
-            recent_history = conversation_history[-settings.max_conversation_history:]
-            for msg in recent_history:
-                if msg.role in [MessageRole.USER, MessageRole.ASSISTANT]:
-                    messages.append({
-                        "role": msg.role.value,
-                        "content": msg.content
-                    })
+        Timeouts come from the provider's recent latencies (AdaptiveTimeouts);
+        any timeout is raised as asyncio.TimeoutError. With max_chars the
+        completion is streamed and reading stops once the reply fills the
+        channel budget. Leaving the stream closes the connection, which ends
+        generation upstream.
+        """
+        import httpx
         
-        # Add current message
-        messages.append({"role": "user", "content": message})
+        budget = self.timeouts.budget(provider.name, provider.model)
+        timeout = httpx.Timeout(budget.read_timeout(streaming=bool(max_chars)), connect=budget.connect)
+        try:
+            return await asyncio.wait_for(self._send_completion(provider, body, timeout, max_chars), budget.total)
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError(f"{type(e).__name__} ({budget})") from e
+    
+    async def _send_completion(
+        self, provider: ProviderConfig, body: bytes, timeout, max_chars: int = None
+    ) -> Tuple[int, Optional[str], Optional[str]]:
+        client = self._http()
+        name, model = provider.name, provider.model
+        started = time.perf_counter()
+        if not max_chars:
+            response = await client.post(provider.url, headers=provider.request_headers, content=body, timeout=timeout)
+            self.router.update_limits(name, response.status_code, response.headers)
+            if response.status_code != 200:
+                return response.status_code, None, response.text
+            self.timeouts.observe_completion(name, model, time.perf_counter() - started)
+            return 200, response.json()["choices"][0]["message"]["content"], None
         
-        return messages
+        async with client.stream(
+            "POST", provider.url, headers=provider.request_headers, content=body, timeout=timeout
+        ) as response:
+            self.router.update_limits(name, response.status_code, response.headers)
+            if response.status_code != 200:
+                return response.status_code, None, (await response.aread()).decode("utf-8", "replace")
+            parts, length, truncated = [], 0, False
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                content = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                if content:
+                    if not parts:
+                        self.timeouts.observe_ttfb(name, model, time.perf_counter() - started)
+                    parts.append(content)
+                    length += len(content)
+                    if length >= max_chars:
+                        AI_EARLY_STOPS.labels(name).inc()
+                        truncated = True
+                        break
+        if not truncated:
+            self.timeouts.observe_completion(name, model, time.perf_counter() - started)
+        return 200, fit_to_channel("".join(parts), max_chars, truncated), None
     
-    async def _call_cerebras(self, messages: List[Dict[str, str]], user_id: str = None) -> Optional[str]:
-        """Call Cerebras API for fast response"""
+    async def summarize(self, previous: Optional[str], transcript: str) -> Optional[str]:
+        """Fold newly dropped turns into a conversation's rolling summary (None if no provider answers)"""
         
-        start_time = datetime.now()
+        content = f"Previous summary: {previous}\n\nNew messages:\n{transcript}" if previous else f"Messages:\n{transcript}"
+        messages = SUMMARY_PROMPT.encoded + b"," + encode_message("user", content)
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{settings.cerebras_base_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {settings.cerebras_api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": settings.cerebras_model,
-                        "messages": messages,
-                        "max_tokens": settings.max_tokens,
-                        "temperature": settings.temperature
-                    },
-                    timeout=settings.ai_timeout
-                )
-                
-                duration_ms = (datetime.now() - start_time).total_seconds() * 1000
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    ai_response = result["choices"][0]["message"]["content"]
-                    
-                    log_api_call(self.logger, "Cerebras", "chat/completions", "SUCCESS", duration_ms)
-                    self.logger.info(f"✅ Cerebras response generated ({len(ai_response)} chars)")
-                    
-                    return ai_response
-                else:
-                    log_api_call(self.logger, "Cerebras", "chat/completions", f"HTTP_{response.status_code}", duration_ms)
-                    self.logger.warning(f"Cerebras API returned {response.status_code}: {response.text}")
-                    return None
-                    
-        except asyncio.TimeoutError:
-            duration_ms = (datetime.now() - start_time).total_seconds() * 1000
-            log_api_call(self.logger, "Cerebras", "chat/completions", "TIMEOUT", duration_ms)
-            self.logger.warning("Cerebras API timeout")
-            return None
-        except Exception as e:
-            duration_ms = (datetime.now() - start_time).total_seconds() * 1000
-            log_api_call(self.logger, "Cerebras", "chat/completions", "ERROR", duration_ms)
-            log_error_with_context(self.logger, e, {"service": "cerebras", "user_id": user_id})
-            return None
+        prompt_tokens = SUMMARY_PROMPT.tokens + estimate_tokens(content)
+        for provider in self.router.rank(prompt_tokens, settings.context_summary_tokens):
+            summary = await self._call_provider(provider, messages, self._summary_prefix(provider))
+            if summary:
+                return summary
+        return None
     
-    async def _call_openrouter(self, messages: List[Dict[str, str]], user_id: str = None) -> Optional[str]:
-        """Call OpenRouter API for multilingual support"""
+    async def _call_provider(
+        self, provider: ProviderConfig, messages: bytes, prefix: bytes, user_id: str = None, max_chars: int = None
+    ) -> Optional[str]:
+        """Call one provider's chat completions endpoint; None if it fails"""
         
         start_time = datetime.now()
+        service = provider.title
+        self.router.started(provider.name)
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{settings.openrouter_base_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {settings.openrouter_api_key}",
-                        "Content-Type": "application/json",
-                        "HTTP-Referer": "https://mazungumzo-ai.hackathon",
-                        "X-Title": "Mazungumzo AI Hackathon"
-                    },
-                    json={
-                        "model": settings.openrouter_model,
-                        "messages": messages,
-                        "max_tokens": settings.max_tokens,
-                        "temperature": settings.temperature
-                    },
-                    timeout=settings.ai_timeout
-                )
-                
-                duration_ms = (datetime.now() - start_time).total_seconds() * 1000
+            status_code, ai_response, error_text = await self._post_completion(
+                provider, request_body(prefix, messages), max_chars
+            )
+            
+            duration_ms = (datetime.now() - start_time).total_seconds() * 1000
+            
+            if status_code == 200:
+                self.router.record(provider.name, True, duration_ms / 1000)
+                log_api_call(self.logger, service, "chat/completions", "SUCCESS", duration_ms)
+                self.logger.info(f"✅ {service} response generated ({len(ai_response)} chars)")
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    ai_response = result["choices"][0]["message"]["content"]
-                    
-                    log_api_call(self.logger, "OpenRouter", "chat/completions", "SUCCESS", duration_ms)
-                    self.logger.info(f"✅ OpenRouter response generated ({len(ai_response)} chars)")
-                    
-                    return ai_response
-                else:
-                    log_api_call(self.logger, "OpenRouter", "chat/completions", f"HTTP_{response.status_code}", duration_ms)
-                    self.logger.warning(f"OpenRouter API returned {response.status_code}: {response.text}")
-                    return None
+                return ai_response
+            else:
+                self.router.record(provider.name, False)
+                log_api_call(self.logger, service, "chat/completions", f"HTTP_{status_code}", duration_ms)
+                self.logger.warning(f"{service} API returned {status_code}: {error_text}")
+                return None
                     
+        except asyncio.CancelledError:
+            self._record_cancelled(provider, start_time)
+            raise
         except asyncio.TimeoutError:
+            self.router.record(provider.name, False)
             duration_ms = (datetime.now() - start_time).total_seconds() * 1000
-            log_api_call(self.logger, "OpenRouter", "chat/completions", "TIMEOUT", duration_ms)
-            self.logger.warning("OpenRouter API timeout")
+            log_api_call(self.logger, service, "chat/completions", "TIMEOUT", duration_ms)
+            self.logger.warning(f"{service} API timeout")
             return None
         except Exception as e:
+            self.router.record(provider.name, False)
             duration_ms = (datetime.now() - start_time).total_seconds() * 1000
-            log_api_call(self.logger, "OpenRouter", "chat/completions", "ERROR", duration_ms)
-            log_error_with_context(self.logger, e, {"service": "openrouter", "user_id": user_id})
+            log_api_call(self.logger, service, "chat/completions", "ERROR", duration_ms)
+            log_error_with_context(self.logger, e, {"service": provider.name, "user_id": user_id})
             return None
     
+    def _record_cancelled(self, provider: ProviderConfig, start_time: datetime):
+        """Count a provider call abandoned by its client and the provider time it would still have used"""
+        duration_ms = (datetime.now() - start_time).total_seconds() * 1000
+        typical = AI_DURATION.labels(provider.name, "SUCCESS").quantile(0.5)
+        if typical is None:
+            # No successful calls yet: assume the configured latency
+            typical = provider.expected_latency
+        # The call would have been cut off at the timeout budget anyway
+        typical = min(typical, self.timeouts.budget(provider.name, provider.model).total)
+        saved = max(typical - duration_ms / 1000, 0.0)
+        AI_CANCELLED.labels(provider.name).inc()
+        AI_CANCELLED_SECONDS_SAVED.labels(provider.name).inc(saved)
+        log_api_call(self.logger, provider.title, "chat/completions", "CANCELLED", duration_ms)
+    
     def _get_fallback_response(self, language: str = "en", is_crisis: bool = False) -> str:
         """Get fallback response when AI services are unavailable"""
         
@@ -227,66 +376,38 @@ class AIService:
             return ("I'm sorry, I'm having some technical difficulties right now. "
                    "Please try again later. Is there someone close to you that you can talk to?")
     
+    def _probe_timeout(self, provider: ProviderConfig) -> float:
+        """Health probes ask for 10 tokens, so they get the first-byte budget (capped)"""
+        return min(self.timeouts.budget(provider.name, provider.model).ttfb, settings.health_probe_timeout)
+    
     async def health_check(self) -> Dict[str, any]:
         """Check health of AI services"""
         
-        health_status = {
-            "cerebras": {"available": self.cerebras_available, "status": "unknown"},
-            "openrouter": {"available": self.openrouter_available, "status": "unknown"}
-        }
-        
-        # Quick health check for Cerebras
-        if self.cerebras_available:
-            try:
-                start_time = datetime.now()
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        f"{settings.cerebras_base_url}/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {settings.cerebras_api_key}",
-                            "Content-Type": "application/json"
-                        },
-                        json={
-                            "model": settings.cerebras_model,
-                            "messages": [{"role": "user", "content": "Hello"}],
-                            "max_tokens": 10
-                        },
-                        timeout=5.0
-                    )
-                duration_ms = (datetime.now() - start_time).total_seconds() * 1000
-                health_status["cerebras"]["status"] = "healthy" if response.status_code == 200 else "error"
-                health_status["cerebras"]["response_time_ms"] = duration_ms
-            except Exception as e:
-                health_status["cerebras"]["status"] = "error"
-                health_status["cerebras"]["error"] = str(e)
+        health_status = {}
         
-        # Quick health check for OpenRouter
-        if self.openrouter_available:
+        # Quick health check for each configured provider
+        for provider in self.registry.all():
+            status = health_status[provider.name] = {"available": provider.configured, "status": "unknown"}
+            if not provider.configured:
+                continue
             try:
                 start_time = datetime.now()
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        f"{settings.openrouter_base_url}/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {settings.openrouter_api_key}",
-                            "Content-Type": "application/json"
-                        },
-                        json={
-                            "model": settings.openrouter_model,
-                            "messages": [{"role": "user", "content": "Hello"}],
-                            "max_tokens": 10
-                        },
-                        timeout=5.0
-                    )
+                client = self._http()
+                response = await client.post(
+                    provider.url,
+                    headers=provider.request_headers,
+                    json={
+                        "model": provider.model,
+                        "messages": [{"role": "user", "content": "Hello"}],
+                        "max_tokens": 10
+                    },
+                    timeout=self._probe_timeout(provider)
+                )
                 duration_ms = (datetime.now() - start_time).total_seconds() * 1000
-                health_status["openrouter"]["status"] = "healthy" if response.status_code == 200 else "error"
-                health_status["openrouter"]["response_time_ms"] = duration_ms
+                status["status"] = "healthy" if response.status_code == 200 else "error"
+                status["response_time_ms"] = duration_ms
             except Exception as e:
-                health_status["openrouter"]["status"] = "error"
-                health_status["openrouter"]["error"] = str(e)
+                status["status"] = "error"
+                status["error"] = str(e)
         
         return health_status
-
-
-# Global AI service instance
-ai_service = AIService()
@@ -0,0 +1,194 @@
+# backend/services/container.py
+"""
+Service container for Mazungumzo AI
+
+Each service is registered as a factory and built once, on first use (or
+eagerly in the app lifespan via startup()). Factories import their modules
+lazily, so a service nobody touches never pays for its dependencies, and
+shutdown() closes whatever was built in reverse creation order.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from utils.logging_config import get_logger
+
+logger = get_logger("container")
+
+Hook = Callable[[Any], Union[None, Awaitable[None]]]
+
+
+class ServiceContainer:
+    """Lazily built singletons with startup and shutdown hooks"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._on_start: Dict[str, Hook] = {}
+        self._on_stop: Dict[str, Hook] = {}
+        self._instances: Dict[str, Any] = {}
+        self._order: List[str] = []
+        self.build_ms: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], on_start: Hook = None, on_stop: Hook = None):
+        """Register a factory; on_start runs in startup(), on_stop in shutdown() if the service was built"""
+        self._factories[name] = factory
+        if on_start is not None:
+            self._on_start[name] = on_start
+        if on_stop is not None:
+            self._on_stop[name] = on_stop
+
+    def get(self, name: str) -> Any:
+        """The single instance of a service, building it on first use"""
+        instance = self._instances.get(name)
+        if instance is None:
+            if name not in self._factories:
+                raise KeyError(f"Unknown service: {name}")
+            start = time.perf_counter()
+            instance = self._factories[name]()
+            self.build_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+            self._instances[name] = instance
+            self._order.append(name)
+        return instance
+
+    def __getattr__(self, name: str) -> Any:
+        # container.ai, container.db, ... (only called for names not found normally)
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self.get(name)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def override(self, name: str, instance: Any):
+        """Replace a service instance (e.g. a fake provider in a simulator)"""
+        if name not in self._instances:
+            self._order.append(name)
+        self._instances[name] = instance
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    async def startup(self, *names: str):
+        """Build the named services (all registered ones if none are given) and run their start hooks"""
+        for name in names or list(self._factories):
+            instance = self.get(name)
+            hook = self._on_start.get(name)
+            if hook is not None:
+                result = hook(instance)
+                if asyncio.iscoroutine(result):
+                    await result
+        logger.info(f"✅ Services ready: {', '.join(f'{n} ({self.build_ms.get(n, 0):g}ms)' for n in self._order)}")
+
+    async def shutdown(self):
+        """Run stop hooks for built services in reverse creation order; one failure doesn't stop the rest"""
+        for name in reversed(self._order):
+            hook = self._on_stop.get(name)
+            if hook is None:
+                continue
+            try:
+                result = hook(self._instances[name])
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"⚠️ Stopping {name} failed: {e}")
+
+    def get_stats(self) -> Dict:
+        return {"built": list(self._order), "build_ms": dict(self.build_ms)}
+
+
+# Factories: imports stay inside so registering costs nothing
+
+def _ai_service():
+    from services.ai_service import AIService
+    return AIService()
+
+
+def _database():
+    from services.json_database import JSONDatabase
+    # Files are created here, on first use, so clients that skip the lifespan still get them
+    database = JSONDatabase(sessions=container.session_repository)
+    database.open()
+    return database
+
+
+def _crisis_service():
+    from services.crisis_service import crisis_service
+    return crisis_service
+
+
+def _session_repository():
+    from services.session_repository import session_repository
+    return session_repository
+
+
+def _session_service():
+    from services.session_service import SessionService
+    return SessionService(container.session_repository)
+
+
+def _context_window():
+    from services.context_window import ContextWindowManager
+    return ContextWindowManager(container.session_repository, summarizer=container.ai.summarize)
+
+
+def _whatsapp_service():
+    from services.whatsapp_service import WhatsAppService
+    return WhatsAppService()
+
+
+def _mood_tracker():
+    from services.mood_tracker import mood_tracker
+    return mood_tracker
+
+
+def _population_analytics():
+    from services.population_analytics import PopulationAnalytics
+    return PopulationAnalytics()
+
+
+def _system_sampler():
+    from services.system_metrics import system_sampler
+    return system_sampler
+
+
+def _media_pipeline():
+    from services.media_pipeline import media_pipeline
+    return media_pipeline
+
+
+async def _start_mood_tracker(tracker):
+    tracker.load_snapshot()
+    tracker.snapshot_task = asyncio.create_task(tracker.run_snapshots())
+
+
+async def _stop_mood_tracker(tracker):
+    task: Optional[asyncio.Task] = getattr(tracker, "snapshot_task", None)
+    if task is not None:
+        task.cancel()
+    await tracker.save_snapshot()
+
+
+async def _stop_database(database):
+    from utils.config import settings
+    await database.cleanup_old_sessions(settings.session_cleanup_hours)
+
+
+def build_container() -> ServiceContainer:
+    services = ServiceContainer()
+    services.register("session_repository", _session_repository, on_stop=lambda r: r.flush())
+    services.register("db", _database, on_stop=_stop_database)
+    services.register("ai", _ai_service, on_stop=lambda ai: ai.aclose())
+    services.register("crisis", _crisis_service)
+    services.register("sessions", _session_service)
+    services.register("context", _context_window, on_stop=lambda c: c.shutdown())
+    services.register("whatsapp", _whatsapp_service)
+    services.register("mood_tracker", _mood_tracker, on_start=_start_mood_tracker, on_stop=_stop_mood_tracker)
+    services.register("population_analytics", _population_analytics)
+    services.register("system_sampler", _system_sampler, on_start=lambda s: s.start(), on_stop=lambda s: s.stop())
+    services.register("media_pipeline", _media_pipeline, on_stop=lambda p: p.shutdown())
+    return services
+
+
+# Global service container (started and stopped by the app lifespan)
+container = build_container()
@@ -0,0 +1,139 @@
+# backend/services/context_window.py
+"""
+Token-budgeted context windows with rolling summaries
+
+The prompt history for a turn is the newest messages that fit in a token
+budget (per provider), not a fixed message count. Messages that fall out
+of the window are folded into a rolling summary stored with the session.
+Summaries are produced by a background task, never on the request path: a
+turn uses whatever summary already exists, and the next turn picks up the
+refreshed one.
+"""
+
+import asyncio
+import re
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from models.session_models import ConversationMessage, MessageRole
+from services.prompt_builder import EMPTY_WINDOW, PROMPT_ROLES, SUMMARY_KEY, PromptWindow
+from services.providers import provider_registry
+from services.session_repository import SessionRepository
+from utils.config import settings
+from utils.logging_config import get_logger
+
+logger = get_logger("context_window")
+
+# (previous summary or None, transcript of newly dropped turns) -> summary text or None
+Summarizer = Callable[[Optional[str], str], Awaitable[Optional[str]]]
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def provider_budget(provider: str = None) -> int:
+    """History token budget for a provider (its registry entry's context_tokens)"""
+    config = provider_registry.get(provider) if provider else None
+    return config.history_budget if config is not None else settings.context_token_budget
+
+
+def format_transcript(messages: List[ConversationMessage]) -> str:
+    return "\n".join(
+        f"{'User' if message.role == MessageRole.USER else 'Assistant'}: {message.content}"
+        for message in messages
+    )
+
+
+def local_summary(previous: Optional[str], messages: List[ConversationMessage], max_chars: int) -> str:
+    """Extractive fallback: the first sentence of each user turn, appended to the previous summary"""
+    points = []
+    for message in messages:
+        if message.role == MessageRole.USER:
+            first = _SENTENCE_END.split(message.content.strip(), 1)[0]
+            points.append(first[:120].rstrip(".!?"))
+    text = f"The user said: {'; '.join(points)}." if points else ""
+    if previous:
+        text = f"{previous} {text}".strip()
+    if len(text) > max_chars:
+        # Keep the most recent part, starting at a word boundary
+        text = text[-max_chars:].split(" ", 1)[-1]
+    return text
+
+
+class ContextWindowManager:
+    """Builds budgeted prompt windows and keeps session summaries up to date"""
+
+    def __init__(self, repository: SessionRepository, summarizer: Summarizer = None):
+        self.repository = repository
+        self.summarizer = summarizer
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.stats = {"windows": 0, "summaries": 0, "summary_fallbacks": 0, "summary_errors": 0}
+
+    @property
+    def max_budget(self) -> int:
+        return max([provider.history_budget for provider in provider_registry.configured()] + [provider_budget()])
+
+    def window(self, user_id: str) -> PromptWindow:
+        """
+        History for the next AI request, fitted to the largest provider budget
+
+        AIService narrows it per provider with PromptWindow.fit(). When enough
+        dropped messages are not yet in the summary, a refresh is scheduled.
+        """
+        builder = self.repository.prompt_builder(user_id)
+        if builder is None:
+            return EMPTY_WINDOW
+        self.stats["windows"] += 1
+        window = builder.window(settings.context_max_messages, self.max_budget)
+        if window.unsummarized >= settings.context_summary_min_messages:
+            self.schedule_summary(user_id, window.start)
+        return window
+
+    def schedule_summary(self, user_id: str, upto: int):
+        """Summarize messages before position `upto` in the background (one task per user)"""
+        if user_id in self._tasks:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._summarize(user_id, upto))
+        except RuntimeError:
+            return
+        self._tasks[user_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(user_id, None))
+
+    async def _summarize(self, user_id: str, upto: int):
+        builder = self.repository.prompt_builder(user_id)
+        session = self.repository.get(user_id)
+        if builder is None or session is None or upto <= builder.summarized_upto:
+            return
+
+        history = session.conversation_history[builder.index(builder.summarized_upto):builder.index(upto)]
+        messages = [message for message in history if message.role in PROMPT_ROLES]
+        if not messages:
+            return
+        previous = (session.session_metadata.get(SUMMARY_KEY) or {}).get("text")
+
+        text = None
+        if self.summarizer is not None:
+            try:
+                text = await self.summarizer(previous, format_transcript(messages))
+            except Exception as e:
+                self.stats["summary_errors"] += 1
+                logger.warning(f"⚠️ Summary for {user_id} failed, using local summary: {e}")
+        if not text:
+            self.stats["summary_fallbacks"] += 1
+            text = local_summary(previous, messages, settings.context_summary_max_chars)
+        text = text.strip()[:settings.context_summary_max_chars]
+
+        builder.set_summary(text, upto)
+        session.session_metadata[SUMMARY_KEY] = {"text": text, "until": messages[-1].timestamp.isoformat()}
+        self.repository.mark_changed()
+        self.stats["summaries"] += 1
+        logger.info(f"📝 Summarized {len(messages)} earlier messages for {user_id} ({len(text)} chars)")
+
+    async def shutdown(self):
+        """Cancel summaries still running"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "summaries_running": len(self._tasks), "max_budget_tokens": self.max_budget}
@@ -8,10 +8,10 @@ import re
 from typing import Tuple, List, Dict, Any
 from datetime import datetime
 
-from ..utils.config import settings
-from ..utils.logging_config import get_logger, log_crisis_detection, log_performance
-from ..utils.constants import ALL_CRISIS_KEYWORDS, CRISIS_KEYWORDS, HELP_CATEGORIES
-from ..models.session_models import UserSession
+from utils.config import settings
+from utils.logging_config import get_logger, log_crisis_detection, log_performance
+from utils.constants import ALL_CRISIS_KEYWORDS, CRISIS_KEYWORDS, HELP_CATEGORIES
+from models.session_models import UserSession
 
 
 class CrisisDetectionService:
@@ -28,7 +28,6 @@ class CrisisDetectionService:
         }
         self.logger.info(f"✅ Crisis Detection Service initialized with {len(self.crisis_keywords)} keywords")
     
-    @log_performance("crisis_detect")
     def detect_crisis(self, message: str, user_session: UserSession = None) -> Tuple[bool, float, List[str]]:
         """
         Detect crisis indicators in a message
@@ -41,7 +40,22 @@ class CrisisDetectionService:
             Tuple of (is_crisis, confidence_score, detected_keywords)
         """
         
-        message_lower = message.lower().strip()
+        return self.detect_crisis_normalized(message.lower().strip(), user_session, message)
+    
+    @log_performance("crisis_detect")
+    def detect_crisis_normalized(
+        self,
+        message_lower: str,
+        user_session: UserSession = None,
+        original_message: str = None
+    ) -> Tuple[bool, float, List[str]]:
+        """
+        Crisis detection on text that is already lowercased and stripped
+        
+        Lets the shared message-analysis pipeline reuse its normalized text
+        instead of lowercasing the message again.
+        """
+        
         detected_keywords = []
         crisis_score = 0.0
         severity_multiplier = 1.0
@@ -86,7 +100,7 @@ class CrisisDetectionService:
             
             # Flag crisis in user session
             if user_session:
-                user_session.flag_crisis(confidence, detected_keywords, message)
+                user_session.flag_crisis(confidence, detected_keywords, original_message or message_lower)
         
         self.logger.debug(f"Crisis detection: score={crisis_score:.2f}, confidence={confidence:.2f}, is_crisis={is_crisis}")
         
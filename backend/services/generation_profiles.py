@@ -0,0 +1,102 @@
+# backend/services/generation_profiles.py
+"""
+Per-platform generation profiles for Mazungumzo AI
+
+Replies are delivered through channels with hard length limits
+(MESSAGE_LIMITS: SMS 160 characters, WhatsApp 1600, web 2000). A profile
+turns a channel's limit into the completion parameters (max_tokens, stop
+sequences) and the character budget at which a streamed reply is cut off,
+so short channels don't wait for, or pay for, text that would be split or
+thrown away.
+"""
+
+import math
+import re
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+from utils.config import settings
+from utils.constants import MESSAGE_LIMITS
+
+
+class GenerationProfile(NamedTuple):
+    platform: str
+    max_chars: int  # channel budget for one reply
+    max_tokens: int
+    stop: Tuple[str, ...]
+    stream: bool  # stream the completion and stop reading once max_chars is reached
+
+
+PLATFORM_LIMITS = {
+    "sms": MESSAGE_LIMITS["sms_max_length"],
+    "whatsapp": MESSAGE_LIMITS["whatsapp_max_length"],
+    "web": MESSAGE_LIMITS["web_max_length"],
+}
+
+# Single-message channels stop at the end of the first paragraph
+PLATFORM_STOPS = {
+    "sms": ("\n\n",),
+}
+
+_SENTENCE_END = re.compile(r"[.!?](?=\s|$)")
+
+
+def _build_profile(platform: str, is_crisis: bool) -> GenerationProfile:
+    max_chars = PLATFORM_LIMITS.get(platform, PLATFORM_LIMITS["web"])
+    stop = PLATFORM_STOPS.get(platform, ())
+    if is_crisis:
+        # Crisis replies must carry the helpline details, even across several SMS
+        max_chars = max(max_chars, MESSAGE_LIMITS["crisis_alert_max"])
+        stop = ()
+    max_tokens = min(settings.max_tokens, math.ceil(max_chars / settings.ai_chars_per_token))
+    # Only worth streaming when the channel can end the reply before max_tokens does
+    stream = settings.ai_stream_cutoff and max_tokens * settings.ai_chars_per_token > max_chars * 0.8
+    return GenerationProfile(platform, max_chars, max_tokens, stop, stream)
+
+
+_PROFILES: Dict[Tuple[str, bool], GenerationProfile] = {
+    (platform, is_crisis): _build_profile(platform, is_crisis)
+    for platform in PLATFORM_LIMITS
+    for is_crisis in (False, True)
+}
+
+
+def generation_profile(platform: Optional[str] = "web", is_crisis: bool = False) -> GenerationProfile:
+    """Profile for a delivery channel (unknown channels get the web profile)"""
+    return _PROFILES.get((platform or "web", is_crisis)) or _PROFILES[("web", is_crisis)]
+
+
+def fit_to_channel(text: str, max_chars: int, truncated: bool = False) -> str:
+    """
+    Cut a reply to max_chars, preferring the last full sentence, then the last whole word
+
+    truncated marks text whose generation was stopped early, so its last
+    sentence is incomplete even when it fits.
+    """
+    text = text.strip()
+    if len(text) <= max_chars and not truncated:
+        return text
+    head = text[:max_chars]
+    sentence_ends = [match.end() for match in _SENTENCE_END.finditer(head)]
+    if sentence_ends and sentence_ends[-1] >= max_chars // 2:
+        return head[:sentence_ends[-1]]
+    cut = head[:max_chars - 1].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:") + "…"
+
+
+def compose_for_channel(reply: str, max_chars: int, prefix: str = None, extras: Sequence[str] = ()) -> str:
+    """
+    Assemble a reply with the text added around it, within max_chars
+
+    The prefix (e.g. a crisis template) is always kept and the reply is fitted
+    to the room left after it; extras (mood or cultural notes) are appended
+    only where they still fit.
+    """
+    head = f"{prefix.strip()}\n\n" if prefix else ""
+    room = max_chars - len(head)
+    if room <= 0:
+        return fit_to_channel(prefix, max_chars)
+    text = head + fit_to_channel(reply, room)
+    for extra in extras:
+        if len(text) + 2 + len(extra) <= max_chars:
+            text += f"\n\n{extra}"
+    return text
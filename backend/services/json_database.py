@@ -18,59 +18,55 @@ from typing import Dict, List, Optional, Any
 import logging
 from pathlib import Path
 
+from models.session_models import ConversationMessage, MessageRole, UserSession
+from services.container import container
+from services.session_repository import SessionRepository, session_repository
+from services.prompt_builder import PromptWindow
+from utils.tracing import span
+
 logger = logging.getLogger(__name__)
 
 class JSONDatabase:
     """
     Simple file-based JSON database
     Thread-safe and perfect for hackathon demos
+    
+    Conversations are kept by the shared SessionRepository; this class
+    stores crisis events, statistics and resources.
     """
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", sessions: SessionRepository = None):
         self.data_dir = Path(data_dir)
-        self.data_dir.mkdir(exist_ok=True)
+        self.sessions = sessions if sessions is not None else session_repository
         
         # Database files
         self.files = {
-            "sessions": self.data_dir / "user_sessions.json",
             "crisis_events": self.data_dir / "crisis_events.json", 
             "stats": self.data_dir / "usage_stats.json",
             "resources": self.data_dir / "mental_health_resources.json"
         }
         
-        # Initialize files if they don't exist
-        self._initialize_files()
-        
-        # In-memory cache for performance
+        # In-memory cache for performance (must exist before the defaults are written)
         self._cache = {}
+    
+    def open(self):
+        """Create missing files with default data and load everything into the cache"""
+        self._initialize_files()
         self._load_all_to_cache()
-        
         logger.info(f"✅ JSON Database initialized at {self.data_dir}")
     
     def _initialize_files(self):
         """Create initial JSON files with default data"""
+        self.data_dir.mkdir(exist_ok=True)
         
-        # Default user sessions structure
-        if not self.files["sessions"].exists():
-            default_sessions = {
-                "demo_user_12345": {
-                    "user_id": "demo_user_12345",
-                    "created_at": datetime.now().isoformat(),
-                    "last_active": datetime.now().isoformat(),
-                    "conversation_history": [
-                        {
-                            "role": "assistant",
-                            "content": "Hujambo! Mimi ni Mazungumzo. Unahisije leo?",
-                            "timestamp": datetime.now().isoformat(),
-                            "language": "sw"
-                        }
-                    ],
-                    "mood_scores": [0],
-                    "crisis_flags": 0,
-                    "platform": "web"
-                }
-            }
-            self._write_json("sessions", default_sessions)
+        # Demo session on a fresh install
+        if not self.sessions.backend.exists() and not len(self.sessions):
+            self.sessions.append(
+                "demo_user_12345",
+                MessageRole.ASSISTANT,
+                "Hujambo! Mimi ni Mazungumzo. Unahisije leo?",
+                {"language": "sw"}
+            )
         
         # Crisis events log
         if not self.files["crisis_events"].exists():
@@ -161,7 +157,7 @@ class JSONDatabase:
     def _write_json(self, key: str, data: Dict):
         """Write data to JSON file and update cache"""
         try:
-            with open(self.files[key], 'w', encoding='utf-8') as f:
+            with span(f"db.write.{key}"), open(self.files[key], 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
             self._cache[key] = data
             logger.debug(f"✅ Saved {key} to JSON")
@@ -169,72 +165,53 @@ class JSONDatabase:
             logger.error(f"❌ Failed to save {key}: {e}")
     
     # User Session Management
-    async def get_user_session(self, user_id: str) -> Optional[Dict]:
+    async def get_user_session(self, user_id: str) -> Optional[UserSession]:
         """Get user conversation session"""
-        sessions = self._cache.get("sessions", {})
-        return sessions.get(user_id)
+        return self.sessions.get(user_id)
     
-    async def create_user_session(self, user_id: str, platform: str = "web") -> Dict:
+    async def create_user_session(self, user_id: str, platform: str = "web") -> UserSession:
         """Create new user session"""
-        session = {
-            "user_id": user_id,
-            "created_at": datetime.now().isoformat(),
-            "last_active": datetime.now().isoformat(),
-            "conversation_history": [],
-            "mood_scores": [],
-            "crisis_flags": 0,
-            "platform": platform
-        }
-        
-        sessions = self._cache.get("sessions", {})
-        sessions[user_id] = session
-        self._write_json("sessions", sessions)
+        session, created = self.sessions.get_or_create(user_id, platform)
         
         # Update stats
-        await self.increment_stat("total_users")
+        if created:
+            await self.increment_stat("total_users")
         
         return session
     
     async def update_user_session(self, user_id: str, updates: Dict):
         """Update user session data"""
-        sessions = self._cache.get("sessions", {})
+        session = self.sessions.get(user_id)
         
-        if user_id in sessions:
-            sessions[user_id].update(updates)
-            sessions[user_id]["last_active"] = datetime.now().isoformat()
-            self._write_json("sessions", sessions)
+        if session:
+            for field, value in updates.items():
+                setattr(session, field, value)
+            self.sessions.touch(session)
         else:
             logger.warning(f"User session {user_id} not found for update")
     
+    async def get_conversation_history(self, user_id: str, limit: int = None) -> List[ConversationMessage]:
+        """Recent conversation messages, ready to pass to the AI service"""
+        return self.sessions.history(user_id, limit)
+    
+    async def get_prompt_window(self, user_id: str, limit: int = None) -> PromptWindow:
+        """Recent conversation history already encoded for the AI request"""
+        return self.sessions.prompt_window(user_id, limit)
+    
     async def add_message_to_session(
         self, 
         user_id: str, 
         role: str, 
         content: str, 
-        language: str = "en"
+        language: str = "en",
+        metadata: Dict[str, Any] = None
     ):
         """Add message to user conversation history"""
-        session = await self.get_user_session(user_id)
-        
-        if not session:
-            session = await self.create_user_session(user_id)
-        
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat(),
-            "language": language
-        }
+        if self.sessions.get(user_id) is None:
+            await self.create_user_session(user_id)
         
-        # Add to conversation history
-        session["conversation_history"].append(message)
-        
-        # Keep only last 50 messages per session
-        if len(session["conversation_history"]) > 50:
-            session["conversation_history"] = session["conversation_history"][-50:]
-        
-        # Update session
-        await self.update_user_session(user_id, session)
+        # The repository keeps only the most recent SESSION_MAX_MESSAGES
+        self.sessions.append(user_id, role, content, {"language": language, **(metadata or {})})
         
         # Update global stats
         await self.increment_stat("total_messages")
@@ -264,10 +241,10 @@ class JSONDatabase:
         self._write_json("crisis_events", crisis_data)
         
         # Update user session crisis flag
-        session = await self.get_user_session(user_id)
+        session = self.sessions.get(user_id)
         if session:
-            session["crisis_flags"] = session.get("crisis_flags", 0) + 1
-            await self.update_user_session(user_id, session)
+            session.flag_crisis(confidence, [], message)
+            self.sessions.touch(session)
         
         # Update global stats
         await self.increment_stat("crisis_interventions")
@@ -303,13 +280,13 @@ class JSONDatabase:
         stats = self._cache.get("stats", {})
         
         # Add real-time calculations
-        sessions = self._cache.get("sessions", {})
+        session_count = len(self.sessions)
         crisis_events = self._cache.get("crisis_events", {})
         
         real_time_stats = {
             **stats,
-            "active_users": len(sessions),
-            "total_conversations": len(sessions),
+            "active_users": session_count,
+            "total_conversations": session_count,
             "recent_crisis_events": len([
                 e for e in crisis_events.get("events", [])
                 if datetime.fromisoformat(e["timestamp"]) > datetime.now() - timedelta(hours=24)
@@ -346,52 +323,40 @@ class JSONDatabase:
     # Utility Methods
     async def cleanup_old_sessions(self, days: int = 7):
         """Clean up old sessions (for production)"""
-        sessions = self._cache.get("sessions", {})
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        cleaned_sessions = {}
-        removed_count = 0
-        
-        for user_id, session in sessions.items():
-            last_active = datetime.fromisoformat(session["last_active"])
-            if last_active > cutoff_date:
-                cleaned_sessions[user_id] = session
-            else:
-                removed_count += 1
+        removed_count = self.sessions.cleanup(days * 86400)
         
         if removed_count > 0:
-            self._write_json("sessions", cleaned_sessions)
             logger.info(f"🧹 Cleaned up {removed_count} old sessions")
     
     async def export_demo_data(self) -> Dict:
         """Export data for hackathon demo purposes"""
         return {
-            "sessions_count": len(self._cache.get("sessions", {})),
-            "total_messages": sum(
-                len(session.get("conversation_history", []))
-                for session in self._cache.get("sessions", {}).values()
-            ),
+            "sessions_count": len(self.sessions),
+            "total_messages": self.sessions.message_count(),
             "crisis_events": len(self._cache.get("crisis_events", {}).get("events", [])),
             "resources_loaded": len(self._cache.get("resources", {})),
-            "data_files": [str(f) for f in self.files.values()],
+            "data_files": [str(f) for f in self.files.values()] + [str(getattr(self.sessions.backend, "path", "memory"))],
             "cache_status": "loaded" if self._cache else "empty"
         }
 
-# Global database instance
-db = JSONDatabase()
-
-# Convenience functions for easy import
+# Convenience functions for easy import (the database itself is built and opened by the container)
 async def get_user_session(user_id: str):
-    return await db.get_user_session(user_id)
+    return await container.db.get_user_session(user_id)
+
+async def add_message(user_id: str, role: str, content: str, language: str = "en", metadata: Dict[str, Any] = None):
+    return await container.db.add_message_to_session(user_id, role, content, language, metadata)
+
+async def get_history(user_id: str, limit: int = None):
+    return await container.db.get_conversation_history(user_id, limit)
 
-async def add_message(user_id: str, role: str, content: str, language: str = "en"):
-    return await db.add_message_to_session(user_id, role, content, language)
+async def get_prompt_window(user_id: str, limit: int = None):
+    return await container.db.get_prompt_window(user_id, limit)
 
 async def log_crisis(user_id: str, message: str, confidence: float):
-    return await db.log_crisis_event(user_id, message, confidence)
+    return await container.db.log_crisis_event(user_id, message, confidence)
 
 async def get_stats():
-    return await db.get_stats()
+    return await container.db.get_stats()
 
 async def get_crisis_resources():
-    return await db.get_crisis_resources()
\ No newline at end of file
+    return await container.db.get_crisis_resources()
\ No newline at end of file
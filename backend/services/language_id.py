@@ -0,0 +1,254 @@
+# backend/services/language_id.py
+"""
+Fast, deterministic language identification for English, Swahili and Somali
+
+Replaces per-message langdetect calls with a small character n-gram model:
+- Trigram/bigram log-probability tables are precomputed once at import from
+  embedded seed text, so there is no lazy profile loading on the first message
+- Each word votes for a language, which makes code-switched (Sheng/Kiswahili
+  + English) messages visible instead of forcing a single label
+- Results for identical text are cached, and each user keeps a sticky
+  preference so short replies like "sawa" or "ok" don't flip the language
+"""
+
+import math
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+LANGUAGES = ("en", "sw", "so")
+
+LANGUAGE_NAMES = {
+    "en": "english",
+    "sw": "swahili",
+    "so": "somali",
+}
+
+# Seed text used to build the n-gram tables
+SEED_TEXT = {
+    "en": """
+        i feel so sad and tired today and i do not know what to do
+        my family does not understand me and i feel alone
+        i am stressed about work and money and i cannot sleep at night
+        thank you for listening to me i really needed someone to talk to
+        what should i do when i feel anxious and my heart is racing
+        i lost my job last month and everything has been hard since then
+        sometimes i think nobody cares about me or what happens to me
+        how can i stop overthinking everything before exams
+        my friends have been supportive but i still feel empty inside
+        it is hard to get out of bed in the morning these days
+        i want to feel better and be happy again with my children
+        the pressure from school and my parents is too much for me
+        i have been worried about my health and the future
+        can you help me find a counsellor near nairobi
+        good morning how are you doing today
+        i think i am getting better slowly thanks to the breathing exercises
+        my husband and i keep fighting and i do not feel safe at home
+        there is no point in trying anymore everything feels hopeless
+        please tell me where i can get help right now
+        i feel like a burden to everyone around me
+    """,
+    "sw": """
+        ninajisikia vibaya sana leo na sijui la kufanya
+        familia yangu hainielewi na ninahisi niko peke yangu
+        nina wasiwasi mkubwa kuhusu kazi na pesa na siwezi kulala usiku
+        asante kwa kunisikiliza nilihitaji mtu wa kuongea naye
+        nifanye nini ninapohisi hofu na moyo wangu unadunda haraka
+        nilipoteza kazi yangu mwezi uliopita na maisha yamekuwa magumu
+        wakati mwingine nafikiri hakuna mtu anayenijali
+        ninawezaje kuacha kufikiria sana kabla ya mitihani
+        marafiki zangu wananisaidia lakini bado najiskia mtupu ndani
+        ni vigumu kuamka kitandani asubuhi siku hizi
+        nataka kujisikia vizuri na kuwa na furaha tena na watoto wangu
+        shinikizo kutoka shuleni na kwa wazazi wangu ni nyingi mno
+        nimekuwa na wasiwasi kuhusu afya yangu na siku zijazo
+        unaweza kunisaidia kupata mshauri karibu na nairobi
+        habari za asubuhi hujambo leo unajisikiaje
+        nadhani ninapata nafuu polepole kwa sababu ya mazoezi ya kupumua
+        mume wangu na mimi tunagombana kila siku na sijisikii salama nyumbani
+        hakuna maana ya kujaribu tena kila kitu hakina tumaini
+        tafadhali niambie wapi naweza kupata msaada sasa hivi
+        nahisi mimi ni mzigo kwa kila mtu karibu nami
+        mambo vipi niko poa sana lakini nimechoka na maisha
+        moyo wangu unaumwa na sina amani kabisa
+    """,
+    "so": """
+        waxaan dareemayaa murugo badan maanta mana garanayo waxaan sameeyo
+        qoyskaygu ima fahmaan waxaanan dareemayaa inaan keligay ahay
+        waxaan ka walwalsanahay shaqada iyo lacagta habeenkiina ma seexan karo
+        aad baad u mahadsan tahay inaad i dhagaysato waxaan u baahnaa qof aan la hadlo
+        maxaan sameeyaa markaan dareemo cabsi oo wadnahaygu si degdeg ah u garaaco
+        shaqadaydii ayaan waayay bishii hore wax walbana way adkaadeen
+        mararka qaarkood waxaan u maleeyaa in qofna aanu i danaynin
+        sidee baan u joojin karaa inaan wax badan ka fekero imtixaanka ka hor
+        saaxiibbaday way i caawiyeen laakiin weli waxaan dareemayaa madhnaan
+        way adag tahay inaan sariirta ka kaco subaxdii maalmahan
+        waxaan doonayaa inaan fiicnaado oo aan mar kale la farxo carruurtayda
+        cadaadiska dugsiga iyo waalidkay aad buu iigu badan yahay
+        waxaan ka welwelsanahay caafimaadkayga iyo mustaqbalka
+        ma i caawin kartaa inaan helo lataliye u dhow nairobi
+        subax wanaagsan sidee tahay maanta
+        waxaan u maleynayaa inaan si tartiib ah u soo fiicnaanayo
+        nabad ma haysto gurigayga waana daalanahay
+        fadlan ii sheeg meesha aan hadda caawimaad ka heli karo
+    """,
+}
+
+# High-frequency function words that are strong evidence on their own
+FUNCTION_WORDS = {
+    "en": {
+        "the", "and", "i", "you", "is", "to", "my", "me", "a", "of", "it", "in", "that",
+        "am", "are", "have", "with", "for", "but", "so", "what", "how", "this", "not",
+        "do", "feel", "can", "don't", "i'm", "please", "today", "help", "good", "job",
+    },
+    "sw": {
+        "na", "ya", "wa", "kwa", "ni", "nina", "sana", "mimi", "wewe", "yangu", "hii",
+        "kuhusu", "lakini", "je", "hapana", "ndiyo", "leo", "kama", "tu", "hakuna",
+        "sijui", "sina", "niko", "poa", "sawa", "habari", "mambo", "asante", "pole",
+        "nataka", "nini", "vipi", "tena", "kazi", "msaada", "hujambo",
+    },
+    "so": {
+        "waxaan", "iyo", "ku", "u", "ma", "aad", "waa", "oo", "ayaa", "waan", "maanta",
+        "sidee", "qof", "ah", "baan", "ka", "iga", "ii", "way", "fadlan", "nabad", "haa",
+        "maya", "mahadsan", "tahay",
+    },
+}
+
+FUNCTION_WORD_BONUS = 2.5
+WORD_RE = re.compile(r"[a-z']+")
+
+
+def _ngrams(word: str, n: int) -> List[str]:
+    padded = f" {word} "
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+def _build_tables() -> Dict[str, Dict[int, Tuple[Dict[str, float], float]]]:
+    """Precompute add-one smoothed log-probabilities for bigrams and trigrams"""
+    tables = {}
+    for language, text in SEED_TEXT.items():
+        words = WORD_RE.findall(text.lower())
+        tables[language] = {}
+        for n in (2, 3):
+            counts = Counter(gram for word in words for gram in _ngrams(word, n))
+            denominator = sum(counts.values()) + len(counts) + 1
+            log_probs = {gram: math.log((count + 1) / denominator) for gram, count in counts.items()}
+            tables[language][n] = (log_probs, math.log(1 / denominator))
+    return tables
+
+
+_TABLES = _build_tables()
+
+
+@dataclass(frozen=True)
+class LanguageGuess:
+    """Result of language identification"""
+    language: str  # en, sw or so
+    confidence: float  # share of word votes for the winning language
+    code_switched: bool
+    shares: Tuple[Tuple[str, float], ...]
+
+    @property
+    def name(self) -> str:
+        return LANGUAGE_NAMES[self.language]
+
+
+@lru_cache(maxsize=32768)
+def _word_votes(word: str) -> Dict[str, float]:
+    """Per-language probability for one word (softmax over n-gram scores)"""
+    scores = {}
+    for language in LANGUAGES:
+        score = 0.0
+        for n, weight in ((3, 1.0), (2, 0.5)):
+            log_probs, unseen = _TABLES[language][n]
+            grams = _ngrams(word, n)
+            score += weight * sum(log_probs.get(gram, unseen) for gram in grams) / len(grams)
+        if word in FUNCTION_WORDS[language]:
+            score += FUNCTION_WORD_BONUS
+        scores[language] = score
+
+    top = max(scores.values())
+    exps = {language: math.exp(score - top) for language, score in scores.items()}
+    total = sum(exps.values())
+    return {language: value / total for language, value in exps.items()}
+
+
+@lru_cache(maxsize=8192)
+def _identify_normalized(normalized: str) -> LanguageGuess:
+    words = normalized.split()
+    if not words:
+        return LanguageGuess("en", 0.0, False, tuple((lang, 0.0) for lang in LANGUAGES))
+
+    totals = dict.fromkeys(LANGUAGES, 0.0)
+    for word in words:
+        for language, vote in _word_votes(word).items():
+            totals[language] += vote
+
+    shares = sorted(((lang, total / len(words)) for lang, total in totals.items()),
+                    key=lambda item: item[1], reverse=True)
+    (best, best_share), (runner_up, runner_share) = shares[0], shares[1]
+    code_switched = len(words) >= 3 and {best, runner_up} == {"en", "sw"} and runner_share >= 0.25
+
+    return LanguageGuess(
+        language=best,
+        confidence=round(best_share, 4),
+        code_switched=code_switched,
+        shares=tuple((lang, round(share, 4)) for lang, share in shares)
+    )
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and keep only letter runs, so cache keys ignore punctuation and emoji"""
+    return " ".join(WORD_RE.findall(text.lower()))
+
+
+def identify_language(text: str) -> LanguageGuess:
+    """Identify the dominant language of a message (cached)"""
+    return _identify_normalized(normalize_text(text))
+
+
+class LanguageIdentifier:
+    """Language identification with a per-user sticky preference"""
+
+    def __init__(self, max_users: int = 50000, switch_confidence: float = 0.6, min_words: int = 3):
+        self.max_users = max_users
+        self.switch_confidence = switch_confidence
+        self.min_words = min_words
+        self._preferences: "OrderedDict[str, str]" = OrderedDict()
+
+    def detect(self, text: str, user_id: Optional[str] = None, declared: Optional[str] = None) -> LanguageGuess:
+        """
+        Identify the language a turn is in: the effective language for the
+        reply, the stored turn and analytics
+
+        When the message is too short or too ambiguous to decide on its own,
+        this leans on the user's previous language, then on the language the
+        client declared.
+        """
+        guess = identify_language(text)
+        preferred = self._preferences.get(user_id) if user_id is not None else None
+        fallback = preferred or (declared if declared in LANGUAGES else None)
+        decisive = guess.confidence >= self.switch_confidence and len(text.split()) >= self.min_words
+
+        if fallback and fallback != guess.language and not decisive:
+            guess = LanguageGuess(fallback, guess.confidence, guess.code_switched, guess.shares)
+        elif user_id is not None:
+            self._preferences[user_id] = guess.language
+
+        if user_id in self._preferences:
+            self._preferences.move_to_end(user_id)
+            while len(self._preferences) > self.max_users:
+                self._preferences.popitem(last=False)
+        return guess
+
+    def get_preference(self, user_id: str) -> Optional[str]:
+        return self._preferences.get(user_id)
+
+    def forget(self, user_id: str):
+        self._preferences.pop(user_id, None)
+
+
+# Global language identifier instance
+language_identifier = LanguageIdentifier()
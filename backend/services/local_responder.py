@@ -0,0 +1,205 @@
+# backend/services/local_responder.py
+"""
+Local degraded-mode responder for Mazungumzo AI
+
+When every provider fails, is rate limited, or the service is overloaded,
+replies come from here instead of a single static apology. The responder
+is CPU-only and needs no network: it tags the message's topic (the
+MENTAL_HEALTH_TOPICS keywords plus the Swahili expressions in
+KENYAN_EXPRESSIONS), then assembles a reply from RESPONSE_TEMPLATES and a
+small snippet corpus indexed by (topic, language). A reply is a few dict
+lookups and string joins, well under a millisecond.
+
+Crisis messages are not answered here; AIService keeps them on the real
+providers and falls back to the vetted crisis text with helpline numbers.
+"""
+
+import re
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from utils.constants import KENYAN_EXPRESSIONS, MENTAL_HEALTH_TOPICS, RESPONSE_TEMPLATES
+
+_TOKEN_RE = re.compile(r"[\w']+")
+
+GENERAL_TOPIC = "general"
+
+# Swahili expressions (KENYAN_EXPRESSIONS["emotions"]) and the topic they point to
+EXPRESSION_TOPICS = {
+    "najiskia vibaya": "depression",
+    "nina wasiwasi": "anxiety",
+    "nimechoka": "depression",
+    "sina amani": "anxiety",
+    "moyo wangu unaumwa": "relationships",
+}
+
+# Swahili topic words not covered by MENTAL_HEALTH_TOPICS
+SWAHILI_TOPIC_WORDS = {
+    "depression": ["huzuni", "nimechoka", "uchovu", "usingizi"],
+    "anxiety": ["wasiwasi", "hofu", "woga", "msongo"],
+    "trauma": ["ndoto", "vurugu", "ajali", "kudhulumiwa"],
+    "relationships": ["upweke", "familia", "marafiki", "mpenzi", "ndoa"],
+    "work_stress": ["kazi", "bosi", "ajira", "shule", "mtihani"],
+    "financial": ["pesa", "deni", "madeni", "karo", "kodi"],
+}
+
+# Coping prompts by (topic, language)
+SNIPPETS: Dict[Tuple[str, str], Tuple[str, ...]] = {
+    ("depression", "en"): (
+        "When everything feels heavy, one small step counts: a glass of water, a short walk, or opening a window.",
+        "Low days can make rest feel impossible. Try keeping the same sleep and wake time for a few days.",
+        "It can help to name one thing, however small, that you got through today.",
+    ),
+    ("depression", "sw"): (
+        "Mambo yanapokuwa mazito, hatua ndogo ina maana: glasi ya maji, matembezi mafupi, au kufungua dirisha.",
+        "Siku ngumu hufanya kupumzika kuwe vigumu. Jaribu kulala na kuamka saa zile zile kwa siku chache.",
+        "Inaweza kusaidia kutaja jambo moja, hata dogo, ulilofanikiwa leo.",
+    ),
+    ("anxiety", "en"): (
+        "Try breathing in for four counts, holding for four, and breathing out for six. Repeat it a few times.",
+        "When worries pile up, writing them down can make them smaller. Which one feels most urgent?",
+        "Grounding can help: name five things you can see, four you can hear and three you can touch.",
+    ),
+    ("anxiety", "sw"): (
+        "Jaribu kuvuta pumzi kwa hesabu nne, shikilia kwa nne, kisha toa pumzi kwa sita. Rudia mara chache.",
+        "Wasiwasi unapozidi, kuuandika kunaweza kuupunguza. Ni lipi linalokusumbua zaidi?",
+        "Taja vitu vitano unavyoviona, vinne unavyosikia na vitatu unavyoweza kugusa.",
+    ),
+    ("trauma", "en"): (
+        "What happened was not your fault. You can share only as much as feels safe.",
+        "If memories come back strongly, notice your feet on the ground and your breathing, and remind yourself where you are now.",
+    ),
+    ("trauma", "sw"): (
+        "Yaliyotokea si kosa lako. Unaweza kusema kiasi tu unachohisi ni salama.",
+        "Kumbukumbu zikirudi kwa nguvu, hisi miguu yako ardhini na pumzi yako, na ujikumbushe ulipo sasa.",
+    ),
+    ("relationships", "en"): (
+        "Feeling alone is hard. Is there one person, a friend, relative or neighbour, you could reach out to today?",
+        "Relationships can hurt deeply. It may help to talk about what you need from the people around you.",
+    ),
+    ("relationships", "sw"): (
+        "Upweke ni mgumu. Je, kuna mtu mmoja, rafiki, ndugu au jirani, unayeweza kumtafuta leo?",
+        "Mahusiano yanaweza kuumiza sana. Inaweza kusaidia kuzungumza kuhusu unachohitaji kutoka kwa walio karibu nawe.",
+    ),
+    ("work_stress", "en"): (
+        "Pressure at work or school adds up. Could you split the next task into one small piece for today?",
+        "Short breaks between tasks, even five minutes, can make a long day more manageable.",
+    ),
+    ("work_stress", "sw"): (
+        "Shinikizo la kazi au shule huongezeka. Je, unaweza kugawa kazi inayofuata iwe kipande kidogo cha leo?",
+        "Mapumziko mafupi kati ya kazi, hata dakika tano, yanaweza kufanya siku ndefu iwe nyepesi.",
+    ),
+    ("financial", "en"): (
+        "Money worries weigh on everything. Writing down what is due first can make the next step clearer.",
+        "Many people face money stress quietly. A chama, a trusted relative or a church group can sometimes help plan.",
+    ),
+    ("financial", "sw"): (
+        "Wasiwasi wa pesa huathiri kila kitu. Kuandika kinachohitajika kwanza kunaweza kuonyesha hatua inayofuata.",
+        "Watu wengi hupitia shida za pesa kimya kimya. Chama, ndugu unayemwamini au kikundi cha kanisa kinaweza kusaidia kupanga.",
+    ),
+    (GENERAL_TOPIC, "en"): (
+        "Take a slow breath with me. What is weighing on you most right now?",
+        "Sometimes just putting feelings into words helps. Tell me more about what has been happening.",
+    ),
+    (GENERAL_TOPIC, "sw"): (
+        "Vuta pumzi polepole. Ni nini kinachokulemea zaidi sasa hivi?",
+        "Wakati mwingine kueleza hisia kwa maneno husaidia. Niambie zaidi kuhusu kinachoendelea.",
+    ),
+}
+
+GREETING_REPLIES = {
+    "en": "{greeting}! I'm here to listen. How are you feeling today?",
+    "sw": "{greeting}! Niko hapa kukusikiliza. Unajisikiaje leo?",
+}
+GREETING_ANSWERS = {"habari": "Nzuri", "mambo": "Poa"}
+
+ACKNOWLEDGEMENTS = {
+    "en": 'When you say "{expression}" ({meaning}), I hear you.',
+    "sw": 'Nakusikia unaposema "{expression}".',
+}
+
+# Topic words -> topic, for one-pass tagging of a token set
+_TOPIC_INDEX: Dict[str, str] = {}
+for _topic, _words in list(MENTAL_HEALTH_TOPICS.items()) + list(SWAHILI_TOPIC_WORDS.items()):
+    for _word in _words:
+        _TOPIC_INDEX.setdefault(_word, _topic)
+
+
+class LocalReply(NamedTuple):
+    text: str
+    topic: str
+    language: str
+
+
+def _language_key(language: str) -> str:
+    return "sw" if (language or "").lower() in ("sw", "swahili") else "en"
+
+
+class LocalResponder:
+    """Context-appropriate supportive replies without a model"""
+
+    def __init__(self):
+        self.stats: Dict[str, int] = {"replies": 0}
+
+    def detect_topic(self, normalized: str, tokens: List[str]) -> Tuple[str, Optional[str]]:
+        """(topic, matched Swahili expression or None); GENERAL_TOPIC when nothing matches"""
+        for expression, topic in EXPRESSION_TOPICS.items():
+            if expression in normalized:
+                return topic, expression
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            topic = _TOPIC_INDEX.get(token)
+            if topic is not None:
+                counts[topic] = counts.get(topic, 0) + 1
+        if counts:
+            return max(counts, key=counts.get), None
+        return GENERAL_TOPIC, None
+
+    def respond(self, message: str, language: str = "en", max_chars: int = None, user_id: str = None) -> LocalReply:
+        """
+        Reply to a non-crisis message
+
+        Parts (acknowledgement, empathy, coping prompt) are dropped from the
+        least important up until the reply fits max_chars.
+        """
+        lang = _language_key(language)
+        normalized = message.lower().strip()
+        tokens = _TOKEN_RE.findall(normalized)
+        topic, expression = self.detect_topic(normalized, tokens)
+
+        if topic == GENERAL_TOPIC and tokens and tokens[0] in KENYAN_EXPRESSIONS["greetings"] and len(tokens) <= 3:
+            text = GREETING_REPLIES[lang].format(greeting=GREETING_ANSWERS.get(tokens[0], tokens[0].capitalize()))
+            return self._reply(text, "greeting", lang)
+
+        # Vary the prompt between messages, but answer the same message the same way
+        snippets = SNIPPETS[(topic, lang)]
+        snippet = snippets[zlib.crc32(f"{user_id}:{normalized}".encode("utf-8")) % len(snippets)]
+
+        # (priority, text): lower priority is dropped first
+        parts = []
+        if expression is not None:
+            meaning = KENYAN_EXPRESSIONS["emotions"][expression]
+            parts.append((1, ACKNOWLEDGEMENTS[lang].format(expression=expression, meaning=meaning)))
+        parts.append((2, RESPONSE_TEMPLATES["empathy_response"][lang]))
+        parts.append((3, snippet))
+
+        text = " ".join(part for _, part in parts)
+        while max_chars and len(text) > max_chars and len(parts) > 1:
+            parts.remove(min(parts, key=lambda part: part[0]))
+            text = " ".join(part for _, part in parts)
+        if max_chars and len(text) > max_chars:
+            text = text[:max_chars - 1].rsplit(" ", 1)[0] + "…"
+        return self._reply(text, topic, lang)
+
+    def _reply(self, text: str, topic: str, language: str) -> LocalReply:
+        self.stats["replies"] += 1
+        key = f"topic.{topic}"
+        self.stats[key] = self.stats.get(key, 0) + 1
+        return LocalReply(text, topic, language)
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
+
+
+# Global local responder instance
+local_responder = LocalResponder()
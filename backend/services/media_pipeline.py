@@ -0,0 +1,466 @@
+# backend/services/media_pipeline.py
+"""
+Voice media pipeline for Mazungumzo AI
+
+Handles WhatsApp voice notes end to end:
+- Streams MediaUrl0 downloads in chunks to a temp file with size and duration caps
+- Hands the file to a pluggable speech-to-text engine running in a bounded
+  process pool, so transcription never blocks the event loop
+- Tracks queue wait and processing times for reporting
+"""
+
+import asyncio
+import hashlib
+import os
+import struct
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from utils.config import settings
+from utils.logging_config import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("media_pipeline")
+
+CHUNK_SIZE = 64 * 1024
+
+
+class MediaPipelineError(Exception):
+    """Base error for voice media processing"""
+
+
+class MediaTooLargeError(MediaPipelineError):
+    """Download exceeded the configured size or duration cap"""
+
+
+class MediaDownloadError(MediaPipelineError):
+    """Media could not be fetched"""
+
+
+class MediaURLNotAllowed(MediaDownloadError):
+    """Media URL is not https or its host is not in MEDIA_ALLOWED_HOSTS"""
+
+
+class TranscriptionQueueFull(MediaPipelineError):
+    """Too many voice notes are already waiting for transcription"""
+
+
+def _host_matches(host: str, patterns: Iterable[str]) -> bool:
+    """Exact host match, or subdomain match for patterns starting with '.'"""
+    for pattern in patterns:
+        pattern = pattern.lower()
+        if pattern.startswith("."):
+            if host.endswith(pattern):
+                return True
+        elif host == pattern:
+            return True
+    return False
+
+
+def media_url_allowed(url: str) -> bool:
+    """https URL on one of MEDIA_ALLOWED_HOSTS"""
+    parts = urlsplit(url)
+    return parts.scheme == "https" and bool(parts.hostname) and _host_matches(parts.hostname, settings.media_allowed_hosts)
+
+
+def is_twilio_media_url(url: str) -> bool:
+    """https URL on api.twilio.com or a twilio.com subdomain (the only URLs that get Twilio credentials)"""
+    parts = urlsplit(url)
+    return parts.scheme == "https" and bool(parts.hostname) and _host_matches(parts.hostname, ("api.twilio.com", ".twilio.com"))
+
+
+# Speech-to-text engines
+#
+# Engines run inside worker processes. Each entry is a factory returning a
+# callable (path, language) -> text; the factory runs once per worker.
+
+def _stub_engine_factory() -> Callable[[str, str], str]:
+    """Offline engine: deterministic transcription derived from the audio bytes"""
+    phrases = {
+        "sw": [
+            "Nimehisi vibaya sana leo",
+            "Nahitaji msaada wa haraka",
+            "Familia yangu hainielezi",
+            "Nina wasiwasi mkuu kuhusu kazi",
+        ],
+        "en": [
+            "I have been feeling very low today",
+            "I need someone to talk to",
+            "My family does not understand me",
+            "I am really worried about work",
+        ],
+    }
+
+    def transcribe(path: str, language: str) -> str:
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).digest()
+        options = phrases.get(language, phrases["en"])
+        return options[digest[0] % len(options)]
+
+    return transcribe
+
+
+def _whisper_engine_factory() -> Callable[[str, str], str]:
+    """Local Whisper via faster-whisper (optional dependency)"""
+    try:
+        from faster_whisper import WhisperModel
+    except ImportError as e:
+        raise MediaPipelineError("faster-whisper is not installed; use STT_ENGINE=stub") from e
+
+    model = WhisperModel(os.getenv("STT_WHISPER_MODEL", "small"), device="cpu", compute_type="int8")
+
+    def transcribe(path: str, language: str) -> str:
+        segments, _ = model.transcribe(path, language=language if language in ("en", "sw") else None)
+        return " ".join(segment.text.strip() for segment in segments)
+
+    return transcribe
+
+
+STT_ENGINES: Dict[str, Callable[[], Callable[[str, str], str]]] = {
+    "stub": _stub_engine_factory,
+    "whisper": _whisper_engine_factory,
+}
+
+# Per-worker-process engine cache
+_worker_engines: Dict[str, Callable[[str, str], str]] = {}
+
+
+def _transcribe_in_worker(engine_name: str, path: str, language: str, submitted_at: float) -> Tuple[str, float, float]:
+    """
+    Worker-process entry point
+
+    Returns (text, queue_ms, processing_ms). Wall-clock time is used for the
+    queue measurement because it is compared across processes.
+    """
+    started_at = time.time()
+    engine = _worker_engines.get(engine_name)
+    if engine is None:
+        engine = STT_ENGINES[engine_name]()
+        _worker_engines[engine_name] = engine
+
+    text = engine(path, language)
+    finished_at = time.time()
+    return text, (started_at - submitted_at) * 1000, (finished_at - started_at) * 1000
+
+
+def estimate_audio_duration(path: str) -> Optional[float]:
+    """
+    Estimate audio duration in seconds from container headers
+
+    Supports WAV and Ogg (Opus/Vorbis, as sent by WhatsApp). Returns None
+    when the format is not recognised.
+    """
+    with open(path, "rb") as f:
+        head = f.read(64)
+
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            try:
+                with wave.open(path, "rb") as w:
+                    return w.getnframes() / float(w.getframerate())
+            except (wave.Error, EOFError, ZeroDivisionError):
+                return None
+
+        if head[:4] == b"OggS":
+            # Sample rate: Opus always uses a 48 kHz granule clock; Vorbis stores it in the id header
+            rate = 48000
+            if b"\x01vorbis" in head:
+                offset = head.index(b"\x01vorbis") + 12
+                rate = struct.unpack("<I", head[offset:offset + 4])[0] or rate
+
+            # The last page's granule position is the total sample count
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 65307))
+            tail = f.read()
+            last = tail.rfind(b"OggS")
+            if last == -1 or last + 14 > len(tail):
+                return None
+            granule = struct.unpack("<q", tail[last + 6:last + 14])[0]
+            return granule / rate if granule > 0 else None
+
+    return None
+
+
+class StreamDurationProbe:
+    """
+    Running duration estimate for a WAV or Ogg download, fed chunk by chunk
+
+    Lets the download stop as soon as the voice note is known to be too long
+    instead of finding out after the whole file is on disk. WAV duration comes
+    from the byte rate (and the declared RIFF size, when present); Ogg duration
+    from the granule position of the newest complete page header.
+    `total_bytes` is the response Content-Length, if any.
+    """
+
+    HEAD_BYTES = 64
+
+    def __init__(self, total_bytes: int = 0):
+        self._buffer = b""
+        self._tail = b""
+        self._received = 0
+        self.kind: Optional[str] = None
+        self.rate = 48000
+        self.byte_rate = 0
+        self.declared_bytes = total_bytes
+        self.granule = 0
+
+    def feed(self, chunk: bytes) -> Optional[float]:
+        """Consume the next chunk; returns the duration seen so far in seconds, or None if unknown"""
+        self._received += len(chunk)
+        if self.kind is None:
+            # Hold data back until there is enough of a header to tell the format
+            self._buffer += chunk
+            if len(self._buffer) < self.HEAD_BYTES:
+                return None
+            chunk, self._buffer = self._buffer, b""
+            self._sniff(chunk[:self.HEAD_BYTES])
+
+        if self.kind == "wav":
+            return (max(self._received, self.declared_bytes) - 44) / self.byte_rate
+
+        if self.kind == "ogg":
+            data = self._tail + chunk
+            start = data.find(b"OggS")
+            while start != -1 and start + 14 <= len(data):
+                self.granule = max(self.granule, struct.unpack("<q", data[start + 6:start + 14])[0])
+                start = data.find(b"OggS", start + 4)
+            # Keep enough bytes to complete a page header split across chunks
+            self._tail = data[-13:]
+            return self.granule / self.rate if self.granule > 0 else None
+
+        return None
+
+    def _sniff(self, head: bytes):
+        self.kind = "unknown"
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE" and head[12:16] == b"fmt ":
+            self.byte_rate = struct.unpack("<I", head[28:32])[0]
+            riff_size = struct.unpack("<I", head[4:8])[0]
+            # Streaming writers leave the RIFF size at 0 or 0xFFFFFFFF
+            if 0 < riff_size < 0xFFFFFFF0:
+                self.declared_bytes = max(self.declared_bytes, riff_size + 8)
+            if self.byte_rate:
+                self.kind = "wav"
+        elif head[:4] == b"OggS":
+            self.kind = "ogg"
+            if b"\x01vorbis" in head:
+                offset = head.index(b"\x01vorbis") + 12
+                if offset + 4 <= len(head):
+                    self.rate = struct.unpack("<I", head[offset:offset + 4])[0] or self.rate
+
+
+class VoiceMediaPipeline:
+    """Download-then-transcribe pipeline with bounded off-loop transcription"""
+
+    def __init__(
+        self,
+        engine: str = None,
+        workers: int = None,
+        queue_limit: int = None,
+        max_bytes: int = None,
+        max_duration_seconds: float = None
+    ):
+        self.engine = engine or settings.stt_engine
+        if self.engine not in STT_ENGINES:
+            raise ValueError(f"Unknown speech-to-text engine '{self.engine}'")
+
+        self.workers = workers or settings.stt_workers
+        self.queue_limit = queue_limit or settings.stt_queue_limit
+        self.max_bytes = max_bytes or settings.voice_max_bytes
+        self.max_duration_seconds = max_duration_seconds or settings.voice_max_duration_seconds
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+
+        self.stats = {
+            "downloads": 0,
+            "bytes_downloaded": 0,
+            "rejected_too_large": 0,
+            "rejected_url": 0,
+            "download_errors": 0,
+            "transcriptions": 0,
+            "transcription_errors": 0,
+            "queue_full": 0,
+            "queue_ms_total": 0.0,
+            "queue_ms_max": 0.0,
+            "processing_ms_total": 0.0,
+            "processing_ms_max": 0.0,
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            logger.info(f"✅ Speech-to-text pool started ({self.engine}, {self.workers} workers)")
+        return self._pool
+
+    async def download(self, media_url: str) -> str:
+        """
+        Stream a media URL to a temp file, enforcing the size and duration caps. Returns the file path.
+
+        Both caps are checked while streaming: Content-Length and the bytes
+        received so far against the size cap, and the duration read from the
+        WAV/Ogg headers seen so far against the duration cap, so an oversized
+        voice note is abandoned without downloading the rest of it.
+
+        Only https URLs on MEDIA_ALLOWED_HOSTS are fetched. Redirects are
+        followed by hand so every hop is checked against the allowlist, and
+        Twilio credentials are sent only on the first request, and only to
+        Twilio's own API hosts.
+        """
+        import httpx  # deferred: only voice notes need it
+
+        if not media_url_allowed(media_url):
+            self.stats["rejected_url"] += 1
+            raise MediaURLNotAllowed(f"Media host not allowed: {urlsplit(media_url).hostname or media_url[:40]}")
+
+        auth = None
+        if settings.has_twilio_config and is_twilio_media_url(media_url):
+            auth = (settings.twilio_account_sid, settings.twilio_auth_token)
+
+        fd, path = tempfile.mkstemp(prefix="mzg-voice-", suffix=".media")
+        received = 0
+        try:
+            async with httpx.AsyncClient(follow_redirects=False, timeout=settings.media_download_timeout) as client:
+                url = media_url
+                for _ in range(settings.media_max_redirects + 1):
+                    request = client.build_request("GET", url)
+                    response = await client.send(request, auth=auth, stream=True)
+                    if not response.is_redirect:
+                        break
+                    await response.aclose()
+                    url = urljoin(url, response.headers.get("location", ""))
+                    if not media_url_allowed(url):
+                        raise MediaURLNotAllowed(f"Media redirect to a host that is not allowed: {urlsplit(url).hostname}")
+                    auth = None  # credentials never follow a redirect
+                else:
+                    raise MediaDownloadError(f"Media download exceeded {settings.media_max_redirects} redirects")
+
+                try:
+                    if response.status_code != 200:
+                        raise MediaDownloadError(f"Media download returned HTTP {response.status_code}")
+
+                    declared = int(response.headers.get("content-length") or 0)
+                    if declared > self.max_bytes:
+                        raise MediaTooLargeError(f"Media is {declared} bytes (limit {self.max_bytes})")
+
+                    probe = StreamDurationProbe(declared)
+                    with os.fdopen(fd, "wb") as out:
+                        fd = None
+                        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                            received += len(chunk)
+                            if received > self.max_bytes:
+                                raise MediaTooLargeError(f"Media exceeded {self.max_bytes} bytes")
+                            duration = probe.feed(chunk)
+                            if duration is not None and duration > self.max_duration_seconds:
+                                raise MediaTooLargeError(
+                                    f"Voice note runs past {self.max_duration_seconds:.0f}s after {received} bytes"
+                                )
+                            out.write(chunk)
+                finally:
+                    await response.aclose()
+
+            duration = estimate_audio_duration(path)
+            if duration is not None and duration > self.max_duration_seconds:
+                raise MediaTooLargeError(
+                    f"Voice note is {duration:.0f}s (limit {self.max_duration_seconds:.0f}s)"
+                )
+
+            self.stats["downloads"] += 1
+            self.stats["bytes_downloaded"] += received
+            return path
+
+        except MediaTooLargeError:
+            self.stats["rejected_too_large"] += 1
+            self._discard(path, fd)
+            raise
+        except httpx.HTTPError as e:
+            self.stats["download_errors"] += 1
+            self._discard(path, fd)
+            raise MediaDownloadError(str(e)) from e
+        except BaseException:
+            self.stats["download_errors"] += 1
+            self._discard(path, fd)
+            raise
+
+    async def transcribe(self, path: str, language: str = "sw") -> str:
+        """Transcribe a local audio file in the worker pool"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+
+        # Bounded queue: reject instead of letting work pile up unboundedly
+        if self._pending >= self.queue_limit:
+            self.stats["queue_full"] += 1
+            raise TranscriptionQueueFull(f"{self._pending} voice notes already queued")
+
+        self._pending += 1
+        try:
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                text, queue_ms, processing_ms = await loop.run_in_executor(
+                    self._get_pool(), _transcribe_in_worker, self.engine, path, language, time.time()
+                )
+        except MediaPipelineError:
+            raise
+        except Exception as e:
+            self.stats["transcription_errors"] += 1
+            raise MediaPipelineError(f"Transcription failed: {e}") from e
+        finally:
+            self._pending -= 1
+
+        self.stats["transcriptions"] += 1
+        self.stats["queue_ms_total"] += queue_ms
+        self.stats["queue_ms_max"] = max(self.stats["queue_ms_max"], queue_ms)
+        self.stats["processing_ms_total"] += processing_ms
+        self.stats["processing_ms_max"] = max(self.stats["processing_ms_max"], processing_ms)
+        logger.debug(f"🎤 Transcribed voice note | queue {queue_ms:.1f}ms | processing {processing_ms:.1f}ms")
+        return text
+
+    async def process(self, media_url: str, language: str = "sw") -> str:
+        """Download and transcribe a voice note, always cleaning up the temp file"""
+        path = await self.download(media_url)
+        try:
+            return await self.transcribe(path, language)
+        finally:
+            self._discard(path)
+
+    def get_stats(self) -> Dict:
+        """Pipeline counters with average queue and processing times"""
+        done = self.stats["transcriptions"] or 1
+        return {
+            **self.stats,
+            "engine": self.engine,
+            "workers": self.workers,
+            "pending": self._pending,
+            "queue_ms_avg": round(self.stats["queue_ms_total"] / done, 2),
+            "processing_ms_avg": round(self.stats["processing_ms_total"] / done, 2),
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @staticmethod
+    def _discard(path: str, fd: Optional[int] = None):
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+# Global pipeline instance (worker processes start on first transcription)
+media_pipeline = VoiceMediaPipeline()
+
+metrics.gauge("stt_queue_depth", "Voice notes waiting for or in transcription",
+              callback=lambda: media_pipeline._pending)
+metrics.counter("stt_transcriptions_total", "Completed voice note transcriptions",
+                callback=lambda: media_pipeline.stats["transcriptions"])
@@ -0,0 +1,214 @@
+# backend/services/message_analysis.py
+"""
+Shared per-message analysis pipeline for Mazungumzo AI
+
+Each incoming message is normalized and tokenized once, then run through
+declared analysis stages (language ID, crisis scoring, mood scoring, topic
+tagging). Stages declare their dependencies; stages whose dependencies are
+satisfied run together in the same level. The result is one immutable
+MessageAnalysis that every consumer reads from, instead of each consumer
+lowercasing and scanning the text again.
+"""
+
+import asyncio
+import inspect
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models.session_models import UserSession
+from services.crisis_service import crisis_service
+from services.language_id import LanguageGuess, language_identifier
+from utils.constants import FAMILY_KEYWORDS, MENTAL_HEALTH_TOPICS, MOOD_KEYWORDS
+from utils.logging_config import get_logger
+
+logger = get_logger("message_analysis")
+
+TOKEN_RE = re.compile(r"[\w']+")
+
+
+@dataclass(frozen=True)
+class CrisisAssessment:
+    is_crisis: bool
+    confidence: float
+    keywords: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class MoodAssessment:
+    score: int
+    positive_hits: int
+    negative_hits: int
+
+
+@dataclass(frozen=True)
+class MessageAnalysis:
+    """Everything derived from one message, computed once"""
+    text: str
+    normalized: str
+    tokens: Tuple[str, ...]
+    language: LanguageGuess  # effective language of the turn (reply, stored turn, analytics)
+    crisis: CrisisAssessment
+    mood: MoodAssessment
+    topics: Tuple[str, ...]
+    mentions_family: bool
+
+    @property
+    def language_name(self) -> str:
+        return self.language.name
+
+
+@dataclass(frozen=True)
+class AnalysisStage:
+    """
+    One pipeline stage
+
+    `run` receives the context dict (text, user_id, user_session,
+    declared_language and the results of earlier stages keyed by stage name) and may be sync or async.
+    """
+    name: str
+    run: Callable[[Dict[str, Any]], Any]
+    depends_on: Tuple[str, ...] = ()
+
+
+# Built-in stages
+
+def _normalize_stage(ctx: Dict[str, Any]) -> str:
+    return ctx["text"].lower().strip()
+
+
+def _tokenize_stage(ctx: Dict[str, Any]) -> Tuple[str, ...]:
+    return tuple(TOKEN_RE.findall(ctx["normalize"]))
+
+
+def _language_stage(ctx: Dict[str, Any]) -> LanguageGuess:
+    return language_identifier.detect(ctx["text"], ctx.get("user_id"), ctx.get("declared_language"))
+
+
+def _crisis_stage(ctx: Dict[str, Any]) -> CrisisAssessment:
+    is_crisis, confidence, keywords = crisis_service.detect_crisis_normalized(
+        ctx["normalize"], ctx.get("user_session"), ctx["text"]
+    )
+    return CrisisAssessment(is_crisis, confidence, tuple(keywords))
+
+
+def _mood_stage(ctx: Dict[str, Any]) -> MoodAssessment:
+    normalized = ctx["normalize"]
+    positive = sum(1 for word in MOOD_KEYWORDS["positive"] if word in normalized)
+    negative = sum(1 for word in MOOD_KEYWORDS["negative"] if word in normalized)
+    return MoodAssessment(positive - negative, positive, negative)
+
+
+def _topics_stage(ctx: Dict[str, Any]) -> Tuple[str, ...]:
+    tokens = set(ctx["tokenize"])
+    return tuple(topic for topic, words in MENTAL_HEALTH_TOPICS.items() if tokens.intersection(words))
+
+
+def _family_stage(ctx: Dict[str, Any]) -> bool:
+    return any(word in ctx["normalize"] for word in FAMILY_KEYWORDS)
+
+
+DEFAULT_STAGES = [
+    AnalysisStage("normalize", _normalize_stage),
+    AnalysisStage("tokenize", _tokenize_stage, ("normalize",)),
+    AnalysisStage("language", _language_stage),
+    AnalysisStage("crisis", _crisis_stage, ("normalize",)),
+    AnalysisStage("mood", _mood_stage, ("normalize",)),
+    AnalysisStage("topics", _topics_stage, ("tokenize",)),
+    AnalysisStage("family", _family_stage, ("normalize",)),
+]
+
+
+class MessageAnalysisPipeline:
+    """Runs declared stages in dependency order, one level at a time"""
+
+    def __init__(self, stages: List[AnalysisStage] = None):
+        self.stages = {stage.name: stage for stage in (stages or DEFAULT_STAGES)}
+        self.levels = self._plan_levels()
+
+    def _plan_levels(self) -> List[List[AnalysisStage]]:
+        """Group stages into levels; every stage in a level only depends on earlier levels"""
+        for stage in self.stages.values():
+            missing = [dep for dep in stage.depends_on if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {', '.join(missing)}")
+
+        levels, done = [], set()
+        remaining = dict(self.stages)
+        while remaining:
+            ready = [s for s in remaining.values() if all(dep in done for dep in s.depends_on)]
+            if not ready:
+                raise ValueError(f"Dependency cycle between stages: {', '.join(remaining)}")
+            levels.append(ready)
+            for stage in ready:
+                done.add(stage.name)
+                del remaining[stage.name]
+        return levels
+
+    async def run(
+        self,
+        text: str,
+        user_id: Optional[str] = None,
+        user_session: Optional[UserSession] = None,
+        declared_language: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Run every stage and return the raw context of stage results"""
+        ctx: Dict[str, Any] = {
+            "text": text, "user_id": user_id, "user_session": user_session, "declared_language": declared_language
+        }
+        for level in self.levels:
+            # Sync stages finish inline; only stages that return awaitables are gathered
+            pending = []
+            for stage in level:
+                result = stage.run(ctx)
+                if inspect.isawaitable(result):
+                    pending.append((stage, result))
+                else:
+                    ctx[stage.name] = result
+            if len(pending) == 1:
+                stage, awaitable = pending[0]
+                ctx[stage.name] = await awaitable
+            elif pending:
+                results = await asyncio.gather(*(awaitable for _, awaitable in pending))
+                for (stage, _), result in zip(pending, results):
+                    ctx[stage.name] = result
+        return ctx
+
+    async def analyze(
+        self,
+        text: str,
+        user_id: Optional[str] = None,
+        user_session: Optional[UserSession] = None,
+        declared_language: Optional[str] = None
+    ) -> MessageAnalysis:
+        """
+        Analyze a message and freeze the results
+
+        declared_language is the client's stated language; `language` in the
+        result only falls back to it when the text itself is inconclusive.
+        """
+        ctx = await self.run(text, user_id, user_session, declared_language)
+        return MessageAnalysis(
+            text=text,
+            normalized=ctx["normalize"],
+            tokens=ctx["tokenize"],
+            language=ctx["language"],
+            crisis=ctx["crisis"],
+            mood=ctx["mood"],
+            topics=ctx["topics"],
+            mentions_family=ctx["family"]
+        )
+
+
+# Global analysis pipeline instance
+message_pipeline = MessageAnalysisPipeline()
+
+
+async def analyze_message(
+    text: str,
+    user_id: Optional[str] = None,
+    user_session: Optional[UserSession] = None,
+    declared_language: Optional[str] = None
+) -> MessageAnalysis:
+    """Analyze one message with the default pipeline"""
+    return await message_pipeline.analyze(text, user_id, user_session, declared_language)
@@ -0,0 +1,346 @@
+# backend/services/mood_tracker.py
+"""
+Incremental per-user mood aggregates
+
+Each user is one fixed-size row of doubles in a shared array. Running sums,
+exponentially weighted moving averages and per-language counters are updated
+in O(1) per message, so trend and insight queries never walk a history list.
+
+The store is bounded: idle users expire after a TTL, the least recently
+updated users are evicted once the cap is reached, and freed rows are reused.
+Rows can be snapshotted to disk so trends survive restarts; snapshots from
+several workers are merged by keeping each user's most recent row.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from services.language_id import LANGUAGES, LANGUAGE_NAMES
+from utils.config import settings
+from utils.logging_config import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("mood_tracker")
+
+# Slot layout of a user's aggregate row
+COUNT = 0
+SCORE_SUM = 1
+SCORE_SQ_SUM = 2
+EWMA_FAST = 3
+EWMA_SLOW = 4
+LAST_SCORE = 5
+LAST_UPDATED = 6
+LANGUAGE_SLOTS = {language: 7 + i for i, language in enumerate(LANGUAGES)}
+SLOTS = 7 + len(LANGUAGES)
+
+# Fast average follows the last few messages, slow average the whole conversation
+FAST_ALPHA = 0.5
+SLOW_ALPHA = 0.2
+TREND_THRESHOLD = 0.1
+
+LANGUAGE_CODES = {name: code for code, name in LANGUAGE_NAMES.items()}
+SNAPSHOT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class MoodSnapshot:
+    """Read-only view of one user's aggregates"""
+    count: int
+    score_sum: float
+    average: float
+    variance: float
+    ewma_fast: float
+    ewma_slow: float
+    last_score: float
+    last_updated: float
+    primary_language: str
+
+    @property
+    def trend(self) -> str:
+        """improving / declining / stable, from the gap between fast and slow averages"""
+        if self.count < 2:
+            return "stable"
+        gap = self.ewma_fast - self.ewma_slow
+        if gap > TREND_THRESHOLD:
+            return "improving"
+        if gap < -TREND_THRESHOLD:
+            return "declining"
+        return "stable"
+
+
+class MoodTracker:
+    """Bounded per-user mood aggregates packed into one array of doubles"""
+
+    def __init__(self, max_users: int = None, idle_ttl_seconds: float = None, snapshot_path: str = None):
+        self.max_users = max_users or settings.mood_max_users
+        self.idle_ttl_seconds = idle_ttl_seconds or settings.mood_idle_ttl_hours * 3600
+        path = settings.mood_snapshot_path if snapshot_path is None else snapshot_path
+        self.snapshot_path = Path(path) if path else None
+
+        # user_id -> row index, least recently updated first
+        self._rows: "OrderedDict[str, int]" = OrderedDict()
+        self._data = array("d")
+        self._free: List[int] = []
+        self._key_bytes = 0
+
+        self.stats = {
+            "expired": 0,
+            "evicted": 0,
+            "snapshots_saved": 0,
+            "snapshots_loaded": 0,
+        }
+
+    # Row management
+
+    def _allocate(self, user_id: str) -> int:
+        if self._free:
+            row = self._free.pop()
+            offset = row * SLOTS
+            self._data[offset:offset + SLOTS] = array("d", bytes(8 * SLOTS))
+        else:
+            row = len(self._data) // SLOTS
+            self._data.extend(array("d", bytes(8 * SLOTS)))
+        self._rows[user_id] = row
+        self._key_bytes += sys.getsizeof(user_id)
+        return row
+
+    def _release(self, user_id: str):
+        row = self._rows.pop(user_id)
+        self._free.append(row)
+        self._key_bytes -= sys.getsizeof(user_id)
+
+    def _evict(self, now: float):
+        """Drop idle users from the old end, then enforce the user cap"""
+        cutoff = now - self.idle_ttl_seconds
+        while self._rows:
+            user_id, row = next(iter(self._rows.items()))
+            if self._data[row * SLOTS + LAST_UPDATED] >= cutoff:
+                break
+            self._release(user_id)
+            self.stats["expired"] += 1
+
+        while len(self._rows) > self.max_users:
+            self._release(next(iter(self._rows)))
+            self.stats["evicted"] += 1
+
+    def _offset(self, user_id: str) -> Optional[int]:
+        """Offset of a live (non-expired) user's row, or None"""
+        row = self._rows.get(user_id)
+        if row is None:
+            return None
+        offset = row * SLOTS
+        if self._data[offset + LAST_UPDATED] < time.time() - self.idle_ttl_seconds:
+            self._release(user_id)
+            self.stats["expired"] += 1
+            return None
+        return offset
+
+    # Public API
+
+    def record(self, user_id: str, score: float, language: str = "english") -> MoodSnapshot:
+        """Fold one message's mood score into the user's aggregates"""
+        now = time.time()
+        offset = self._offset(user_id)
+        if offset is None:
+            offset = self._allocate(user_id) * SLOTS
+        self._rows.move_to_end(user_id)
+
+        data = self._data
+        if data[offset + COUNT] == 0:
+            data[offset + EWMA_FAST] = data[offset + EWMA_SLOW] = score
+        else:
+            data[offset + EWMA_FAST] += FAST_ALPHA * (score - data[offset + EWMA_FAST])
+            data[offset + EWMA_SLOW] += SLOW_ALPHA * (score - data[offset + EWMA_SLOW])
+
+        data[offset + COUNT] += 1
+        data[offset + SCORE_SUM] += score
+        data[offset + SCORE_SQ_SUM] += score * score
+        data[offset + LAST_SCORE] = score
+        data[offset + LAST_UPDATED] = now
+
+        slot = LANGUAGE_SLOTS.get(LANGUAGE_CODES.get(language, language))
+        if slot is not None:
+            data[offset + slot] += 1
+
+        snapshot = self._snapshot(offset)
+        self._evict(now)
+        return snapshot
+
+    def get(self, user_id: str) -> Optional[MoodSnapshot]:
+        offset = self._offset(user_id)
+        return self._snapshot(offset) if offset is not None else None
+
+    def forget(self, user_id: str):
+        if user_id in self._rows:
+            self._release(user_id)
+
+    def __contains__(self, user_id: str) -> bool:
+        return self._offset(user_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _snapshot(self, offset: int) -> MoodSnapshot:
+        row = self._data[offset:offset + SLOTS]
+        count = int(row[COUNT])
+        average = row[SCORE_SUM] / count if count else 0.0
+        variance = max(row[SCORE_SQ_SUM] / count - average * average, 0.0) if count else 0.0
+        primary = max(LANGUAGE_SLOTS, key=lambda code: row[LANGUAGE_SLOTS[code]])
+        return MoodSnapshot(
+            count=count,
+            score_sum=row[SCORE_SUM],
+            average=average,
+            variance=variance,
+            ewma_fast=row[EWMA_FAST],
+            ewma_slow=row[EWMA_SLOW],
+            last_score=row[LAST_SCORE],
+            last_updated=row[LAST_UPDATED],
+            primary_language=LANGUAGE_NAMES[primary]
+        )
+
+    def memory_usage(self) -> Dict:
+        """Approximate memory held by the store"""
+        data_bytes = self._data.buffer_info()[1] * self._data.itemsize
+        index_bytes = sys.getsizeof(self._rows) + self._key_bytes + sys.getsizeof(self._free)
+        users = len(self._rows)
+        return {
+            "tracked_users": users,
+            "allocated_rows": len(self._data) // SLOTS,
+            "free_rows": len(self._free),
+            "data_bytes": data_bytes,
+            "index_bytes": index_bytes,
+            "bytes_per_user": round((data_bytes + index_bytes) / users, 1) if users else 0.0,
+        }
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            **self.memory_usage(),
+            "max_users": self.max_users,
+            "idle_ttl_seconds": self.idle_ttl_seconds,
+        }
+
+    # Snapshot persistence
+
+    def _export(self) -> Dict[str, Tuple[float, ...]]:
+        return {user_id: tuple(self._data[row * SLOTS:(row + 1) * SLOTS]) for user_id, row in self._rows.items()}
+
+    @staticmethod
+    def _read_snapshot(path: Path) -> Dict[str, Tuple[float, ...]]:
+        """Rows stored in a snapshot file, or {} if it is missing or unreadable"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable mood snapshot {path}: {e}")
+            return {}
+
+        if payload.get("version") != SNAPSHOT_VERSION or payload.get("slots") != SLOTS:
+            logger.warning(f"⚠️ Ignoring mood snapshot with incompatible layout: {path}")
+            return {}
+
+        data = array("d")
+        data.frombytes(base64.b64decode(payload["data"]))
+        if payload.get("byteorder") != sys.byteorder:
+            data.byteswap()
+        return {
+            user_id: tuple(data[i * SLOTS:(i + 1) * SLOTS])
+            for i, user_id in enumerate(payload["users"])
+        }
+
+    def _merge_rows(self, *sources: Dict[str, Tuple[float, ...]]) -> List[Tuple[str, Tuple[float, ...]]]:
+        """Newest row per user across sources, minus expired users, capped, oldest first"""
+        cutoff = time.time() - self.idle_ttl_seconds
+        merged: Dict[str, Tuple[float, ...]] = {}
+        for rows in sources:
+            for user_id, row in rows.items():
+                if row[LAST_UPDATED] < cutoff:
+                    continue
+                current = merged.get(user_id)
+                if current is None or row[LAST_UPDATED] > current[LAST_UPDATED]:
+                    merged[user_id] = row
+        ordered = sorted(merged.items(), key=lambda item: item[1][LAST_UPDATED])
+        return ordered[-self.max_users:]
+
+    def _write_snapshot(self, rows: Dict[str, Tuple[float, ...]]) -> int:
+        """Merge with whatever other workers saved and replace the file atomically"""
+        merged = self._merge_rows(self._read_snapshot(self.snapshot_path), rows)
+        data = array("d")
+        for _, row in merged:
+            data.extend(row)
+
+        payload = {
+            "version": SNAPSHOT_VERSION,
+            "slots": SLOTS,
+            "byteorder": sys.byteorder,
+            "saved_at": time.time(),
+            "users": [user_id for user_id, _ in merged],
+            "data": base64.b64encode(data.tobytes()).decode("ascii"),
+        }
+
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, self.snapshot_path)
+        return len(merged)
+
+    async def save_snapshot(self) -> int:
+        """Persist current rows; returns the number of users in the snapshot"""
+        if self.snapshot_path is None:
+            return 0
+        rows = self._export()  # copied on the event loop, written off it
+        saved = await asyncio.to_thread(self._write_snapshot, rows)
+        self.stats["snapshots_saved"] += 1
+        return saved
+
+    def load_snapshot(self) -> int:
+        """Merge rows from the snapshot file into memory; returns users loaded"""
+        if self.snapshot_path is None:
+            return 0
+        stored = self._read_snapshot(self.snapshot_path)
+        if not stored:
+            return 0
+
+        loaded = 0
+        for user_id, row in self._merge_rows(stored, self._export()):
+            index = self._rows.get(user_id)
+            if index is None:
+                index = self._allocate(user_id)
+                loaded += 1
+            if self._data[index * SLOTS + LAST_UPDATED] < row[LAST_UPDATED]:
+                self._data[index * SLOTS:(index + 1) * SLOTS] = array("d", row)
+            self._rows.move_to_end(user_id)
+
+        self._evict(time.time())
+        self.stats["snapshots_loaded"] += 1
+        logger.info(f"✅ Mood snapshot loaded ({loaded} users)")
+        return loaded
+
+    async def run_snapshots(self, interval: float = None):
+        """Save snapshots periodically until cancelled"""
+        interval = interval or settings.mood_snapshot_interval
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.save_snapshot()
+            except Exception as e:
+                logger.error(f"❌ Mood snapshot failed: {e}")
+
+
+# Global mood tracker instance
+mood_tracker = MoodTracker()
+
+metrics.gauge("mood_tracked_users", "Users with live mood aggregates", callback=lambda: len(mood_tracker))
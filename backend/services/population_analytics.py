@@ -0,0 +1,294 @@
+# backend/services/population_analytics.py
+"""
+Population-level mood and risk analytics for program staff
+
+Keeps one row per user in NumPy columns (platform, language, mood average,
+trend, crisis and escalation counts, last activity) plus an hourly ring of
+turn / crisis / escalation counters. Each chat turn updates its row in
+O(1); cohort queries are answered with vectorized masks and bincounts over
+the columns instead of looping over sessions.
+"""
+
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.container import container
+from services.language_id import LANGUAGES
+from utils.config import settings
+from utils.logging_config import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("population_analytics")
+
+PLATFORMS = ("web", "whatsapp", "sms")
+TRENDS = ("declining", "stable", "improving")
+GROUP_LABELS = {"platform": PLATFORMS, "language": LANGUAGES}
+
+# Matches the "immediate crisis" tier in CrisisDetectionService.get_appropriate_resources
+ESCALATION_CONFIDENCE = 0.8
+
+_PLATFORM_CODES = {name: i for i, name in enumerate(PLATFORMS)}
+_LANGUAGE_CODES = {code: i for i, code in enumerate(LANGUAGES)}
+_TREND_CODES = {name: i for i, name in enumerate(TRENDS)}
+
+# name -> dtype of each per-user column
+COLUMNS = {
+    "platform": np.uint8,
+    "language": np.uint8,
+    "trend": np.uint8,
+    "turns": np.uint32,
+    "mood_average": np.float32,
+    "crisis_turns": np.uint32,
+    "escalations": np.uint32,
+    "last_seen": np.float64,
+}
+
+
+class PopulationAnalytics:
+    """Columnar per-user aggregates with vectorized cohort queries"""
+
+    def __init__(self, max_users: int = None, retention_days: float = None, history_hours: int = None):
+        self.max_users = max_users or settings.analytics_max_users
+        self.retention_seconds = (retention_days or settings.analytics_retention_days) * 86400
+        self.history_hours = history_hours or settings.analytics_history_hours
+
+        self._index: Dict[str, int] = {}
+        self._user_ids: List[Optional[str]] = []
+        self.size = 0
+        self.columns = {name: np.zeros(1024, dtype) for name, dtype in COLUMNS.items()}
+
+        # Hourly ring: slot = epoch hour % history_hours
+        self._hour_epoch = np.full(self.history_hours, -1, np.int64)
+        self._hour_turns = np.zeros(self.history_hours, np.uint32)
+        self._hour_crises = np.zeros(self.history_hours, np.uint32)
+        self._hour_escalations = np.zeros(self.history_hours, np.uint32)
+
+        self._report_cache: "OrderedDict[Tuple, Tuple[float, Dict]]" = OrderedDict()
+        self.stats = {"turns": 0, "compactions": 0, "cache_hits": 0, "cache_misses": 0}
+
+    # Writes
+
+    def _grow(self, needed: int):
+        capacity = len(self.columns["turns"])
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        for name, column in self.columns.items():
+            grown = np.zeros(new_capacity, column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def _row_for(self, user_id: str) -> int:
+        row = self._index.get(user_id)
+        if row is not None:
+            return row
+        if self.size >= self.max_users:
+            self.compact()
+        self._grow(self.size + 1)
+        row = self.size
+        self.size += 1
+        self._index[user_id] = row
+        self._user_ids.append(user_id)
+        return row
+
+    def _count_hour(self, now: float, is_crisis: bool, escalated: bool):
+        hour = int(now // 3600)
+        slot = hour % self.history_hours
+        if self._hour_epoch[slot] != hour:
+            self._hour_epoch[slot] = hour
+            self._hour_turns[slot] = 0
+            self._hour_crises[slot] = 0
+            self._hour_escalations[slot] = 0
+        self._hour_turns[slot] += 1
+        self._hour_crises[slot] += is_crisis
+        self._hour_escalations[slot] += escalated
+
+    def record_turn(
+        self,
+        user_id: str,
+        platform: str,
+        language: str,
+        mood_average: float,
+        trend: str,
+        crisis_confidence: float = 0.0,
+        is_crisis: bool = False,
+        now: float = None
+    ):
+        """Fold one chat turn into the user's row and the hourly counters"""
+        now = now or time.time()
+        escalated = is_crisis and crisis_confidence >= ESCALATION_CONFIDENCE
+        row = self._row_for(user_id)
+        c = self.columns
+        c["platform"][row] = _PLATFORM_CODES.get(platform, 0)
+        c["language"][row] = _LANGUAGE_CODES.get(language, 0)
+        c["trend"][row] = _TREND_CODES.get(trend, 1)
+        c["turns"][row] += 1
+        c["mood_average"][row] = mood_average
+        c["crisis_turns"][row] += is_crisis
+        c["escalations"][row] += escalated
+        c["last_seen"][row] = now
+        self._count_hour(now, is_crisis, escalated)
+        self.stats["turns"] += 1
+
+    def bulk_load(self, user_ids: Sequence[str], **columns: np.ndarray):
+        """Append many users at once (imports and benchmarks); unknown columns stay zero"""
+        start = self.size
+        self._grow(start + len(user_ids))
+        for name, values in columns.items():
+            self.columns[name][start:start + len(user_ids)] = values
+        self._index.update((user_id, start + i) for i, user_id in enumerate(user_ids))
+        self._user_ids.extend(user_ids)
+        self.size += len(user_ids)
+
+    def compact(self, now: float = None):
+        """
+        Drop users idle past the retention window; if that frees nothing,
+        drop the least recently seen tenth so inserts stay amortized O(1)
+        """
+        now = now or time.time()
+        last_seen = self.columns["last_seen"][:self.size]
+        keep = last_seen >= now - self.retention_seconds
+        if keep.all() and self.size:
+            # Exactly the oldest rows, so users tied on last_seen are not all dropped together
+            oldest = max(self.size // 10, 1)
+            keep[np.argpartition(last_seen, oldest - 1)[:oldest]] = False
+
+        kept_rows = np.flatnonzero(keep)
+        for name, column in self.columns.items():
+            column[:len(kept_rows)] = column[kept_rows]
+        self._user_ids = [self._user_ids[i] for i in kept_rows]
+        self._index = {user_id: i for i, user_id in enumerate(self._user_ids)}
+        dropped = self.size - len(kept_rows)
+        self.size = len(kept_rows)
+        self._report_cache.clear()
+        self.stats["compactions"] += 1
+        logger.info(f"🧹 Analytics compacted ({dropped} users dropped, {self.size} kept)")
+
+    # Vectorized queries
+
+    def _view(self, name: str) -> np.ndarray:
+        return self.columns[name][:self.size]
+
+    def _active_mask(self, window_hours: Optional[float], now: float) -> np.ndarray:
+        if window_hours is None:
+            return np.ones(self.size, bool)
+        return self._view("last_seen") >= now - window_hours * 3600
+
+    def cohorts(self, group_by: Sequence[str] = ("platform", "language"), window_hours: float = None,
+                now: float = None) -> List[Dict]:
+        """Per-cohort user counts, mood trend distribution, crisis and escalation totals"""
+        now = now or time.time()
+        unknown = [g for g in group_by if g not in GROUP_LABELS]
+        if unknown:
+            raise ValueError(f"Cannot group by: {', '.join(unknown)}")
+
+        mask = self._active_mask(window_hours, now)
+
+        # Encode the grouping columns into a single mixed-radix key
+        keys = np.zeros(int(mask.sum()), np.int64)
+        sizes = []
+        for name in group_by:
+            radix = len(GROUP_LABELS[name])
+            keys = keys * radix + self._view(name)[mask]
+            sizes.append(radix)
+        groups = int(np.prod(sizes)) if sizes else 1
+
+        users = np.bincount(keys, minlength=groups)
+        trend = np.bincount(keys * len(TRENDS) + self._view("trend")[mask],
+                            minlength=groups * len(TRENDS)).reshape(groups, len(TRENDS))
+        mood_sum = np.bincount(keys, weights=self._view("mood_average")[mask], minlength=groups)
+        turns = np.bincount(keys, weights=self._view("turns")[mask], minlength=groups)
+        crisis_turns = np.bincount(keys, weights=self._view("crisis_turns")[mask], minlength=groups)
+        crisis_users = np.bincount(keys, weights=self._view("crisis_turns")[mask] > 0, minlength=groups)
+        escalations = np.bincount(keys, weights=self._view("escalations")[mask], minlength=groups)
+
+        results = []
+        for group in np.flatnonzero(users):
+            labels, remainder = {}, int(group)
+            for name, radix in zip(reversed(group_by), reversed(sizes)):
+                labels[name] = GROUP_LABELS[name][remainder % radix]
+                remainder //= radix
+            count = int(users[group])
+            results.append({
+                **{name: labels[name] for name in group_by},
+                "users": count,
+                "turns": int(turns[group]),
+                "average_mood": round(float(mood_sum[group]) / count, 3),
+                "trend": {name: int(trend[group, i]) for i, name in enumerate(TRENDS)},
+                "crisis_turns": int(crisis_turns[group]),
+                "users_with_crisis": int(crisis_users[group]),
+                "escalations": int(escalations[group]),
+            })
+        return results
+
+    def hourly_rates(self, hours: int = 24, now: float = None) -> List[Dict]:
+        """Turns, crises, escalations and crisis rate for each of the last `hours` hours"""
+        now = now or time.time()
+        hours = min(hours, self.history_hours)
+        epochs = int(now // 3600) - np.arange(hours - 1, -1, -1)
+        slots = epochs % self.history_hours
+        valid = self._hour_epoch[slots] == epochs
+
+        turns = np.where(valid, self._hour_turns[slots], 0)
+        crises = np.where(valid, self._hour_crises[slots], 0)
+        escalations = np.where(valid, self._hour_escalations[slots], 0)
+        rates = np.divide(crises, turns, out=np.zeros(hours), where=turns > 0)
+
+        return [
+            {
+                "hour": datetime.fromtimestamp(int(epoch) * 3600, timezone.utc).isoformat(),
+                "turns": int(t),
+                "crises": int(c),
+                "escalations": int(e),
+                "crisis_rate": round(float(r), 4),
+            }
+            for epoch, t, c, e, r in zip(epochs, turns, crises, escalations, rates)
+        ]
+
+    def report(self, group_by: Sequence[str] = ("platform", "language"), window_hours: float = None,
+               hours: int = 24) -> Dict:
+        """
+        Cohort and hourly report, cached for ANALYTICS_CACHE_SECONDS per
+        parameter set; at most ANALYTICS_CACHE_ENTRIES sets are kept
+        """
+        hours = min(max(int(hours), 1), self.history_hours)
+        key = (tuple(group_by), window_hours, hours)
+        now = time.time()
+        cached = self._report_cache.get(key)
+        if cached and cached[0] > now:
+            self._report_cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return cached[1]
+
+        self.stats["cache_misses"] += 1
+        report = {
+            "generated_at": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "window_hours": window_hours,
+            "users": int(self._active_mask(window_hours, now).sum()),
+            "cohorts": self.cohorts(group_by, window_hours, now),
+            "hourly": self.hourly_rates(hours, now),
+        }
+        self._report_cache[key] = (now + settings.analytics_cache_seconds, report)
+        self._report_cache.move_to_end(key)
+        while len(self._report_cache) > settings.analytics_cache_entries:
+            self._report_cache.popitem(last=False)
+        return report
+
+    def get_stats(self) -> Dict:
+        column_bytes = sum(column.nbytes for column in self.columns.values())
+        return {
+            **self.stats,
+            "users": self.size,
+            "column_bytes": column_bytes,
+        }
+
+
+# The instance is built by the container; these register when it first imports this module
+metrics.counter("analytics_report_cache_hits_total", "Cohort reports served from cache",
+                callback=lambda: container.population_analytics.stats["cache_hits"])
+metrics.counter("analytics_report_cache_misses_total", "Cohort reports computed",
+                callback=lambda: container.population_analytics.stats["cache_misses"])
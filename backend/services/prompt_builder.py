@@ -0,0 +1,276 @@
+# backend/services/prompt_builder.py
+"""
+Incremental prompt assembly for Mazungumzo AI
+
+Each session keeps a PromptBuilder next to its history. It holds every
+message already serialized as a provider-ready JSON object, plus a token
+estimate, and is updated once per appended message instead of being
+rebuilt from the whole history on every turn. System prompts are rendered
+once at import per (language group, crisis) and request bodies are
+assembled by joining pre-encoded bytes.
+
+Windows are fitted to a token budget rather than a message count: the
+newest messages that fit are sent, and older ones are represented by the
+session's rolling summary (see services/context_window.py).
+"""
+
+import json
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from models.session_models import ConversationMessage, MessageRole, UserSession
+from utils.config import get_system_prompt
+from utils.constants import SYSTEM_PROMPTS
+
+# Roles sent to the model; other messages keep a placeholder so trimming stays aligned with history
+PROMPT_ROLES = (MessageRole.USER, MessageRole.ASSISTANT)
+
+# session_metadata key holding the rolling summary: {"text", "until" (last covered timestamp)}
+SUMMARY_KEY = "context_summary"
+
+
+def encode_message(role: str, content: str) -> bytes:
+    """One chat message as compact JSON bytes"""
+    return json.dumps({"role": role, "content": content}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+_TOKEN_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=8192)
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local token estimate for a message, including per-message overhead
+
+    Each word or punctuation mark counts as one token, plus one for every
+    further four characters of a long word (long Swahili words split into
+    several BPE tokens). Cached, since the same texts (system prompts,
+    repeated greetings) are counted often.
+    """
+    return 4 + sum(1 + (len(piece) - 1) // 4 for piece in _TOKEN_PIECE.findall(text))
+
+
+class RenderedPrompt(NamedTuple):
+    text: str
+    encoded: bytes
+    tokens: int
+
+
+def _render(text: str) -> RenderedPrompt:
+    return RenderedPrompt(text, encode_message("system", text), estimate_tokens(text))
+
+
+# Pre-rendered system prompts keyed by (English?, crisis?)
+_SYSTEM_PROMPTS: Dict[Tuple[bool, bool], RenderedPrompt] = {
+    (True, False): _render(get_system_prompt("en")),
+    (False, False): _render(SYSTEM_PROMPTS["multilingual"]),
+    (True, True): _render(SYSTEM_PROMPTS["crisis"]),
+    (False, True): _render(SYSTEM_PROMPTS["crisis"]),
+}
+
+
+SUMMARY_PROMPT = _render(
+    "You maintain a short running summary of a supportive conversation between a user and "
+    "Mazungumzo, a mental health companion. Update the previous summary with the new messages. "
+    "In at most four sentences, in the third person, keep what the user shared (feelings, "
+    "situation, people involved), any risk signs, and coping steps already suggested. "
+    "Reply with the summary only."
+)
+
+
+def system_prompt(language: str = "en", is_crisis: bool = False) -> RenderedPrompt:
+    """System prompt for a turn: crisis first, then multilingual for non-English"""
+    return _SYSTEM_PROMPTS[(language == "en", is_crisis)]
+
+
+def render_summary(text: str) -> RenderedPrompt:
+    return _render(f"Summary of the earlier conversation (for context only): {text}")
+
+
+def render_knowledge(snippets: Iterable[str]) -> RenderedPrompt:
+    return _render(
+        "Background you may draw on if it fits the user's message (coping strategies and Kenyan resources):\n"
+        + "\n".join(f"- {snippet}" for snippet in snippets)
+    )
+
+
+class PromptWindow(NamedTuple):
+    """Encoded history for one request, oldest first, with per-message token estimates"""
+    messages: Tuple[bytes, ...]
+    token_counts: Tuple[int, ...]
+    summary: Optional[RenderedPrompt] = None
+    dropped_tokens: int = 0  # history tokens left out of the window
+    unsummarized: int = 0  # dropped messages not yet covered by the summary
+    start: int = 0  # builder position of the oldest entry in the window
+
+    @property
+    def context_summary(self) -> Optional[RenderedPrompt]:
+        """The summary, when older messages are actually left out"""
+        if self.summary is not None and (self.start > 0 or self.dropped_tokens > 0):
+            return self.summary
+        return None
+
+    @property
+    def tokens(self) -> int:
+        summary = self.context_summary
+        return sum(self.token_counts) + (summary.tokens if summary is not None else 0)
+
+    def fit(self, budget: int) -> "PromptWindow":
+        """Narrow to the newest messages that fit in budget tokens (summary counted first)"""
+        if self.tokens <= budget:
+            return self
+        used = self.summary.tokens if self.summary is not None else 0
+        keep = 0
+        for tokens in reversed(self.token_counts):
+            if used + tokens > budget:
+                break
+            used += tokens
+            keep += 1
+        cut = len(self.messages) - keep
+        return self._replace(
+            messages=self.messages[cut:],
+            token_counts=self.token_counts[cut:],
+            dropped_tokens=self.dropped_tokens + sum(self.token_counts[:cut]),
+            unsummarized=self.unsummarized + cut,
+        )
+
+
+EMPTY_WINDOW = PromptWindow((), ())
+
+
+class PromptBuilder:
+    """Provider-ready message array for one session, kept in step with its history"""
+
+    __slots__ = ("_encoded", "_tokens", "_base", "token_estimate", "summary", "summarized_upto")
+
+    def __init__(self, history: Iterable[ConversationMessage] = ()):
+        # One entry per history message; None for roles that are not sent
+        self._encoded: List[Optional[bytes]] = []
+        self._tokens: List[int] = []
+        # Position of entry 0 counted over every message ever appended (stable across trims)
+        self._base = 0
+        self.token_estimate = 0
+        self.summary: Optional[RenderedPrompt] = None
+        self.summarized_upto = 0  # messages before this position are covered by the summary
+        for message in history:
+            self.append(message.role, message.content)
+
+    @classmethod
+    def for_session(cls, session: UserSession) -> "PromptBuilder":
+        """Builder for a session's history, restoring its stored summary"""
+        builder = cls(session.conversation_history)
+        stored = session.session_metadata.get(SUMMARY_KEY)
+        if stored and stored.get("text"):
+            until = datetime.fromisoformat(stored["until"])
+            covered = sum(1 for message in session.conversation_history if message.timestamp <= until)
+            builder.set_summary(stored["text"], covered)
+        return builder
+
+    @property
+    def end(self) -> int:
+        """Position after the newest entry"""
+        return self._base + len(self._encoded)
+
+    def set_summary(self, text: str, upto: int):
+        self.summary = render_summary(text)
+        self.summarized_upto = upto
+
+    def __len__(self) -> int:
+        return len(self._encoded)
+
+    def append(self, role: MessageRole, content: str):
+        if role in PROMPT_ROLES:
+            encoded = encode_message(role.value, content)
+            tokens = estimate_tokens(content)
+        else:
+            encoded, tokens = None, 0
+        self._encoded.append(encoded)
+        self._tokens.append(tokens)
+        self.token_estimate += tokens
+
+    def trim(self, keep: int):
+        """Drop the oldest entries so at most `keep` remain (mirrors history trimming)"""
+        excess = len(self._encoded) - keep
+        if excess > 0:
+            self.token_estimate -= sum(self._tokens[:excess])
+            del self._encoded[:excess]
+            del self._tokens[:excess]
+            self._base += excess
+
+    def window(self, limit: int = None, budget: int = None) -> PromptWindow:
+        """
+        The newest history messages that fit, ready to send
+
+        At most `limit` messages (all when None) within `budget` tokens (no
+        budget when None). The summary is attached, and its tokens reserved,
+        whenever older messages are left out.
+        """
+        summary = self.summary
+        used = summary.tokens if summary is not None else 0
+        messages, token_counts = [], []
+        start = len(self._encoded)
+        while start > 0:
+            encoded, tokens = self._encoded[start - 1], self._tokens[start - 1]
+            if encoded is not None:
+                if (limit and len(messages) >= limit) or (budget is not None and used + tokens > budget):
+                    break
+                messages.append(encoded)
+                token_counts.append(tokens)
+                used += tokens
+            start -= 1
+
+        messages.reverse()
+        token_counts.reverse()
+        if start == 0 and self._base == 0:
+            # Whole conversation fits; the summary is not sent (context_summary is None)
+            return PromptWindow(tuple(messages), tuple(token_counts), summary)
+        first_kept = self._base + start
+        covered = min(max(self.summarized_upto, self._base), first_kept)
+        unsummarized = sum(1 for encoded in self._encoded[covered - self._base:start] if encoded is not None)
+        return PromptWindow(
+            tuple(messages), tuple(token_counts), summary,
+            dropped_tokens=sum(self._tokens[:start]),
+            unsummarized=unsummarized,
+            start=first_kept,
+        )
+
+    def index(self, position: int) -> int:
+        """List index (into this builder and the session history) of a position, clamped to what is held"""
+        return min(max(position - self._base, 0), len(self._encoded))
+
+
+def window_from_history(
+    history: Optional[List[ConversationMessage]], limit: int = None, budget: int = None
+) -> PromptWindow:
+    """Encode a plain history list (callers without a session builder)"""
+    if not history:
+        return EMPTY_WINDOW
+    return PromptBuilder(history).window(limit, budget)
+
+
+def request_prefix(**params) -> bytes:
+    """Fixed start of a chat completion body, encoded once per provider: b'{...,"messages":['"""
+    encoded = json.dumps(params, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return encoded[:-1] + (b',"messages":[' if params else b'"messages":[')
+
+
+def encode_messages(
+    system: RenderedPrompt, window: PromptWindow, message: str, knowledge: RenderedPrompt = None
+) -> bytes:
+    """
+    Messages array contents: system prompt, retrieved background, summary of
+    older turns, history window, current user message
+    """
+    parts = [system.encoded]
+    if knowledge is not None:
+        parts.append(knowledge.encoded)
+    summary = window.context_summary
+    if summary is not None:
+        parts.append(summary.encoded)
+    return b",".join([*parts, *window.messages, encode_message("user", message)])
+
+
+def request_body(prefix: bytes, messages: bytes) -> bytes:
+    return prefix + messages + b"]}"
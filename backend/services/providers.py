@@ -0,0 +1,286 @@
+# backend/services/providers.py
+"""
+AI provider registry and router for Mazungumzo AI
+
+Every OpenAI-compatible chat completion backend is a ProviderConfig entry:
+base URL, key, model, request-rate limit, pricing and context budget.
+Cerebras and OpenRouter come from their existing settings; AI_PROVIDERS (a
+JSON list) adds more entries, or overrides fields of the built-in ones by
+name, so capacity can be added without code changes.
+
+ProviderRouter ranks the configured providers for each request by
+- live latency (moving average of successful calls)
+- error rate (moving average of failed calls)
+- rate-limit headroom (local request count against rpm_limit, and the
+  x-ratelimit-* headers the provider returns; a 429 benches it until
+  Retry-After has passed)
+- estimated cost of the request
+
+The first provider is drawn at random with weights that favour the best
+score, so load spreads across providers that perform alike and every
+provider keeps getting the occasional request that refreshes its latency.
+The rest follow in score order as fallbacks.
+"""
+
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Any, Deque, Dict, List, Mapping, Optional
+
+from utils.config import settings
+from utils.logging_config import get_logger
+
+logger = get_logger("providers")
+
+_RATE_WINDOW = 60.0  # seconds; rpm_limit counts requests in this window
+
+
+@dataclass(frozen=True)
+class ProviderConfig:
+    """One OpenAI-compatible chat completion backend"""
+    name: str
+    base_url: str
+    model: str
+    api_key: Optional[str] = None
+    title: str = ""  # name used in logs
+    headers: Dict[str, str] = field(default_factory=dict)  # extra request headers
+    rpm_limit: int = 0  # requests per minute (0: unknown, headers only)
+    input_price: float = 0.0  # USD per million prompt tokens
+    output_price: float = 0.0  # USD per million completion tokens
+    context_tokens: int = 0  # history token budget (0: CONTEXT_TOKEN_BUDGET)
+    expected_latency: float = 2.0  # seconds, used until the provider has answered
+    enabled: bool = True
+
+    @property
+    def configured(self) -> bool:
+        return self.enabled and bool(self.api_key)
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url.rstrip('/')}/chat/completions"
+
+    @property
+    def request_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json", **self.headers}
+
+    @property
+    def history_budget(self) -> int:
+        return self.context_tokens or settings.context_token_budget
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        """Estimated USD for one request"""
+        return (prompt_tokens * self.input_price + completion_tokens * self.output_price) / 1e6
+
+
+def _builtin_providers() -> List[ProviderConfig]:
+    return [
+        ProviderConfig(
+            name="cerebras",
+            title="Cerebras",
+            base_url=settings.cerebras_base_url,
+            api_key=settings.cerebras_api_key,
+            model=settings.cerebras_model,
+            context_tokens=settings.cerebras_context_tokens,
+            expected_latency=1.0,
+        ),
+        ProviderConfig(
+            name="openrouter",
+            title="OpenRouter",
+            base_url=settings.openrouter_base_url,
+            api_key=settings.openrouter_api_key,
+            model=settings.openrouter_model,
+            headers={"HTTP-Referer": "https://mazungumzo-ai.hackathon", "X-Title": "Mazungumzo AI Hackathon"},
+            context_tokens=settings.openrouter_context_tokens,
+            expected_latency=3.0,
+        ),
+    ]
+
+
+class ProviderRegistry:
+    """Provider entries by name: the built-in ones, then AI_PROVIDERS"""
+
+    def __init__(self, entries: List[Mapping[str, Any]] = None):
+        self._providers: Dict[str, ProviderConfig] = {p.name: p for p in _builtin_providers()}
+        for entry in (settings.ai_providers if entries is None else entries):
+            try:
+                self.add(entry)
+            except (TypeError, ValueError) as e:
+                logger.error(f"❌ Ignoring AI provider entry {entry!r}: {e}")
+
+    def add(self, entry: Mapping[str, Any]) -> ProviderConfig:
+        """Add an entry, or update the named fields of an existing one"""
+        entry = dict(entry)
+        name = str(entry.pop("name", "")).strip().lower()
+        if not name:
+            raise ValueError("provider entry needs a name")
+        existing = self._providers.get(name)
+        if existing is not None:
+            provider = replace(existing, **entry)
+        else:
+            provider = ProviderConfig(name=name, **entry)
+        if not provider.title:
+            provider = replace(provider, title=name)
+        self._providers[name] = provider
+        return provider
+
+    def get(self, name: str) -> Optional[ProviderConfig]:
+        return self._providers.get(name)
+
+    def all(self) -> List[ProviderConfig]:
+        return list(self._providers.values())
+
+    def configured(self) -> List[ProviderConfig]:
+        return [provider for provider in self._providers.values() if provider.configured]
+
+
+class ProviderState:
+    """Live latency, error rate and rate-limit headroom of one provider"""
+
+    __slots__ = ("latency", "error_rate", "requests", "header_headroom", "header_at", "blocked_until", "served")
+
+    def __init__(self, expected_latency: float):
+        self.latency = expected_latency
+        self.error_rate = 0.0
+        self.requests: Deque[float] = deque()
+        self.header_headroom: Optional[float] = None
+        self.header_at = 0.0
+        self.blocked_until = 0.0
+        self.served = 0
+
+    def headroom(self, rpm_limit: int, now: float) -> float:
+        """Share of the rate limit still available (0..1)"""
+        if now < self.blocked_until:
+            return 0.0
+        while self.requests and now - self.requests[0] > _RATE_WINDOW:
+            self.requests.popleft()
+        headroom = 1.0 - len(self.requests) / rpm_limit if rpm_limit else 1.0
+        if self.header_headroom is not None and now - self.header_at < _RATE_WINDOW:
+            headroom = min(headroom, self.header_headroom)
+        return max(headroom, 0.0)
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class ProviderRouter:
+    """Orders the configured providers for each request"""
+
+    def __init__(self, registry: ProviderRegistry):
+        self.registry = registry
+        self.providers = registry.configured()
+        self._states: Dict[str, ProviderState] = {
+            provider.name: ProviderState(provider.expected_latency) for provider in self.providers
+        }
+
+    def __bool__(self) -> bool:
+        return bool(self.providers)
+
+    def score(self, provider: ProviderConfig, prompt_tokens: int, completion_tokens: int, now: float) -> float:
+        """Expected seconds for a request, inflated by errors, cost and a shrinking rate limit (lower is better)"""
+        state = self._states[provider.name]
+        expected = state.latency * (1 + settings.router_error_weight * state.error_rate)
+        expected += settings.router_cost_weight * provider.cost(prompt_tokens, completion_tokens) * 100
+        return expected * (1 + settings.router_headroom_weight * (1 - state.headroom(provider.rpm_limit, now)))
+
+    def rank(self, prompt_tokens: int = 0, completion_tokens: int = None) -> List[ProviderConfig]:
+        """
+        Providers to try, in order
+
+        The first is a weighted random pick (weight (best score / score) **
+        ROUTER_SHARPNESS, at least ROUTER_EXPLORATION so a provider whose
+        estimates are stale still gets sampled); providers with no
+        rate-limit headroom go last.
+        """
+        if len(self.providers) < 2:
+            return list(self.providers)
+        completion_tokens = settings.max_tokens if completion_tokens is None else completion_tokens
+        now = time.monotonic()
+        scored = []
+        exhausted = []
+        for provider in self.providers:
+            if self._states[provider.name].headroom(provider.rpm_limit, now) <= 0:
+                exhausted.append(provider)
+            else:
+                scored.append((self.score(provider, prompt_tokens, completion_tokens, now), provider))
+        scored.sort(key=lambda item: item[0])
+        if not scored:
+            return exhausted
+
+        best = scored[0][0]
+        weights = [max((best / score) ** settings.router_sharpness, settings.router_exploration) for score, _ in scored]
+        first = random.choices(range(len(scored)), weights)[0]
+        ordered = [scored[first][1]] + [provider for i, (_, provider) in enumerate(scored) if i != first]
+        return ordered + exhausted
+
+    def started(self, name: str):
+        """A request is being sent (counts against rpm_limit)"""
+        self._states[name].requests.append(time.monotonic())
+
+    def record(self, name: str, ok: bool, seconds: float = None):
+        """Outcome of a call: successful calls update the latency, every call the error rate"""
+        state = self._states.get(name)
+        if state is None:
+            return
+        alpha = settings.router_smoothing
+        state.error_rate += alpha * ((0.0 if ok else 1.0) - state.error_rate)
+        if ok and seconds is not None:
+            state.latency += alpha * (seconds - state.latency)
+
+    def served(self, name: str):
+        self._states[name].served += 1
+
+    def update_limits(self, name: str, status_code: int, headers: Mapping[str, str]):
+        """Read rate-limit headers (x-ratelimit-remaining/limit-requests, Retry-After on 429)"""
+        state = self._states.get(name)
+        if state is None:
+            return
+        now = time.monotonic()
+        remaining = _header_float(headers, "x-ratelimit-remaining-requests")
+        limit = _header_float(headers, "x-ratelimit-limit-requests")
+        if remaining is not None and limit:
+            state.header_headroom = max(remaining / limit, 0.0)
+            state.header_at = now
+        if status_code == 429:
+            retry_after = _header_float(headers, "retry-after") or settings.router_rate_limit_cooldown
+            state.blocked_until = now + retry_after
+            logger.warning(f"⏳ {name} rate limited; skipping it for {retry_after:.0f}s")
+
+    @property
+    def saturated(self) -> bool:
+        """Every provider is out of rate-limit headroom"""
+        now = time.monotonic()
+        return bool(self.providers) and all(
+            self._states[p.name].headroom(p.rpm_limit, now) <= 0 for p in self.providers
+        )
+
+    @property
+    def preferred(self) -> Optional[str]:
+        """Best provider right now (ignoring the random spread)"""
+        if not self.providers:
+            return None
+        now = time.monotonic()
+        return min(self.providers, key=lambda p: self.score(p, 0, settings.max_tokens, now)).name
+
+    def get_stats(self) -> Dict[str, Dict]:
+        now = time.monotonic()
+        return {
+            provider.name: {
+                "model": provider.model,
+                "latency_seconds": round(state.latency, 3),
+                "error_rate": round(state.error_rate, 3),
+                "headroom": round(state.headroom(provider.rpm_limit, now), 3),
+                "score": round(self.score(provider, 0, settings.max_tokens, now), 3),
+                "turns_served": state.served,
+            }
+            for provider in self.providers
+            for state in (self._states[provider.name],)
+        }
+
+
+# Global provider registry instance
+provider_registry = ProviderRegistry()
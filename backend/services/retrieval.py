@@ -0,0 +1,277 @@
+# backend/services/retrieval.py
+"""
+Local retrieval of coping strategies and resources for Mazungumzo AI
+
+A small curated corpus (English and Swahili) is indexed in memory:
+- coping prompts (the local responder's SNIPPETS)
+- short psychoeducation notes (PSYCHOEDUCATION below)
+- Kenyan resource descriptions (MentalHealthResources.get_kenya_resources)
+
+The index is an inverted index with BM25 impacts computed at build time:
+each posting already holds the term's BM25 contribution for that
+document, so a query is a handful of dict lookups and additions. The
+top-k snippets for a message are injected into the prompt as a second
+system message (see AIService._prepare_messages).
+
+The index is built on first use; a query takes a few microseconds
+(benchmarks/bench_retrieval.py).
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from models.resource_models import MentalHealthResources, ResourceType
+from services.local_responder import SNIPPETS
+from services.prompt_builder import RenderedPrompt, render_knowledge
+from utils.config import settings
+from utils.logging_config import get_logger
+
+logger = get_logger("retrieval")
+
+_WORD_RE = re.compile(r"\w+")
+
+# Function words (English and Swahili) that carry no topic
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from had has have how i if in into is it its just me my
+no not of on or our so that the their them then there they this to too was we were what when which who why
+will with you your im dont cant its ive
+last week day time all like myself
+na ya wa za la kwa ni si katika kuhusu hii huu hiyo hilo ile yake wangu yangu changu mimi wewe yeye sisi
+nyinyi wao kama lakini au pia tu sana je hapa huko leo sasa hivi kila
+""".split())
+
+# (topic, language, text, extra search keywords)
+PSYCHOEDUCATION: Tuple[Tuple[str, str, str, str], ...] = (
+    ("depression", "en",
+     "Depression is more than sadness: low mood, loss of interest, poor sleep and low energy lasting two weeks "
+     "or more. It is common and treatable with counselling, support and sometimes medication.",
+     "depressed hopeless empty interest tired"),
+    ("depression", "sw",
+     "Msongo wa mawazo (depression) ni zaidi ya huzuni: hali ya chini, kukosa hamu, usingizi mbaya na uchovu kwa "
+     "wiki mbili au zaidi. Ni kawaida na hutibika kwa ushauri, msaada na wakati mwingine dawa.",
+     "huzuni uchovu hamu usingizi"),
+    ("anxiety", "en",
+     "A panic attack (racing heart, shaking, short breath) peaks within about ten minutes and passes. "
+     "Slow breathing with a longer out-breath tells the body it is safe.",
+     "panic attack heart racing breath shaking anxious fear"),
+    ("anxiety", "sw",
+     "Shambulio la hofu (moyo kwenda mbio, kutetemeka, kukosa pumzi) hufika kilele ndani ya dakika kumi hivi na "
+     "hupita. Kupumua polepole na kutoa pumzi kwa muda mrefu huutuliza mwili.",
+     "hofu wasiwasi moyo pumzi kutetemeka"),
+    ("anxiety", "en",
+     "Worry time: set aside fifteen minutes a day to write worries down; outside that time, note a worry and "
+     "postpone it. Many worries shrink once they are on paper.",
+     "worry overthinking thoughts stress"),
+    ("sleep", "en",
+     "Sleep habits that help: the same wake time every day, no phone in bed, less tea or coffee after midday, "
+     "and getting up for a quiet activity if sleep does not come within twenty minutes.",
+     "sleep insomnia night tired awake rest"),
+    ("sleep", "sw",
+     "Tabia zinazosaidia usingizi: kuamka saa ile ile kila siku, kutotumia simu kitandani, kupunguza chai au "
+     "kahawa baada ya mchana, na kuamka kufanya jambo tulivu usingizi usipokuja.",
+     "usingizi usiku kulala uchovu"),
+    ("grief", "en",
+     "Grief after losing someone comes in waves and has no fixed timetable. Talking about the person, keeping "
+     "routines and accepting help from family and community all ease it.",
+     "grief loss lost death died passed away funeral mourning bereaved mother father"),
+    ("grief", "sw",
+     "Majonzi baada ya kufiwa huja kama mawimbi na hayana muda maalum. Kuzungumza kuhusu marehemu, kuendelea na "
+     "ratiba na kukubali msaada wa familia na jamii husaidia.",
+     "majonzi kufiwa msiba marehemu kifo"),
+    ("work_stress", "en",
+     "Exam and work pressure: break tasks into small steps, study or work in short blocks with breaks, and "
+     "remember that one result does not decide your worth.",
+     "exam school study university job pressure deadline results"),
+    ("work_stress", "sw",
+     "Shinikizo la mitihani au kazi: gawa kazi katika hatua ndogo, soma au fanya kazi kwa vipindi vifupi na "
+     "mapumziko, na kumbuka kuwa matokeo moja hayaamui thamani yako.",
+     "mtihani shule chuo kazi matokeo"),
+    ("substance_use", "en",
+     "Alcohol or drugs can numb feelings for a while but usually deepen low mood and anxiety. Cutting down "
+     "slowly with support is safer than stopping alone after heavy use.",
+     "alcohol drinking drugs bhang miraa substance addiction"),
+    ("substance_use", "sw",
+     "Pombe au dawa za kulevya zinaweza kupunguza hisia kwa muda lakini mara nyingi huongeza huzuni na wasiwasi. "
+     "Kupunguza polepole ukiwa na msaada ni salama zaidi.",
+     "pombe kulevya bangi miraa ulevi"),
+    ("relationships", "en",
+     "Opening up to family can feel hard. Choosing one trusted person, a calm moment, and starting with how you "
+     "feel rather than what is wrong often makes the talk easier.",
+     "family parents talk tell open trust lonely friends"),
+    ("relationships", "sw",
+     "Kufunguka kwa familia kunaweza kuwa kugumu. Kuchagua mtu mmoja unayemwamini, wakati tulivu, na kuanza na "
+     "jinsi unavyohisi mara nyingi hurahisisha mazungumzo.",
+     "familia wazazi kuongea kuamini upweke marafiki"),
+    ("stigma", "en",
+     "Seeking help for your mental health is a sign of strength, not weakness or lack of faith. Counsellors keep "
+     "what you share confidential.",
+     "counselling counsellor therapy therapist help shame stigma weak"),
+    ("stigma", "sw",
+     "Kutafuta msaada wa afya ya akili ni ishara ya nguvu, si udhaifu wala ukosefu wa imani. Washauri huweka siri "
+     "unachowaeleza.",
+     "ushauri mshauri msaada aibu udhaifu"),
+    ("postpartum", "en",
+     "After childbirth many mothers feel tearful or overwhelmed. If it lasts more than two weeks or you feel "
+     "unable to cope, a clinic or counsellor can help; it is not your fault.",
+     "baby birth postpartum pregnancy pregnant newborn"),
+    ("trauma", "en",
+     "After a frightening event, nightmares, jumpiness and avoiding reminders are common reactions. They often "
+     "ease with time, safety and support; trauma-focused counselling helps when they do not.",
+     "trauma nightmare flashback abuse violence accident attack"),
+)
+
+# Search keywords for resource descriptions by type (indexed, not shown)
+RESOURCE_KEYWORDS = {
+    ResourceType.CRISIS_HOTLINE: "hotline call phone crisis suicide kill die harm hurt help talk someone piga simu msaada kujiua",
+    ResourceType.PROFESSIONAL_HELP: "hospital psychiatrist doctor counselling therapy treatment hospitali daktari matibabu",
+    ResourceType.ONLINE_RESOURCE: "online website information counsellor find tovuti",
+    ResourceType.EMERGENCY_SERVICE: "emergency police ambulance danger dharura polisi hatari",
+}
+
+
+class Snippet(NamedTuple):
+    doc_id: str
+    text: str
+    language: str  # "en", "sw" or "any"
+    topic: str
+    kind: str  # coping, education or resource
+
+
+def _stem(token: str) -> str:
+    """Light English suffix stripping (Swahili words are left as they are)"""
+    if len(token) > 5 and token.endswith("ing"):
+        return token[:-3]
+    if len(token) > 4 and token.endswith("ed"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed terms without stopwords"""
+    terms = []
+    for word in _WORD_RE.findall(text.lower()):
+        if len(word) > 1 and word not in STOPWORDS:
+            term = _stem(word)
+            if term not in STOPWORDS:
+                terms.append(term)
+    return terms
+
+
+def default_corpus() -> List[Tuple[Snippet, str]]:
+    """(snippet, indexed text) pairs for the curated corpus"""
+    corpus = []
+    for (topic, language), texts in SNIPPETS.items():
+        for i, text in enumerate(texts):
+            corpus.append((Snippet(f"coping.{topic}.{language}.{i}", text, language, topic, "coping"), text))
+    for i, (topic, language, text, keywords) in enumerate(PSYCHOEDUCATION):
+        corpus.append((Snippet(f"education.{topic}.{language}.{i}", text, language, topic, "education"),
+                       f"{text} {keywords}"))
+    resources = MentalHealthResources.get_kenya_resources()
+    for group in (resources.crisis_hotlines, resources.professional_help,
+                  resources.online_resources, resources.emergency_services):
+        for resource in group:
+            details = ", ".join(filter(None, [resource.contact, resource.location,
+                                              "24/7" if resource.available_24_7 else None]))
+            text = f"{resource.name} ({details}): {resource.description}"
+            doc_id = f"resource.{re.sub(r'[^a-z0-9]+', '_', resource.name.lower()).strip('_')}"
+            corpus.append((Snippet(doc_id, text, "any", resource.type.value, "resource"),
+                           f"{text} {RESOURCE_KEYWORDS.get(resource.type, '')}"))
+    return corpus
+
+
+class BM25Index:
+    """Inverted index whose postings carry precomputed BM25 term weights"""
+
+    def __init__(self, documents: Iterable[Tuple[Snippet, str]], k1: float = 1.2, b: float = 0.75):
+        self.snippets: List[Snippet] = []
+        term_counts: List[Counter] = []
+        for snippet, text in documents:
+            self.snippets.append(snippet)
+            term_counts.append(Counter(tokenize(text)))
+
+        n = len(self.snippets)
+        lengths = [sum(counts.values()) for counts in term_counts]
+        avg_length = (sum(lengths) / n) if n else 0.0
+        document_frequency: Counter = Counter()
+        for counts in term_counts:
+            document_frequency.update(counts.keys())
+
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for doc, counts in enumerate(term_counts):
+            norm = k1 * (1 - b + b * lengths[doc] / avg_length) if avg_length else k1
+            for term, tf in counts.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                postings.setdefault(term, []).append((doc, idf * tf * (k1 + 1) / (tf + norm)))
+        self.postings: Dict[str, Tuple[Tuple[int, float], ...]] = {
+            term: tuple(entries) for term, entries in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.snippets)
+
+    def search(self, query: str, k: int = 3, language: str = None, min_score: float = 0.0) -> List[Tuple[float, Snippet]]:
+        """Top-k (score, snippet) for a query, best first; language keeps that language and "any" """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            for doc, weight in self.postings.get(term, ()):
+                scores[doc] = scores.get(doc, 0.0) + weight
+        snippets = self.snippets
+        candidates = (
+            (score, doc) for doc, score in scores.items()
+            if score >= min_score and (language is None or snippets[doc].language in (language, "any"))
+        )
+        return [(score, snippets[doc]) for score, doc in heapq.nlargest(k, candidates)]
+
+
+@lru_cache(maxsize=1024)
+def _render_snippets(texts: Tuple[str, ...]) -> RenderedPrompt:
+    return render_knowledge(texts)
+
+
+class KnowledgeBase:
+    """Retrieval over the curated corpus, built on first use"""
+
+    def __init__(self):
+        self._index: Optional[BM25Index] = None
+        self.stats = {"queries": 0, "hits": 0, "snippets": 0}
+
+    @property
+    def index(self) -> BM25Index:
+        if self._index is None:
+            self._index = BM25Index(default_corpus())
+            logger.info(f"📚 Retrieval index built: {len(self._index)} snippets, {len(self._index.postings)} terms")
+        return self._index
+
+    def search(self, message: str, language: str = "en", k: int = None) -> List[Snippet]:
+        lang = "sw" if (language or "").lower() in ("sw", "swahili") else "en"
+        results = self.index.search(
+            message, settings.retrieval_top_k if k is None else k, lang, settings.retrieval_min_score
+        )
+        self.stats["queries"] += 1
+        if results:
+            self.stats["hits"] += 1
+            self.stats["snippets"] += len(results)
+        return [snippet for _, snippet in results]
+
+    def context(self, message: str, language: str = "en") -> Optional[RenderedPrompt]:
+        """Retrieved snippets for a message as a rendered system message (None when disabled or nothing matches)"""
+        if not settings.retrieval_enabled:
+            return None
+        snippets = self.search(message, language)
+        if not snippets:
+            return None
+        return _render_snippets(tuple(snippet.text for snippet in snippets))
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "indexed": len(self._index) if self._index is not None else 0}
+
+
+# Global knowledge base instance
+knowledge_base = KnowledgeBase()
@@ -0,0 +1,376 @@
+# backend/services/session_repository.py
+"""
+Session repository: the single store for user conversations
+
+JSONDatabase (main.py, webhooks) and SessionService (app/ routes) both read
+and write UserSession objects here. Messages are stored as
+ConversationMessage objects built once when they are added, so history()
+hands callers ready-to-use slices with no per-request conversion, and each
+session's PromptBuilder is updated on append so prompt_window() returns
+provider-ready history.
+
+Persistence is a pluggable backend:
+- MemorySessionBackend keeps nothing on disk
+- JSONFileSessionBackend keeps the user_sessions.json layout; changes are
+  coalesced for SESSION_FLUSH_DELAY seconds and written by a worker thread,
+  replacing the file atomically
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.session_models import ConversationMessage, MessageRole, UserSession
+from services.prompt_builder import EMPTY_WINDOW, PromptBuilder, PromptWindow
+from utils.config import settings
+from utils.logging_config import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("session_repository")
+
+# (session, history, crisis flags, metadata) captured on the event loop for a background write
+SessionSnapshot = Tuple[UserSession, Tuple[ConversationMessage, ...], Tuple[Dict, ...], Dict[str, Any]]
+
+
+def session_to_record(snapshot: SessionSnapshot) -> Dict[str, Any]:
+    """Serialize a snapshot in the user_sessions.json layout"""
+    session, history, crisis_flags, session_metadata = snapshot
+    messages = []
+    for message in history:
+        record = {
+            "role": message.role.value,
+            "content": message.content,
+            "timestamp": message.timestamp.isoformat(),
+        }
+        metadata = message.metadata
+        if "language" in metadata:
+            record["language"] = metadata["language"]
+            if len(metadata) > 1:
+                record["metadata"] = {k: v for k, v in metadata.items() if k != "language"}
+        elif metadata:
+            record["metadata"] = metadata
+        messages.append(record)
+
+    return {
+        "user_id": session.user_id,
+        "created_at": session.created_at.isoformat(),
+        "last_active": session.last_activity.isoformat(),
+        "platform": session.platform,
+        "language_preference": session.language_preference,
+        "conversation_history": messages,
+        "crisis_flags": list(crisis_flags),
+        "session_metadata": session_metadata,
+    }
+
+
+def session_from_record(record: Dict[str, Any]) -> UserSession:
+    """Build a UserSession from a stored record (also accepts the older JSONDatabase layout)"""
+    last_active = record.get("last_active") or record.get("last_activity") or datetime.now().isoformat()
+
+    history = []
+    for message in record.get("conversation_history", []):
+        metadata = dict(message.get("metadata") or {})
+        if "language" in message:
+            metadata["language"] = message["language"]
+        history.append(ConversationMessage(
+            role=message["role"],
+            content=message["content"],
+            timestamp=message.get("timestamp") or last_active,
+            metadata=metadata
+        ))
+
+    # Older records kept a crisis counter instead of flag details
+    crisis_flags = record.get("crisis_flags") or []
+    if isinstance(crisis_flags, int):
+        crisis_flags = [{"timestamp": last_active, "legacy": True} for _ in range(crisis_flags)]
+
+    session_metadata = dict(record.get("session_metadata") or {})
+    if record.get("mood_scores"):
+        session_metadata["mood_scores"] = record["mood_scores"]
+
+    return UserSession(
+        user_id=record["user_id"],
+        platform=record.get("platform", "web"),
+        language_preference=record.get("language_preference", "en"),
+        conversation_history=history,
+        crisis_flags=crisis_flags,
+        created_at=record.get("created_at") or last_active,
+        last_activity=last_active,
+        session_metadata=session_metadata
+    )
+
+
+class SessionBackend:
+    """Storage interface for SessionRepository"""
+
+    persistent = False
+
+    def exists(self) -> bool:
+        """Whether stored data exists (False means a fresh install)"""
+        return False
+
+    def load(self) -> Dict[str, UserSession]:
+        return {}
+
+    def save(self, snapshots: List[SessionSnapshot]):
+        """Persist every session; called from a worker thread"""
+
+
+class MemorySessionBackend(SessionBackend):
+    """Sessions live only in process memory"""
+
+
+class JSONFileSessionBackend(SessionBackend):
+    """All sessions in one JSON file keyed by user id"""
+
+    persistent = True
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> Dict[str, UserSession]:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except Exception as e:
+            logger.error(f"❌ Failed to load sessions from {self.path}: {e}")
+            return {}
+
+        sessions = {}
+        for user_id, record in records.items():
+            try:
+                sessions[user_id] = session_from_record(record)
+            except Exception as e:
+                logger.warning(f"⚠️ Skipping unreadable session {user_id}: {e}")
+        return sessions
+
+    def save(self, snapshots: List[SessionSnapshot]):
+        records = {snapshot[0].user_id: session_to_record(snapshot) for snapshot in snapshots}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(records, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def create_backend(kind: str, path: str) -> SessionBackend:
+    if kind == "memory":
+        return MemorySessionBackend()
+    if kind == "json":
+        return JSONFileSessionBackend(path)
+    raise ValueError(f"Unknown session backend: {kind}")
+
+
+class SessionRepository:
+    """In-memory UserSession objects with write-behind persistence"""
+
+    def __init__(self, backend: SessionBackend = None, max_messages: int = None, flush_delay: float = None):
+        self.backend = backend or MemorySessionBackend()
+        self.max_messages = max_messages or settings.session_max_messages
+        self.flush_delay = settings.session_flush_delay if flush_delay is None else flush_delay
+
+        self._sessions: Optional[Dict[str, UserSession]] = None
+        self._prompts: Dict[str, PromptBuilder] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.stats = {"created": 0, "messages": 0, "flushes": 0, "flush_errors": 0, "last_flush_ms": 0.0}
+
+    # Loading
+
+    @property
+    def sessions(self) -> Dict[str, UserSession]:
+        """All sessions by user id, loaded from the backend on first access"""
+        if self._sessions is None:
+            self.load()
+        return self._sessions
+
+    def load(self):
+        start = time.perf_counter()
+        self._sessions = self.backend.load()
+        self._prompts.clear()
+        logger.info(
+            f"✅ Session repository loaded {len(self._sessions)} sessions "
+            f"({type(self.backend).__name__}, {(time.perf_counter() - start) * 1000:.1f}ms)"
+        )
+
+    # Reads
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def get(self, user_id: str) -> Optional[UserSession]:
+        return self.sessions.get(user_id)
+
+    def history(self, user_id: str, limit: int = None) -> List[ConversationMessage]:
+        """Most recent messages (all kept messages when limit is None) as ConversationMessage objects"""
+        session = self.sessions.get(user_id)
+        if session is None:
+            return []
+        history = session.conversation_history
+        return history[-limit:] if limit else list(history)
+
+    def prompt_builder(self, user_id: str) -> Optional[PromptBuilder]:
+        """The session's PromptBuilder, built from its history on first use"""
+        builder = self._prompts.get(user_id)
+        if builder is None:
+            session = self.sessions.get(user_id)
+            if session is None:
+                return None
+            builder = self._prompts[user_id] = PromptBuilder.for_session(session)
+        return builder
+
+    def prompt_window(self, user_id: str, limit: int = None) -> PromptWindow:
+        """Encoded recent history for the AI request (see history())"""
+        builder = self.prompt_builder(user_id)
+        return builder.window(limit) if builder is not None else EMPTY_WINDOW
+
+    def message_count(self) -> int:
+        return sum(len(session.conversation_history) for session in self.sessions.values())
+
+    # Writes
+
+    def get_or_create(self, user_id: str, platform: str = "web") -> Tuple[UserSession, bool]:
+        """(session, created)"""
+        session = self.sessions.get(user_id)
+        if session is not None:
+            return session, False
+        session = UserSession(user_id=user_id, platform=platform)
+        self.sessions[user_id] = session
+        self.stats["created"] += 1
+        self.mark_changed()
+        return session, True
+
+    def append(
+        self,
+        user_id: str,
+        role: MessageRole,
+        content: str,
+        metadata: Dict[str, Any] = None,
+        platform: str = "web"
+    ) -> ConversationMessage:
+        """Add a message (creating the session if needed), keeping the last SESSION_MAX_MESSAGES"""
+        session, _ = self.get_or_create(user_id, platform)
+        session.add_message(role, content, metadata)
+        history = session.conversation_history
+        if len(history) > self.max_messages:
+            del history[:-self.max_messages]
+        builder = self._prompts.get(user_id)
+        if builder is not None:
+            builder.append(history[-1].role, content)
+            builder.trim(self.max_messages)
+        self.stats["messages"] += 1
+        self.mark_changed()
+        return history[-1]
+
+    def touch(self, session: UserSession):
+        """Record activity on a session changed in place"""
+        session.last_activity = datetime.now()
+        self.mark_changed()
+
+    def delete(self, user_id: str) -> bool:
+        removed = self.sessions.pop(user_id, None) is not None
+        self._prompts.pop(user_id, None)
+        if removed:
+            self.mark_changed()
+        return removed
+
+    def cleanup(self, max_age_seconds: float) -> int:
+        """Drop sessions idle for longer than max_age_seconds; returns how many were removed"""
+        cutoff = datetime.now().timestamp() - max_age_seconds
+        stale = [
+            user_id for user_id, session in self.sessions.items()
+            if session.last_activity.timestamp() < cutoff
+        ]
+        for user_id in stale:
+            del self.sessions[user_id]
+            self._prompts.pop(user_id, None)
+        if stale:
+            self.mark_changed()
+        return len(stale)
+
+    # Persistence
+
+    def mark_changed(self):
+        """Schedule a coalesced write (immediately when no event loop is running)"""
+        if not self.backend.persistent or self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()
+            return
+        self._flush_handle = loop.call_later(self.flush_delay, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_handle = None
+        self._flush_task = asyncio.create_task(self.flush())
+
+    def _snapshot(self) -> List[SessionSnapshot]:
+        # Copies references only; messages are never mutated after they are added
+        return [
+            (session, tuple(session.conversation_history), tuple(session.crisis_flags), dict(session.session_metadata))
+            for session in self.sessions.values()
+        ]
+
+    def _save(self, snapshots: List[SessionSnapshot]):
+        start = time.perf_counter()
+        self.backend.save(snapshots)
+        self.stats["flushes"] += 1
+        self.stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    async def flush(self):
+        """Write all sessions now, off the event loop"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self.backend.persistent or self._sessions is None:
+            return
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:  # one writer at a time, so the newest snapshot lands last
+            try:
+                await asyncio.to_thread(self._save, self._snapshot())
+            except Exception as e:
+                self.stats["flush_errors"] += 1
+                logger.error(f"❌ Failed to save sessions: {e}")
+
+    def flush_sync(self):
+        if not self.backend.persistent or self._sessions is None:
+            return
+        try:
+            self._save(self._snapshot())
+        except Exception as e:
+            self.stats["flush_errors"] += 1
+            logger.error(f"❌ Failed to save sessions: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "backend": type(self.backend).__name__,
+            "sessions": len(self.sessions),
+            "prompt_builders": len(self._prompts),
+            "flush_pending": self._flush_handle is not None,
+        }
+
+
+# Global session repository (backend chosen by SESSION_BACKEND)
+session_repository = SessionRepository(create_backend(settings.session_backend, settings.session_store_path))
+
+metrics.gauge("sessions_active", "Sessions held by the session repository",
+              callback=lambda: len(session_repository))
+metrics.counter("session_flushes_total", "Session store writes", callback=lambda: session_repository.stats["flushes"])
@@ -8,17 +8,18 @@ import asyncio
 from typing import Dict, Optional, List, Any
 from datetime import datetime, timedelta
 
-from ..utils.config import settings
-from ..utils.logging_config import get_logger, log_user_interaction, log_performance
-from ..models.session_models import UserSession, SessionManager, ConversationMessage, MessageRole
+from utils.config import settings
+from utils.logging_config import get_logger, log_user_interaction, log_performance
+from models.session_models import UserSession, ConversationMessage, MessageRole
+from services.session_repository import SessionRepository, session_repository
 
 
 class SessionService:
     """Service for managing user sessions and conversation state"""
     
-    def __init__(self):
+    def __init__(self, repository: SessionRepository = None):
         self.logger = get_logger("session_service")
-        self.session_manager = SessionManager()
+        self.repository = repository if repository is not None else session_repository
         self.cleanup_task = None
         self.logger.info("✅ Session Service initialized")
         
@@ -50,7 +51,7 @@ class SessionService:
     def get_or_create_session(self, user_id: str, platform: str = "web") -> UserSession:
         """Get existing session or create new one"""
         
-        session = self.session_manager.get_session(user_id, platform)
+        session, _ = self.repository.get_or_create(user_id, platform)
         
         if not session.conversation_history:
             # New session - log user interaction
@@ -58,16 +59,18 @@ class SessionService:
             
             # Add welcome message for new sessions
             welcome_message = self._get_welcome_message(platform)
-            session.add_message(
+            self.repository.append(
+                user_id,
                 MessageRole.ASSISTANT, 
                 welcome_message,
-                {"type": "welcome", "timestamp": datetime.now().isoformat()}
+                {"type": "welcome", "timestamp": datetime.now().isoformat()},
+                platform
             )
         else:
             # Existing session - update last activity
             log_user_interaction(self.logger, user_id, "session_resumed", platform)
+            self.repository.touch(session)
         
-        self.session_manager.update_session(session)
         return session
     
     def _get_welcome_message(self, platform: str = "web") -> str:
@@ -104,27 +107,25 @@ class SessionService:
         """Add a message to user's session"""
         
         session = self.get_or_create_session(user_id, platform)
-        session.add_message(role, content, metadata or {})
+        self.repository.append(user_id, role, content, metadata or {}, platform)
         
         # Log the interaction
         action = f"message_{role.value}"
         log_user_interaction(self.logger, user_id, action, platform)
         
-        self.session_manager.update_session(session)
         return session
     
     def get_conversation_context(self, user_id: str, limit: int = None) -> List[ConversationMessage]:
         """Get conversation context for AI processing"""
         
-        session = self.session_manager.get_session(user_id)
         context_limit = limit or settings.max_conversation_history
         
-        return session.conversation_history[-context_limit:] if context_limit > 0 else session.conversation_history
+        return self.repository.history(user_id, context_limit if context_limit > 0 else None)
     
     def get_session_summary(self, user_id: str) -> Dict[str, Any]:
         """Get summary of user's session"""
         
-        session = self.session_manager.get_session(user_id)
+        session = self.repository.get_or_create(user_id)[0]
         
         # Count messages by role
         message_counts = {}
@@ -154,19 +155,18 @@ class SessionService:
     def update_language_preference(self, user_id: str, language: str) -> UserSession:
         """Update user's language preference"""
         
-        session = self.session_manager.get_session(user_id)
+        session, _ = self.repository.get_or_create(user_id)
         session.language_preference = language
-        session.last_activity = datetime.now()
+        self.repository.touch(session)
         
         log_user_interaction(self.logger, user_id, f"language_changed_{language}", session.platform)
         
-        self.session_manager.update_session(session)
         return session
     
     def get_user_risk_profile(self, user_id: str) -> Dict[str, Any]:
         """Get user's risk profile based on session data"""
         
-        session = self.session_manager.get_session(user_id)
+        session = self.repository.get_or_create(user_id)[0]
         
         # Calculate risk indicators
         crisis_count = len(session.crisis_flags)
@@ -213,12 +213,7 @@ class SessionService:
         """Clean up old sessions"""
         
         cleanup_hours = hours or settings.session_cleanup_hours
-        initial_count = self.session_manager.get_active_users_count()
-        
-        self.session_manager.cleanup_old_sessions(cleanup_hours)
-        
-        final_count = self.session_manager.get_active_users_count()
-        cleaned_count = initial_count - final_count
+        cleaned_count = self.repository.cleanup(cleanup_hours * 3600)
         
         if cleaned_count > 0:
             self.logger.info(f"🧹 Cleaned up {cleaned_count} old sessions (older than {cleanup_hours}h)")
@@ -233,7 +228,7 @@ class SessionService:
         active_sessions = 0
         crisis_sessions = 0
         
-        for session in self.session_manager._sessions.values():
+        for session in self.repository.sessions.values():
             # Platform stats
             platform = session.platform
             platform_counts[platform] = platform_counts.get(platform, 0) + 1
@@ -256,13 +251,13 @@ class SessionService:
             "language_distribution": language_counts,
             "active_sessions_last_hour": active_sessions,
             "sessions_with_crisis_flags": crisis_sessions,
-            "total_sessions": len(self.session_manager._sessions)
+            "total_sessions": len(self.repository)
         }
     
     def export_session_data(self, user_id: str, include_sensitive: bool = False) -> Dict[str, Any]:
         """Export session data (for data portability/debugging)"""
         
-        session = self.session_manager.get_session(user_id)
+        session = self.repository.get_or_create(user_id)[0]
         
         export_data = {
             "user_id": session.user_id,
@@ -293,12 +288,8 @@ class SessionService:
         """Get global session statistics"""
         
         return {
-            "active_users": self.session_manager.get_active_users_count(),
-            "total_conversations": self.session_manager.get_total_conversations_count(),
+            "active_users": len(self.repository),
+            "total_conversations": self.repository.message_count(),
             "platform_stats": self.get_platform_stats(),
             "session_service_status": "healthy"
         }
-
-
-# Global session service instance
-session_service = SessionService()
@@ -0,0 +1,136 @@
+# backend/services/system_metrics.py
+"""
+Background system-metrics sampler
+
+Collects CPU, memory, disk, load and process stats on a fixed interval in a
+worker thread and keeps them in a ring buffer. Health and metrics endpoints
+read the latest sample instead of calling psutil.cpu_percent(interval=1),
+which blocked the event loop for a full second per request. psutil is
+imported when sampling starts, not when the module is imported.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from utils.config import settings
+from utils.logging_config import get_logger
+
+logger = get_logger("system_metrics")
+
+
+class SystemMetricsSampler:
+    """Samples system and process stats into a fixed-size history"""
+
+    def __init__(self, interval: float = None, history_size: int = None, disk_path: str = "/"):
+        self.interval = interval or settings.metrics_sample_interval
+        self.disk_path = disk_path
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history_size or settings.metrics_history_size)
+        self._psutil = None
+        self._process = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _prime(self):
+        import psutil
+
+        self._psutil = psutil
+        self._process = psutil.Process()
+        # Prime the CPU counters: psutil measures CPU percent since the previous call
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+
+    def sample(self) -> Dict[str, Any]:
+        """Take one sample (non-blocking CPU measurement) and append it to the history"""
+        if self._process is None:
+            self._prime()
+        psutil = self._psutil
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        with self._process.oneshot():
+            process_memory = self._process.memory_info()
+            process = {
+                "pid": self._process.pid,
+                "cpu_percent": self._process.cpu_percent(interval=None),
+                "rss": process_memory.rss,
+                "vms": process_memory.vms,
+                "threads": self._process.num_threads(),
+                "open_files": self._process.num_fds() if hasattr(self._process, "num_fds") else None,
+            }
+
+        snapshot = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "sampled_at": time.time(),
+            "cpu": {
+                "percent": psutil.cpu_percent(interval=None),
+                "count": psutil.cpu_count()
+            },
+            "memory": {
+                "total": memory.total,
+                "available": memory.available,
+                "percent": memory.percent,
+                "used": memory.used
+            },
+            "disk": {
+                "total": disk.total,
+                "used": disk.used,
+                "free": disk.free,
+                "percent": (disk.used / disk.total) * 100
+            },
+            "load_average": os.getloadavg() if hasattr(os, "getloadavg") else None,
+            "process": process,
+        }
+        self._history.append(snapshot)
+        return snapshot
+
+    async def _run(self):
+        # Sleep first: a sample taken right after _prime() would average CPU over a few microseconds
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.sample)
+            except Exception as e:
+                logger.warning(f"⚠️ System metrics sample failed: {e}")
+
+    def start(self):
+        """Start sampling in the background (idempotent)"""
+        if self._task is None or self._task.done():
+            if self._process is None:
+                self._prime()
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"✅ System metrics sampler started (every {self.interval:g}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def latest(self) -> Dict[str, Any]:
+        """
+        Most recent sample with its age
+
+        Until the first background sample exists this reports warming_up:
+        sampling inline would block the loop and measure CPU over a few
+        microseconds since priming.
+        """
+        if not self._history:
+            return {"status": "warming_up", "interval_seconds": self.interval}
+        snapshot = self._history[-1]
+        return {**snapshot, "age_seconds": round(time.time() - snapshot["sampled_at"], 3)}
+
+    def history(self, seconds: float = None) -> List[Dict[str, Any]]:
+        """Samples from the last `seconds` (all buffered samples when omitted), oldest first"""
+        if seconds is None:
+            return list(self._history)
+        cutoff = time.time() - seconds
+        return [snapshot for snapshot in self._history if snapshot["sampled_at"] >= cutoff]
+
+
+# Global sampler instance (call start() once the event loop is running)
+system_sampler = SystemMetricsSampler()
@@ -0,0 +1,213 @@
+# backend/services/tts_cache.py
+"""
+Content-addressed cache for synthesized voice replies
+
+Audio is keyed by a stable SHA-256 digest of (text, language, voice), so the
+same phrase maps to the same file across workers and restarts. Files live on
+local disk with least-recently-used eviction once the cache exceeds its size
+budget. Repeated phrases (crisis resources, welcome messages, fallbacks) are
+served without re-synthesis.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import wave
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from utils.config import settings
+from utils.logging_config import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("tts_cache")
+
+
+# Text-to-speech engines: name -> (async synthesize(text, language, voice) -> bytes, file extension)
+
+async def _stub_synthesize(text: str, language: str, voice: str) -> bytes:
+    """Offline engine: silent 8 kHz WAV whose length follows the text length"""
+    frames = min(len(text) * 480, 8000 * 120)  # ~60ms per character, capped at 2 minutes
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b"\x00\x00" * frames)
+    return buffer.getvalue()
+
+
+TTS_ENGINES: Dict[str, Tuple[Callable[[str, str, str], Awaitable[bytes]], str]] = {
+    "stub": (_stub_synthesize, "wav"),
+}
+
+
+def tts_cache_key(text: str, language: str, voice: str) -> str:
+    """Stable digest for a (text, language, voice) triple"""
+    material = "\x1f".join((language.lower(), voice, text.strip()))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Disk-backed LRU cache of synthesized audio"""
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None, engine: str = None):
+        self.cache_dir = Path(cache_dir or settings.tts_cache_dir)
+        self.max_bytes = max_bytes or settings.tts_cache_max_bytes
+        self.engine = engine or settings.tts_engine
+        if self.engine not in TTS_ENGINES:
+            raise ValueError(f"Unknown text-to-speech engine '{self.engine}'")
+        self._synthesize, self.extension = TTS_ENGINES[self.engine]
+
+        # key -> size in bytes, oldest first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._loaded = False
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "bytes_saved": 0,
+            "bytes_synthesized": 0,
+            "evictions": 0,
+        }
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.{self.extension}"
+
+    def _load_index(self):
+        """Rebuild the LRU index from disk, ordering by last use (mtime)"""
+        if self._loaded:
+            return
+        self._loaded = True
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        entries = []
+        for path in self.cache_dir.glob(f"*/*.{self.extension}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+        if entries:
+            logger.info(f"✅ TTS cache loaded {len(entries)} entries ({self._total_bytes} bytes)")
+        self._evict()
+
+    def _touch(self, key: str):
+        """Mark an entry as most recently used, in memory and on disk"""
+        self._index.move_to_end(key)
+        try:
+            os.utime(self._path_for(key))
+        except OSError:
+            pass
+
+    def _store(self, key: str, audio: bytes):
+        """Write atomically so concurrent workers never see a partial file"""
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+
+        if key in self._index:
+            self._total_bytes -= self._index[key]
+        self._index[key] = len(audio)
+        self._total_bytes += len(audio)
+        self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.stats["evictions"] += 1
+            try:
+                self._path_for(key).unlink()
+            except OSError:
+                pass
+
+    async def get_or_synthesize(self, text: str, language: str = "sw", voice: str = None) -> Tuple[str, Path]:
+        """Return (key, path) for the phrase, synthesizing it only on a cache miss"""
+        self._load_index()
+        voice = voice or settings.tts_voice
+        key = tts_cache_key(text, language, voice)
+        path = self._path_for(key)
+
+        if key not in self._index and path.exists():
+            # Written by another worker since we loaded the index
+            size = path.stat().st_size
+            self._index[key] = size
+            self._total_bytes += size
+
+        if key in self._index:
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += self._index[key]
+            self._touch(key)
+            return key, path
+
+        # Coalesce concurrent misses for the same phrase
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            await pending
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += self._index.get(key, 0)
+            return key, path
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            audio = await self._synthesize(text, language, voice)
+            self._store(key, audio)
+            self.stats["bytes_synthesized"] += len(audio)
+            future.set_result(None)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved so waiter-less failures don't warn
+            raise
+        finally:
+            del self._in_flight[key]
+
+        return key, path
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """Path for a cached key, or None"""
+        self._load_index()
+        path = self._path_for(key)
+        return path if path.exists() else None
+
+    async def warm(self, phrases: Iterable[Tuple[str, str]]) -> int:
+        """Pre-synthesize (text, language) pairs; returns how many were new"""
+        misses_before = self.stats["misses"]
+        for text, language in phrases:
+            await self.get_or_synthesize(text, language)
+        return self.stats["misses"] - misses_before
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(self._index),
+            "bytes_stored": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "engine": self.engine,
+        }
+
+
+# Global TTS cache instance (index is loaded lazily on first use)
+tts_cache = TTSCache()
+
+metrics.counter("tts_cache_hits_total", "Voice replies served from the TTS cache",
+                callback=lambda: tts_cache.stats["hits"])
+metrics.counter("tts_cache_misses_total", "Voice replies that needed synthesis",
+                callback=lambda: tts_cache.stats["misses"])
@@ -13,10 +13,7 @@ This service:
 import os
 import logging
 from typing import Optional, Dict, Any
-from twilio.rest import Client
-from twilio.twiml.messaging_response import MessagingResponse
 import asyncio
-import httpx
 
 logger = logging.getLogger(__name__)
 
@@ -26,8 +23,15 @@ class WhatsAppService:
         self.auth_token = os.getenv("TWILIO_AUTH_TOKEN")
         self.whatsapp_number = os.getenv("TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238886")
         
+        # Optional override so outbound sends can go to a local simulator
+        self.api_base_url = os.getenv("TWILIO_API_BASE_URL")
+        
         if self.account_sid and self.auth_token:
+            # twilio.rest is slow to import; only load it when credentials exist
+            from twilio.rest import Client
             self.client = Client(self.account_sid, self.auth_token)
+            if self.api_base_url:
+                self.client.api.base_url = self.api_base_url
             logger.info("✅ Twilio WhatsApp client initialized")
         else:
             self.client = None
@@ -69,10 +73,12 @@ class WhatsAppService:
         self, 
         to_number: str, 
         message: str, 
-        is_crisis: bool = False
+        is_crisis: bool = False,
+        media_url: Optional[str] = None
     ) -> bool:
         """
         Send message via Twilio WhatsApp API
+        media_url (e.g. a voice reply) is attached to the first part
         """
         if not self.client:
             logger.error("Twilio client not initialized")
@@ -83,11 +89,13 @@ class WhatsAppService:
             formatted_messages = self.format_message_for_whatsapp(message, is_crisis)
             
             # Send each part
-            for msg_part in formatted_messages:
+            for i, msg_part in enumerate(formatted_messages):
+                extra = {"media_url": [media_url]} if media_url and i == 0 else {}
                 message_obj = self.client.messages.create(
                     body=msg_part,
                     from_=self.whatsapp_number,
-                    to=f"whatsapp:{to_number}"
+                    to=f"whatsapp:{to_number}",
+                    **extra
                 )
                 
                 logger.info(f"✅ WhatsApp message sent to {to_number}: {message_obj.sid}")
@@ -108,6 +116,7 @@ class WhatsAppService:
         This is used when responding directly via webhook
         """
         try:
+            from twilio.twiml.messaging_response import MessagingResponse
             resp = MessagingResponse()
             msg = resp.message()
             msg.body(response_text)
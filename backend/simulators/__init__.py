@@ -0,0 +1,5 @@
+# backend/simulators/__init__.py
+"""
+Local simulators for load, soak and end-to-end testing of Mazungumzo AI
+without touching real third-party services
+"""
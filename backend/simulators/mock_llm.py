@@ -0,0 +1,293 @@
+# backend/simulators/mock_llm.py
+"""
+Local OpenAI-compatible LLM stand-in with fault injection
+
+Serves POST /chat/completions (also under /v1) so AIService can be pointed
+at it via CEREBRAS_BASE_URL or OPENROUTER_BASE_URL. Supports:
+- Configurable latency distributions for time-to-first-token and per-token delay
+- Token-by-token SSE streaming when the request sets "stream": true
+- Error, timeout (hung request) and rate-limit (429) injection
+- Live reconfiguration through POST /mock/config and counters at GET /mock/stats
+
+Usage (from the backend directory):
+    python -m simulators.mock_llm --port 8098 --ttft "lognormal:250:0.4" --token-ms 8 --error-rate 0.02
+    CEREBRAS_API_KEY=mock CEREBRAS_BASE_URL=http://127.0.0.1:8098 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional
+
+# Canned replies, picked deterministically from the last user message
+MOCK_REPLIES = {
+    "en": [
+        "I hear you, and I'm glad you reached out. It sounds like a lot is weighing on you right now. "
+        "Would you like to tell me a little more about what has been hardest this week?",
+        "Thank you for sharing that with me. Your feelings are valid. One small thing that can help is "
+        "taking a few slow breaths and naming five things you can see around you. How are you feeling now?",
+        "That sounds really difficult. You don't have to carry it alone. Is there someone close to you, "
+        "a friend or family member, you feel comfortable talking to?",
+    ],
+    "sw": [
+        "Nakusikia, na nimefurahi umefikia. Inaonekana una mambo mengi moyoni sasa hivi. "
+        "Je, ungependa kuniambia zaidi kuhusu kinachokusumbua zaidi wiki hii?",
+        "Asante kwa kunieleza. Hisia zako ni za kweli. Jaribu kupumua polepole mara chache "
+        "na utaje vitu vitano unavyoviona karibu nawe. Unajisikiaje sasa?",
+    ],
+}
+
+
+@dataclass
+class LatencyDistribution:
+    """A latency distribution in milliseconds, parsed from "kind:a:b" specs"""
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """
+        Parse a spec such as "fixed:200", "uniform:100:400",
+        "normal:250:50" (mean, stddev) or "lognormal:250:0.4" (median, sigma).
+        A bare number is shorthand for a fixed latency.
+        """
+        parts = spec.split(":")
+        if parts[0].replace(".", "", 1).isdigit():
+            parts.insert(0, "fixed")
+        kind = parts[0]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution '{kind}'")
+        values = [float(p) for p in parts[1:]] + [0.0, 0.0]
+        return cls(kind=kind, a=values[0], b=values[1])
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            value = rng.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            value = rng.gauss(self.a, self.b)
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(max(self.a, 1e-6)), self.b)
+        else:
+            value = self.a
+        return max(0.0, value)
+
+
+@dataclass
+class MockLLMConfig:
+    """Behaviour knobs for the mock provider"""
+    ttft: LatencyDistribution = field(default_factory=LatencyDistribution)
+    token_ms: LatencyDistribution = field(default_factory=LatencyDistribution)
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    requests_per_minute: Optional[int] = None
+    hang_seconds: float = 120.0
+    retry_after_seconds: int = 1
+    model: str = "mock-model"
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into whitespace-preserving word tokens for streaming"""
+    words = text.split(" ")
+    return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+
+def pick_reply(messages: List[Dict[str, str]]) -> str:
+    """Deterministically choose a canned reply for the conversation"""
+    last_user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    swahili_markers = ("habari", "hujambo", "nina", "sana", "mimi", "nime", "sijui", "kwa")
+    language = "sw" if any(marker in last_user.lower() for marker in swahili_markers) else "en"
+    replies = MOCK_REPLIES[language]
+    return replies[sum(map(ord, last_user)) % len(replies)]
+
+
+def create_mock_llm(config: MockLLMConfig = None, seed: Optional[int] = None):
+    """Build the mock provider FastAPI app"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI(title="Mock LLM provider")
+    app.state.config = config or MockLLMConfig()
+    app.state.rng = random.Random(seed)
+    app.state.window = deque()
+    app.state.stats = {
+        "requests": 0, "completed": 0, "streamed": 0,
+        "errors": 0, "timeouts": 0, "rate_limited": 0,
+    }
+
+    def _rate_limited(cfg: MockLLMConfig) -> bool:
+        if cfg.requests_per_minute is None:
+            return False
+        now = time.monotonic()
+        window = app.state.window
+        while window and now - window[0] > 60:
+            window.popleft()
+        if len(window) >= cfg.requests_per_minute:
+            return True
+        window.append(now)
+        return False
+
+    def _error(status: int, message: str, error_type: str, headers: Dict[str, str] = None):
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": message, "type": error_type, "code": status}},
+            headers=headers
+        )
+
+    async def chat_completions(request: Request):
+        cfg: MockLLMConfig = app.state.config
+        rng: random.Random = app.state.rng
+        stats = app.state.stats
+        stats["requests"] += 1
+
+        payload = await request.json()
+        messages = payload.get("messages", [])
+        max_tokens = int(payload.get("max_tokens") or 256)
+        model = payload.get("model") or cfg.model
+
+        # Fault injection, evaluated before any work is done
+        roll = rng.random()
+        if _rate_limited(cfg) or roll < cfg.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return _error(429, "Rate limit exceeded", "rate_limit_error",
+                          {"Retry-After": str(cfg.retry_after_seconds)})
+        roll -= cfg.rate_limit_rate
+        if roll < cfg.error_rate:
+            stats["errors"] += 1
+            return _error(500, "Injected upstream failure", "server_error")
+        roll -= cfg.error_rate
+        if roll < cfg.timeout_rate:
+            stats["timeouts"] += 1
+            await asyncio.sleep(cfg.hang_seconds)
+            return _error(504, "Injected timeout", "timeout")
+
+        all_tokens = tokenize(pick_reply(messages))
+        tokens = all_tokens[:max_tokens]
+        finish_reason = "length" if len(all_tokens) > max_tokens else "stop"
+        completion_id = "chatcmpl-" + uuid.uuid4().hex[:24]
+        created = int(time.time())
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in messages)
+
+        await asyncio.sleep(cfg.ttft.sample(rng) / 1000)
+
+        if payload.get("stream"):
+            stats["streamed"] += 1
+
+            async def event_stream():
+                for i, token in enumerate(tokens):
+                    if i:
+                        await asyncio.sleep(cfg.token_ms.sample(rng) / 1000)
+                    chunk = {
+                        "id": completion_id, "object": "chat.completion.chunk",
+                        "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                final = {
+                    "id": completion_id, "object": "chat.completion.chunk",
+                    "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}],
+                }
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+                stats["completed"] += 1
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+        # Non-streaming still pays the generation time for every token
+        generation_ms = sum(cfg.token_ms.sample(rng) for _ in range(max(len(tokens) - 1, 0)))
+        await asyncio.sleep(generation_ms / 1000)
+        stats["completed"] += 1
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": finish_reason,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+            },
+        }
+
+    app.add_api_route("/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+
+    @app.get("/mock/stats")
+    async def get_stats():
+        return app.state.stats
+
+    @app.get("/mock/config")
+    async def get_config():
+        return app.state.config.to_dict()
+
+    @app.post("/mock/config")
+    async def update_config(request: Request):
+        """Patch the live config, e.g. {"error_rate": 0.5, "ttft": "fixed:2000"}"""
+        updates = await request.json()
+        cfg: MockLLMConfig = app.state.config
+        for key, value in updates.items():
+            if not hasattr(cfg, key):
+                return _error(400, f"Unknown config key '{key}'", "invalid_request_error")
+            if key in ("ttft", "token_ms"):
+                value = LatencyDistribution.parse(value) if isinstance(value, str) else LatencyDistribution(**value)
+            setattr(cfg, key, value)
+        return cfg.to_dict()
+
+    return app
+
+
+def config_from_args(args: argparse.Namespace) -> MockLLMConfig:
+    return MockLLMConfig(
+        ttft=LatencyDistribution.parse(args.ttft),
+        token_ms=LatencyDistribution.parse(args.token_ms),
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        requests_per_minute=args.rpm,
+        hang_seconds=args.hang_seconds,
+    )
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """Register the mock behaviour flags on a parser (shared with benchmarks)"""
+    parser.add_argument("--ttft", default="fixed:200", help="Time to first token, e.g. lognormal:250:0.4")
+    parser.add_argument("--token-ms", default="fixed:5", help="Per-token delay distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=None, help="Hard requests-per-minute limit")
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock LLM provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--seed", type=int, default=None)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    app = create_mock_llm(config_from_args(args), seed=args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# backend/simulators/reporting.py
+"""
+Latency and error recording shared by the simulators and benchmarks
+"""
+
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+class RunRecorder:
+    """Collects per-request latencies and outcomes for a load run"""
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.outcomes: Counter = Counter()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    def record(self, latency_ms: float, outcome: str = "ok"):
+        """Record one request; outcome is "ok" or an error label such as "HTTP_500" """
+        self.latencies_ms.append(latency_ms)
+        self.outcomes[outcome] += 1
+
+    @property
+    def elapsed_seconds(self) -> float:
+        end = self.finished_at or time.perf_counter()
+        return (end - self.started_at) if self.started_at else 0.0
+
+    def summary(self) -> Dict:
+        """Throughput, latency percentiles and error counts"""
+        ordered = sorted(self.latencies_ms)
+        total = len(ordered)
+        errors = {k: v for k, v in self.outcomes.items() if k != "ok"}
+        elapsed = self.elapsed_seconds
+
+        return {
+            "requests": total,
+            "elapsed_seconds": round(elapsed, 2),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(ordered, 50), 2),
+                "p90": round(percentile(ordered, 90), 2),
+                "p99": round(percentile(ordered, 99), 2),
+                "max": round(ordered[-1], 2) if ordered else 0.0,
+            },
+            "errors": sum(errors.values()),
+            "error_breakdown": errors,
+        }
+
+
+def format_summary(title: str, summary: Dict) -> str:
+    """Render a run summary as a short human readable report"""
+    latency = summary["latency_ms"]
+    lines = [
+        f"=== {title} ===",
+        f"requests:    {summary['requests']} in {summary['elapsed_seconds']}s",
+        f"throughput:  {summary['throughput_rps']} req/s",
+        f"latency ms:  p50={latency['p50']} p90={latency['p90']} p99={latency['p99']} max={latency['max']}",
+        f"errors:      {summary['errors']}",
+    ]
+    for outcome, count in sorted(summary["error_breakdown"].items()):
+        lines.append(f"  {outcome}: {count}")
+    return "\n".join(lines)
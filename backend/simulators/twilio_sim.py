@@ -0,0 +1,379 @@
+# backend/simulators/twilio_sim.py
+"""
+Local Twilio / WhatsApp simulator for load and soak testing
+
+Two halves:
+- A traffic generator that sends correctly signed Twilio webhook POSTs to
+  the WhatsApp and SMS webhook routes at a fixed rate, drawing senders from
+  a simulated user population and texts from a weighted message mix
+- A fake Twilio Messages API that records outbound sends, with injectable
+  latency, errors and throttling. Point WhatsAppService at it with
+  TWILIO_API_BASE_URL=http://localhost:<port>
+
+Usage (from the backend directory):
+    python -m simulators.twilio_sim soak --base-url http://localhost:8000 --rate 20 --duration 60
+    python -m simulators.twilio_sim messages-api --port 8099 --latency-ms 80 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import httpx
+from twilio.request_validator import RequestValidator
+
+from simulators.reporting import RunRecorder, format_summary
+
+# Webhook routes the generator can target
+WEBHOOK_TARGETS = {
+    "whatsapp": {"path": "/api/v1/webhook/whatsapp", "address_prefix": "whatsapp:"},
+    "sms": {"path": "/api/v1/webhook/twilio", "address_prefix": ""},
+}
+
+# Message categories used to build the traffic mix
+MESSAGE_MIX = {
+    "greeting": [
+        "Hello", "Hi there", "Habari", "Mambo", "Hujambo Mazungumzo",
+    ],
+    "stress": [
+        "I'm so stressed about work and money",
+        "Nina wasiwasi mkuu kuhusu kazi",
+        "I can't sleep, I keep overthinking everything",
+        "My family doesn't understand me",
+        "Familia yangu hainielezi",
+    ],
+    "low_mood": [
+        "I feel sad and tired all the time",
+        "Najiskia vibaya sana leo",
+        "Everything feels hopeless lately",
+        "Nimechoka na maisha ni magumu",
+    ],
+    "crisis": [
+        "I want to end it all",
+        "Sijaweza tena, ninataka kufa",
+        "I don't see any point living anymore",
+    ],
+    "voice": [
+        "",
+    ],
+}
+
+DEFAULT_MIX_WEIGHTS = {"greeting": 3, "stress": 4, "low_mood": 3, "crisis": 1, "voice": 1}
+
+
+@dataclass
+class SimulatedUser:
+    """One simulated sender in the user population"""
+    phone: str
+    profile_name: str
+
+
+def build_user_population(size: int, seed: int = 42) -> List[SimulatedUser]:
+    """Create a deterministic population of Kenyan mobile numbers"""
+    rng = random.Random(seed)
+    users = []
+    for i in range(size):
+        number = f"+2547{rng.randint(0, 99_999_999):08d}"
+        users.append(SimulatedUser(phone=number, profile_name=f"SimUser{i}"))
+    return users
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, int]:
+    """Parse a mix spec like "greeting=3,crisis=1" into category weights"""
+    if not spec:
+        return dict(DEFAULT_MIX_WEIGHTS)
+
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in MESSAGE_MIX:
+            raise ValueError(f"Unknown message category '{name}'. Choose from: {', '.join(MESSAGE_MIX)}")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+def build_webhook_params(
+    user: SimulatedUser,
+    category: str,
+    text: str,
+    target: str,
+    account_sid: str,
+    to_number: str,
+    media_base_url: str
+) -> Dict[str, str]:
+    """Build the form parameters Twilio would POST for an inbound message"""
+    prefix = WEBHOOK_TARGETS[target]["address_prefix"]
+    message_sid = "SM" + uuid.uuid4().hex
+
+    params = {
+        "MessageSid": message_sid,
+        "SmsMessageSid": message_sid,
+        "AccountSid": account_sid,
+        "From": f"{prefix}{user.phone}",
+        "To": f"{prefix}{to_number}",
+        "Body": text,
+        "NumMedia": "0",
+    }
+
+    if target == "whatsapp":
+        params["ProfileName"] = user.profile_name
+        params["WaId"] = user.phone.lstrip("+")
+
+    if category == "voice":
+        params["NumMedia"] = "1"
+        params["MediaUrl0"] = f"{media_base_url.rstrip('/')}/media/{message_sid}.ogg"
+        params["MediaContentType0"] = "audio/ogg"
+
+    return params
+
+
+class WebhookTrafficGenerator:
+    """Sends signed Twilio webhook traffic at a fixed open-loop rate"""
+
+    def __init__(
+        self,
+        base_url: str,
+        auth_token: str,
+        account_sid: str = "ACsimulator",
+        to_number: str = "+14155238886",
+        targets: List[str] = None,
+        users: int = 100,
+        mix: Dict[str, int] = None,
+        media_base_url: str = "http://localhost:8099",
+        seed: int = 42,
+        timeout: float = 30.0
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.validator = RequestValidator(auth_token)
+        self.account_sid = account_sid
+        self.to_number = to_number
+        self.targets = targets or ["whatsapp"]
+        self.population = build_user_population(users, seed)
+        self.mix = mix or dict(DEFAULT_MIX_WEIGHTS)
+        self.media_base_url = media_base_url
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+
+    def next_request(self):
+        """Pick a user, category and target and build a signed request"""
+        user = self.rng.choice(self.population)
+        category = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        text = self.rng.choice(MESSAGE_MIX[category])
+        target = self.rng.choice(self.targets)
+
+        url = self.base_url + WEBHOOK_TARGETS[target]["path"]
+        params = build_webhook_params(
+            user, category, text, target, self.account_sid, self.to_number, self.media_base_url
+        )
+        signature = self.validator.compute_signature(url, params)
+        return target, url, params, signature
+
+    async def _send(self, client: httpx.AsyncClient, recorder: RunRecorder, semaphore: asyncio.Semaphore):
+        target, url, params, signature = self.next_request()
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post(url, data=params, headers={"X-Twilio-Signature": signature})
+                outcome = "ok" if response.status_code < 400 else f"{target}:HTTP_{response.status_code}"
+            except httpx.TimeoutException:
+                outcome = f"{target}:TIMEOUT"
+            except httpx.HTTPError as e:
+                outcome = f"{target}:{type(e).__name__}"
+            recorder.record((time.perf_counter() - start) * 1000, outcome)
+
+    async def run(self, rate: float, duration: float, max_in_flight: int = 200) -> RunRecorder:
+        """Send `rate` requests per second for `duration` seconds"""
+        recorder = RunRecorder()
+        semaphore = asyncio.Semaphore(max_in_flight)
+        total = int(rate * duration)
+        tasks = []
+
+        limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            recorder.start()
+            for i in range(total):
+                # Open-loop pacing: requests go out on schedule regardless of server latency
+                delay = recorder.started_at + i / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self._send(client, recorder, semaphore)))
+            await asyncio.gather(*tasks)
+            recorder.finish()
+
+        return recorder
+
+
+def create_messages_api(
+    latency_ms: float = 0.0,
+    jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    seed: Optional[int] = None
+):
+    """
+    Build a fake Twilio Messages API app that records outbound sends.
+
+    Latency is `latency_ms` plus uniform jitter; `error_rate` and
+    `throttle_rate` are the fractions of sends answered with a 500 or a
+    Twilio-style 429 respectively.
+    """
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, Response
+
+    app = FastAPI(title="Twilio Messages API simulator")
+    rng = random.Random(seed)
+    app.state.sent = []
+    app.state.counters = {"accepted": 0, "errors": 0, "throttled": 0}
+
+    @app.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+    async def create_message(account_sid: str, request: Request):
+        form = await request.form()
+        delay = latency_ms + rng.uniform(0, jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        roll = rng.random()
+        if roll < throttle_rate:
+            app.state.counters["throttled"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"code": 20429, "message": "Too Many Requests", "status": 429}
+            )
+        if roll < throttle_rate + error_rate:
+            app.state.counters["errors"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"code": 20500, "message": "Internal Server Error", "status": 500}
+            )
+
+        sid = "SM" + uuid.uuid4().hex
+        record = {
+            "sid": sid,
+            "account_sid": account_sid,
+            "to": form.get("To"),
+            "from": form.get("From"),
+            "body": form.get("Body", ""),
+            "media_url": form.getlist("MediaUrl"),
+            "latency_ms": round(delay, 2),
+            "received_at": time.time(),
+        }
+        app.state.sent.append(record)
+        app.state.counters["accepted"] += 1
+
+        return JSONResponse(status_code=201, content={
+            "sid": sid,
+            "account_sid": account_sid,
+            "to": record["to"],
+            "from": record["from"],
+            "body": record["body"],
+            "status": "queued",
+            "num_segments": "1",
+            "num_media": str(len(record["media_url"])),
+            "direction": "outbound-api",
+            "api_version": "2010-04-01",
+            "uri": f"/2010-04-01/Accounts/{account_sid}/Messages/{sid}.json",
+        })
+
+    @app.get("/simulator/sent")
+    async def list_sent(limit: int = 100):
+        return {"count": len(app.state.sent), "messages": app.state.sent[-limit:]}
+
+    @app.get("/simulator/stats")
+    async def stats():
+        return app.state.counters
+
+    @app.delete("/simulator/sent")
+    async def reset():
+        app.state.sent.clear()
+        for key in app.state.counters:
+            app.state.counters[key] = 0
+        return {"status": "cleared"}
+
+    @app.get("/media/{name}")
+    async def media(name: str):
+        # Tiny placeholder payload so voice-message traffic has something to download
+        return Response(content=b"OggS" + b"\x00" * 1020, media_type="audio/ogg")
+
+    return app
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local Twilio/WhatsApp simulator")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    soak = sub.add_parser("soak", help="Send signed webhook traffic and report results")
+    soak.add_argument("--base-url", default="http://localhost:8000")
+    soak.add_argument("--auth-token", default=None, help="Defaults to TWILIO_AUTH_TOKEN from settings")
+    soak.add_argument("--rate", type=float, default=10.0, help="Requests per second")
+    soak.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    soak.add_argument("--users", type=int, default=100, help="Simulated user population size")
+    soak.add_argument("--mix", default=None, help="Message mix, e.g. greeting=3,stress=4,crisis=1")
+    soak.add_argument("--targets", default="whatsapp", help="Comma list of: " + ", ".join(WEBHOOK_TARGETS))
+    soak.add_argument("--max-in-flight", type=int, default=200)
+    soak.add_argument("--media-base-url", default="http://localhost:8099")
+    soak.add_argument("--seed", type=int, default=42)
+    soak.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    api = sub.add_parser("messages-api", help="Run the fake Twilio Messages API")
+    api.add_argument("--host", default="127.0.0.1")
+    api.add_argument("--port", type=int, default=8099)
+    api.add_argument("--latency-ms", type=float, default=0.0)
+    api.add_argument("--jitter-ms", type=float, default=0.0)
+    api.add_argument("--error-rate", type=float, default=0.0)
+    api.add_argument("--throttle-rate", type=float, default=0.0)
+    api.add_argument("--seed", type=int, default=None)
+
+    return parser
+
+
+def main(argv: List[str] = None):
+    args = _build_parser().parse_args(argv)
+
+    if args.command == "messages-api":
+        import uvicorn
+        app = create_messages_api(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate,
+            seed=args.seed
+        )
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+        return
+
+    auth_token = args.auth_token
+    if auth_token is None:
+        from utils.config import settings
+        auth_token = settings.twilio_auth_token or ""
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in WEBHOOK_TARGETS]
+    if unknown:
+        raise SystemExit(f"Unknown target(s): {', '.join(unknown)}")
+
+    generator = WebhookTrafficGenerator(
+        base_url=args.base_url,
+        auth_token=auth_token,
+        targets=targets,
+        users=args.users,
+        mix=parse_mix(args.mix),
+        media_base_url=args.media_base_url,
+        seed=args.seed
+    )
+    recorder = asyncio.run(generator.run(args.rate, args.duration, args.max_in_flight))
+    summary = recorder.summary()
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(format_summary(f"Webhook soak: {', '.join(targets)} @ {args.rate}/s", summary))
+
+
+if __name__ == "__main__":
+    main()
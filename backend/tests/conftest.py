@@ -0,0 +1,36 @@
+# backend/tests/conftest.py
+"""
+Test setup: service modules import each other as top-level packages, as
+they do when main.py runs from backend/
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+# The app/ tree is imported as backend.app from the project root
+sys.path.append(str(BACKEND.parent))
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Run each test in a scratch directory so data/ files are never touched"""
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "data"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """main.app with no configured AI providers, so every non-crisis turn is answered locally"""
+    from fastapi.testclient import TestClient
+
+    import main
+    from services.container import container
+
+    monkeypatch.setattr(container.ai.router, "providers", [])
+    with TestClient(main.app) as client:
+        yield client
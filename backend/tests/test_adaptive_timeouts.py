@@ -0,0 +1,104 @@
+# backend/tests/test_adaptive_timeouts.py
+"""Adaptive provider timeouts: quantile-based budgets clamped to floors and ceilings"""
+
+import pytest
+
+from services.adaptive_timeouts import AdaptiveTimeouts
+from utils.config import settings
+
+
+@pytest.fixture(autouse=True)
+def timeout_settings(monkeypatch):
+    for name, value in {
+        "ai_timeout": 15.0,
+        "ai_connect_timeout": 5.0,
+        "ai_timeout_adaptive": True,
+        "ai_timeout_quantile": 0.99,
+        "ai_timeout_multiplier": 1.5,
+        "ai_timeout_min_samples": 20,
+        "ai_timeout_refresh": 0.0,
+        "ai_ttfb_timeout_floor": 1.5,
+        "ai_ttfb_timeout_ceiling": 10.0,
+        "ai_total_timeout_floor": 3.0,
+        "ai_total_timeout_ceiling": 30.0,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+
+def observe(timeouts, ttfb=None, total=None, count=50):
+    for _ in range(count):
+        if ttfb is not None:
+            timeouts.observe_ttfb("p", "m", ttfb)
+        if total is not None:
+            timeouts.observe_completion("p", "m", total)
+
+
+def test_fixed_timeout_until_enough_samples():
+    timeouts = AdaptiveTimeouts()
+    observe(timeouts, ttfb=0.2, total=1.0, count=19)
+
+    budget = timeouts.budget("p", "m")
+
+    assert budget.total == 15.0
+    assert budget.ttfb == 10.0
+    assert budget.connect == 5.0
+
+
+def test_budget_follows_the_latency_quantile():
+    timeouts = AdaptiveTimeouts()
+    observe(timeouts, ttfb=2.0, total=4.0)
+
+    budget = timeouts.budget("p", "m")
+
+    assert budget.total == pytest.approx(6.0)
+    assert budget.ttfb == pytest.approx(3.0)
+    assert budget.connect == pytest.approx(3.0)
+
+
+def test_fast_providers_are_clamped_to_the_floors():
+    timeouts = AdaptiveTimeouts()
+    observe(timeouts, ttfb=0.1, total=0.3)
+
+    budget = timeouts.budget("p", "m")
+
+    assert budget.total == 3.0
+    assert budget.ttfb == 1.5
+
+
+def test_slow_providers_are_clamped_to_the_ceilings():
+    timeouts = AdaptiveTimeouts()
+    observe(timeouts, ttfb=20.0, total=60.0)
+
+    budget = timeouts.budget("p", "m")
+
+    assert budget.total == 30.0
+    assert budget.ttfb == 10.0
+
+
+def test_ttfb_never_exceeds_the_total():
+    timeouts = AdaptiveTimeouts()
+    observe(timeouts, ttfb=8.0, total=2.5)
+
+    budget = timeouts.budget("p", "m")
+
+    assert budget.total == pytest.approx(3.75)
+    assert budget.ttfb == budget.total
+    assert budget.read_timeout(streaming=False) == budget.total
+
+
+def test_non_adaptive_mode_uses_the_clamped_fixed_timeout(monkeypatch):
+    monkeypatch.setattr(settings, "ai_timeout_adaptive", False)
+    monkeypatch.setattr(settings, "ai_timeout", 90.0)
+    timeouts = AdaptiveTimeouts()
+    observe(timeouts, ttfb=0.1, total=0.3)
+
+    assert timeouts.budget("p", "m") == (5.0, 30.0, 30.0)
+
+
+def test_budgets_are_cached_between_refreshes(monkeypatch):
+    monkeypatch.setattr(settings, "ai_timeout_refresh", 60.0)
+    timeouts = AdaptiveTimeouts()
+    first = timeouts.budget("p", "m")
+    observe(timeouts, ttfb=2.0, total=4.0)
+
+    assert timeouts.budget("p", "m") is first
@@ -0,0 +1,39 @@
+# backend/tests/test_app_chat.py
+"""app/ chat route: prompts come from the session's incremental prompt state"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services.ai_service import AIReply
+
+
+@pytest.fixture
+def app_client(monkeypatch):
+    from backend.app.main import app
+    from backend.services.container import container
+
+    calls = []
+
+    async def generate_response(message, **kwargs):
+        calls.append((message, kwargs))
+        return AIReply(f"reply {len(calls)}", "test")
+
+    monkeypatch.setattr(container.ai, "generate_response", generate_response)
+    with TestClient(app) as client:
+        yield client, calls
+
+
+def test_prompt_window_excludes_the_current_message(app_client):
+    client, calls = app_client
+    for text in ("first message", "second message"):
+        response = client.post("/api/v1/chat/", json={"user_id": "test-app-chat", "message": text})
+        assert response.status_code == 200, response.text
+
+    message, kwargs = calls[-1]
+    assert message == "second message"
+    assert "conversation_history" not in kwargs
+    contents = [json.loads(entry)["content"] for entry in kwargs["prompt_window"].messages]
+    assert contents[-2:] == ["first message", "reply 1"]
+    assert "second message" not in contents
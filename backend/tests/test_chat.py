@@ -0,0 +1,54 @@
+# backend/tests/test_chat.py
+"""Chat endpoint behaviour when no AI provider can answer"""
+
+from services.local_responder import SNIPPETS
+
+
+def test_local_reply_follows_detected_language(client):
+    response = client.post("/api/v1/chat", json={
+        "message": "Nina wasiwasi sana kuhusu mtihani wangu wa kesho na siwezi kulala",
+        "user_id": "test-swahili",
+    })
+
+    assert response.status_code == 200
+    reply = response.json()["response"]
+    swahili = {snippet for (_, lang), snippets in SNIPPETS.items() if lang == "sw" for snippet in snippets}
+    assert any(snippet in reply for snippet in swahili), reply
+
+
+def test_reply_is_saved_in_the_language_it_was_written_in(client):
+    from services.container import container
+
+    client.post("/api/v1/chat", json={
+        "message": "Nina wasiwasi sana kuhusu mtihani wangu wa kesho na siwezi kulala",
+        "user_id": "test-swahili-saved",
+    })
+
+    reply = container.session_repository.history("test-swahili-saved")[-1]
+    assert reply.role.value == "assistant"
+    assert reply.metadata["language"] == "sw"
+
+
+def test_turn_language_is_recorded_everywhere(client):
+    from services.container import container
+
+    client.post("/api/v1/chat", json={
+        "message": "Nimechoka sana na sina amani moyoni mwangu kwa sababu ya kazi",
+        "user_id": "test-effective-language",
+        "language": "en",
+    })
+
+    user_turn, reply = container.session_repository.history("test-effective-language")[-2:]
+    assert user_turn.metadata["language"] == "sw"
+    assert reply.metadata["language"] == "sw"
+    cohorts = container.population_analytics.report(["language"], None, 1)["cohorts"]
+    assert any(cohort["language"] == "sw" for cohort in cohorts)
+
+
+def test_each_turn_records_one_mood_sample(client):
+    from services.mood_tracker import mood_tracker
+
+    for message in ("I feel a little better today", "Work has been stressful again"):
+        client.post("/api/v1/chat", json={"message": message, "user_id": "test-mood-once"})
+
+    assert mood_tracker.get("test-mood-once").count == 2
@@ -0,0 +1,63 @@
+# backend/tests/test_container.py
+"""Every registered service builds, starts and stops"""
+
+import asyncio
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from services.container import build_container
+
+
+def test_every_registered_service_starts_and_stops():
+    services = build_container()
+
+    async def lifecycle():
+        await services.startup()
+        try:
+            for name in services._factories:
+                assert services.is_built(name), name
+        finally:
+            await services.shutdown()
+
+    asyncio.run(lifecycle())
+
+
+def test_app_lifespan_services_resolve():
+    services = build_container()
+    for name in ("ai", "crisis", "session_repository", "sessions", "whatsapp", "system_sampler"):
+        assert services.get(name) is not None
+
+
+def test_session_consumers_share_one_repository():
+    from services.container import container
+    from services.session_repository import session_repository
+
+    assert container.sessions.repository is session_repository
+    assert container.context.repository is session_repository
+    assert container.db.sessions is session_repository
+
+
+def test_importing_the_app_builds_nothing(tmp_path):
+    # Services are built by the container at startup: importing main writes no files and skips NumPy
+    backend = Path(__file__).resolve().parent.parent
+    script = f"import sys; sys.path.insert(0, {str(backend)!r}); import main; print('numpy' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip().splitlines()[-1] == "False"
+    assert list(tmp_path.iterdir()) == [tmp_path / "data"]
+    assert list((tmp_path / "data").iterdir()) == []
+
+
+def test_database_is_ready_without_the_lifespan(tmp_path, monkeypatch):
+    # Clients that never run startup (e.g. httpx against the ASGI app) still get the data files
+    fresh = tmp_path / "fresh"
+    fresh.mkdir()
+    monkeypatch.chdir(fresh)
+    services = build_container()
+
+    asyncio.run(services.db.increment_stat("crisis_interventions"))
+
+    stats = json.loads((fresh / "data" / "usage_stats.json").read_text())
+    assert stats["crisis_interventions"] == 1
@@ -0,0 +1,88 @@
+# backend/tests/test_context_window.py
+"""Rolling conversation summaries for messages that fall out of the window"""
+
+import asyncio
+
+import pytest
+
+from models.session_models import MessageRole
+from services.context_window import ContextWindowManager, local_summary
+from services.prompt_builder import SUMMARY_KEY, PromptBuilder
+from services.session_repository import SessionRepository
+from utils.config import settings
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    monkeypatch.setattr(settings, "context_max_messages", 4)
+    monkeypatch.setattr(settings, "context_summary_min_messages", 4)
+    repository = SessionRepository(max_messages=50)
+    for i in range(10):
+        role = MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT
+        repository.append("u1", role, f"Message {i}. More detail follows here.")
+    return repository
+
+
+def run_window(manager, user_id="u1"):
+    """window() on a running loop, then wait for any summary it scheduled"""
+    async def scenario():
+        window = manager.window(user_id)
+        await asyncio.gather(*manager._tasks.values())
+        return window
+
+    return asyncio.run(scenario())
+
+
+def test_dropped_messages_are_summarized_in_the_background(repository):
+    calls = []
+
+    async def summarizer(previous, transcript):
+        calls.append((previous, transcript))
+        return "The user described a hard week."
+
+    manager = ContextWindowManager(repository, summarizer)
+    first = run_window(manager)
+
+    assert first.context_summary is None  # the turn that triggers a summary does not wait for it
+    assert first.unsummarized == 6
+    assert calls[0][0] is None
+    assert calls[0][1].startswith("User: Message 0.")
+    assert "Message 5." in calls[0][1] and "Message 6." not in calls[0][1]
+
+    second = run_window(manager)
+    assert second.context_summary.text.endswith("The user described a hard week.")
+    assert second.unsummarized == 0
+    assert len(calls) == 1
+    stored = repository.get("u1").session_metadata[SUMMARY_KEY]
+    assert stored["text"] == "The user described a hard week."
+
+
+def test_summarizer_failure_falls_back_to_a_local_summary(repository):
+    async def summarizer(previous, transcript):
+        raise RuntimeError("provider down")
+
+    manager = ContextWindowManager(repository, summarizer)
+    run_window(manager)
+
+    text = repository.get("u1").session_metadata[SUMMARY_KEY]["text"]
+    assert text == "The user said: Message 0; Message 2; Message 4."
+    assert manager.stats["summary_errors"] == 1
+    assert manager.stats["summary_fallbacks"] == 1
+
+
+def test_stored_summary_is_restored_with_the_session(repository):
+    manager = ContextWindowManager(repository)
+    run_window(manager)
+
+    restored = PromptBuilder.for_session(repository.get("u1"))
+    assert restored.summary is not None
+    assert restored.summarized_upto == 6
+
+
+def test_local_summary_keeps_the_newest_text_within_the_limit():
+    previous = "The user said: " + "; ".join(f"point {i}" for i in range(40)) + "."
+
+    text = local_summary(previous, [], max_chars=60)
+
+    assert len(text) <= 60
+    assert text.endswith("point 39.")
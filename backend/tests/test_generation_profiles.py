@@ -0,0 +1,50 @@
+# backend/tests/test_generation_profiles.py
+"""Channel profiles and fitting replies into a channel's length budget"""
+
+import asyncio
+
+from services.advanced_features import advanced_service
+from services.generation_profiles import compose_for_channel, fit_to_channel, generation_profile
+from services.message_analysis import analyze_message
+
+LONG_REPLY = (
+    "It sounds like a heavy week. Talking about it is a good first step. "
+    "Try to rest tonight and keep your routine simple tomorrow. "
+    "If it helps, tell me which part of the week was hardest for you."
+)
+
+
+def test_profiles_follow_channel_limits():
+    assert generation_profile("sms").max_chars == 160
+    assert generation_profile("sms").stop == ("\n\n",)
+    assert generation_profile("sms", is_crisis=True).max_chars == 500
+    assert generation_profile("telegram") == generation_profile("web")
+
+
+def test_fit_prefers_sentence_then_word():
+    assert fit_to_channel(LONG_REPLY, 100) == "It sounds like a heavy week. Talking about it is a good first step."
+    cut = fit_to_channel("one two three four five six seven", 20)
+    assert cut == "one two three four…"
+    assert fit_to_channel("Complete. Cut mid sen", 18, truncated=True) == "Complete."
+
+
+def test_compose_keeps_prefix_and_drops_extras_that_do_not_fit():
+    text = compose_for_channel(LONG_REPLY, 160, prefix="Call 1199 now.", extras=["A" * 40])
+    assert text.startswith("Call 1199 now.\n\n")
+    assert len(text) <= 160
+    assert "AAAA" not in text
+
+    roomy = compose_for_channel("Short reply.", 160, extras=["Extra note."])
+    assert roomy == "Short reply.\n\nExtra note."
+
+
+def test_personalized_sms_reply_stays_within_budget():
+    async def personalize():
+        analysis = await analyze_message("My family and my mother keep fighting", "test-sms")
+        mood = {"trend": "improving"}
+        return await advanced_service.generate_personalized_response(
+            analysis.text, "test-sms", LONG_REPLY[:158], analysis, mood, platform="sms"
+        )
+
+    reply = asyncio.run(personalize())
+    assert len(reply) <= 160
@@ -0,0 +1,40 @@
+# backend/tests/test_language_id.py
+"""Language identification and the effective language of a turn"""
+
+from services.language_id import LanguageIdentifier, identify_language
+
+
+def test_identifies_english_and_swahili():
+    assert identify_language("I have been feeling very tired and sad this week").language == "en"
+    assert identify_language("Nimechoka sana na sina amani moyoni mwangu").language == "sw"
+
+
+def test_short_message_keeps_the_users_previous_language():
+    identifier = LanguageIdentifier()
+    assert identifier.detect("Nina wasiwasi sana kuhusu kazi yangu", "u1").language == "sw"
+    # Too short to override the preference on its own
+    assert identifier.detect("ok", "u1").language == "sw"
+    assert identifier.get_preference("u1") == "sw"
+
+
+def test_decisive_message_switches_language():
+    identifier = LanguageIdentifier()
+    identifier.detect("Nina wasiwasi sana kuhusu kazi yangu", "u1")
+    assert identifier.detect("I am worried about my exams tomorrow morning", "u1").language == "en"
+    assert identifier.get_preference("u1") == "en"
+
+
+def test_declared_language_only_decides_inconclusive_messages():
+    identifier = LanguageIdentifier()
+    assert identifier.detect("ok", "new-user", declared="sw").language == "sw"
+    assert identifier.detect("Nina wasiwasi sana kuhusu kazi yangu", "other", declared="en").language == "sw"
+    # Unknown declared codes are ignored
+    assert identifier.detect("ok", None, declared="fr").language == identify_language("ok").language
+
+
+def test_preferences_are_bounded():
+    identifier = LanguageIdentifier(max_users=2)
+    for user in ("a", "b", "c"):
+        identifier.detect("Nina wasiwasi sana kuhusu kazi yangu", user)
+    assert identifier.get_preference("a") is None
+    assert identifier.get_preference("c") == "sw"
@@ -0,0 +1,89 @@
+# backend/tests/test_logging_config.py
+"""Log redaction, JSON output and sampling of high-volume events"""
+
+import json
+import logging
+
+import pytest
+
+from utils import logging_config
+from utils.logging_config import REDACTED, JSONFormatter, LogSampler, MazungumzoFilter, log_api_call, redact
+
+
+@pytest.mark.parametrize("text, secret", [
+    ("calling with api_key=sk-live-123 now", "sk-live-123"),
+    ('payload {"token": "abc.def"}', "abc.def"),
+    ("Authorization: Bearer eyJhbGci", "eyJhbGci"),
+    ("PASSWORD='hunter2'", "hunter2"),
+    ("url?api-key=k1&user=2", "k1"),
+])
+def test_credentials_are_masked(text, secret):
+    masked = redact(text)
+
+    assert secret not in masked
+    assert REDACTED in masked
+
+
+def test_ordinary_text_is_untouched():
+    text = "User shared a token of appreciation: asante sana"
+    assert redact(text) == text
+
+
+def test_filter_redacts_formatted_arguments():
+    record = logging.LogRecord("mazungumzo.test", logging.INFO, __file__, 1, "retrying with %s", ("secret=s3cr3t",), None)
+
+    MazungumzoFilter().filter(record)
+
+    assert record.getMessage() == f"retrying with secret={REDACTED}"
+    assert record.args is None
+
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.LogRecord("mazungumzo.test", logging.WARNING, __file__, 1, "slow call", (), None)
+    record.provider = "cerebras"
+    record.trace_id = "t-1"
+
+    payload = json.loads(JSONFormatter().format(record))
+
+    assert payload["message"] == "slow call"
+    assert payload["level"] == "WARNING"
+    assert payload["provider"] == "cerebras"
+    assert payload["trace_id"] == "t-1"
+
+
+def test_sampler_allows_a_burst_then_reports_what_it_dropped(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logging_config.time, "monotonic", lambda: now[0])
+    sampler = LogSampler(per_second=1.0, burst=3)
+
+    results = [sampler.allow("api_call") for _ in range(5)]
+    assert results == [(True, 0)] * 3 + [(False, 0)] * 2
+
+    now[0] += 1.0
+    assert sampler.allow("api_call") == (True, 2)
+    assert sampler.allow("other") == (True, 0)  # keys are sampled independently
+
+
+def test_sampling_disabled_lets_everything_through():
+    sampler = LogSampler(per_second=0)
+    assert all(sampler.allow("api_call") == (True, 0) for _ in range(100))
+
+
+def test_only_successful_api_calls_are_sampled(monkeypatch):
+    monkeypatch.setattr(logging_config, "log_sampler", LogSampler(per_second=0.001, burst=1))
+    logger = logging.getLogger("mazungumzo.test_sampling")
+    logger.setLevel(logging.INFO)
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger.addHandler(handler)
+    try:
+        for _ in range(5):
+            log_api_call(logger, "Cerebras", "chat/completions", "SUCCESS", 10.0)
+        for _ in range(3):
+            log_api_call(logger, "Cerebras", "chat/completions", "HTTP_500", 10.0)
+    finally:
+        logger.removeHandler(handler)
+
+    statuses = [record.getMessage().split(" | ")[3] for record in records]
+    assert statuses == ["SUCCESS", "HTTP_500", "HTTP_500", "HTTP_500"]
@@ -0,0 +1,133 @@
+# backend/tests/test_media_pipeline.py
+"""Voice note downloads: host allowlist, Twilio credentials, redirects and streaming caps"""
+
+import asyncio
+import struct
+
+import httpx
+import pytest
+
+from services.media_pipeline import (
+    MediaTooLargeError,
+    MediaURLNotAllowed,
+    VoiceMediaPipeline,
+    media_url_allowed,
+)
+from utils.config import settings
+
+TWILIO_MEDIA = "https://api.twilio.com/2010-04-01/Accounts/AC1/Messages/MM1/Media/ME1"
+
+
+def wav_header(seconds: float, byte_rate: int = 16000) -> bytes:
+    """44-byte PCM WAV header (8 kHz mono 16-bit) declaring `seconds` of audio"""
+    data_size = int(seconds * byte_rate)
+    return (
+        b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, byte_rate // 2, byte_rate, 2, 16)
+        + b"data" + struct.pack("<I", data_size)
+    )
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Route the pipeline's httpx client through a handler; returns the list of requests seen"""
+    seen = []
+    client_class = httpx.AsyncClient
+
+    def install(handler):
+        def record(request):
+            seen.append(request)
+            return handler(request)
+
+        class MockClient(client_class):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, transport=httpx.MockTransport(record), **kwargs)
+
+        monkeypatch.setattr(httpx, "AsyncClient", MockClient)
+        return seen
+
+    monkeypatch.setattr(settings, "twilio_account_sid", "AC1")
+    monkeypatch.setattr(settings, "twilio_auth_token", "secret")
+    return install
+
+
+def download(pipeline, url):
+    return asyncio.run(pipeline.download(url))
+
+
+@pytest.mark.parametrize("url", [
+    "http://api.twilio.com/media",
+    "https://attacker.example/?x=api.twilio.com",
+    "https://api.twilio.com.attacker.example/media",
+    "https://eviltwilio.com/media",
+])
+def test_urls_off_the_allowlist_are_rejected(url):
+    assert not media_url_allowed(url)
+    with pytest.raises(MediaURLNotAllowed):
+        download(VoiceMediaPipeline(), url)
+
+
+def test_credentials_go_only_to_twilio(serve):
+    seen = serve(lambda request: httpx.Response(200, content=b"audio"))
+
+    download(VoiceMediaPipeline(), TWILIO_MEDIA)
+    download(VoiceMediaPipeline(), "https://media.twiliocdn.com/ME1")
+
+    assert "authorization" in seen[0].headers
+    assert "authorization" not in seen[1].headers
+
+
+def test_redirects_drop_credentials_and_are_checked(serve):
+    def handler(request):
+        if request.url.host == "api.twilio.com":
+            return httpx.Response(307, headers={"location": "https://media.twiliocdn.com/ME1"})
+        return httpx.Response(200, content=b"audio")
+
+    seen = serve(handler)
+    download(VoiceMediaPipeline(), TWILIO_MEDIA)
+
+    assert [request.url.host for request in seen] == ["api.twilio.com", "media.twiliocdn.com"]
+    assert "authorization" not in seen[1].headers
+
+    serve(lambda request: httpx.Response(302, headers={"location": "https://attacker.example/x"}))
+    with pytest.raises(MediaURLNotAllowed):
+        download(VoiceMediaPipeline(), TWILIO_MEDIA)
+
+
+def test_oversized_content_length_is_rejected_before_reading(serve):
+    serve(lambda request: httpx.Response(200, headers={"content-length": "2048"}, content=b"x" * 2048))
+
+    with pytest.raises(MediaTooLargeError):
+        download(VoiceMediaPipeline(max_bytes=1024), TWILIO_MEDIA)
+
+
+def test_long_voice_note_stops_streaming_early(serve):
+    sent = []
+
+    async def body():
+        yield wav_header(600)
+        for _ in range(100):
+            sent.append(1)
+            yield b"\0" * 16000
+
+    serve(lambda request: httpx.Response(200, content=body()))
+    pipeline = VoiceMediaPipeline(max_duration_seconds=30)
+
+    with pytest.raises(MediaTooLargeError):
+        download(pipeline, TWILIO_MEDIA)
+    assert len(sent) < 100
+    assert pipeline.stats["rejected_too_large"] == 1
+
+
+def test_ogg_duration_is_read_from_pages_split_across_chunks():
+    from services.media_pipeline import StreamDurationProbe
+
+    def page(granule):
+        return b"OggS\0\0" + struct.pack("<q", granule) + b"\0" * 50
+
+    stream = page(0) + page(48000 * 10) + page(48000 * 40)
+    probe = StreamDurationProbe()
+    durations = [probe.feed(stream[i:i + 7]) for i in range(0, len(stream), 7)]
+
+    assert durations[-1] == 40
+    assert max(d for d in durations if d is not None) == 40
@@ -0,0 +1,69 @@
+# backend/tests/test_metrics.py
+"""Histogram bucketing, quantiles and Prometheus text rendering"""
+
+import math
+import random
+
+import pytest
+
+from utils.metrics import BUCKET_BOUNDS, FOLD_SIZE, MAX_EXP, SUB_BUCKETS, MetricsRegistry, _HistogramChild
+
+# Widest bucket relative to its lower bound (the first sub-bucket of each power of two)
+RESOLUTION = 1 + 1 / SUB_BUCKETS
+
+
+def bucket_of(value: float) -> float:
+    """Upper bound of the bucket a single observation lands in"""
+    child = _HistogramChild()
+    child.observe(value)
+    return child.quantile(0.5)
+
+
+@pytest.mark.parametrize("value", [1e-5, 0.003, 0.1, 0.25, 0.2500001, 1.0, 7.5, 300.0])
+def test_each_value_lands_in_the_bucket_that_bounds_it(value):
+    upper = bucket_of(value)
+    index = BUCKET_BOUNDS.index(upper)
+
+    assert value <= upper
+    assert index == 0 or value > BUCKET_BOUNDS[index - 1]
+    assert upper <= value * RESOLUTION
+
+
+def test_values_outside_the_range_are_clamped():
+    assert bucket_of(0.0) == BUCKET_BOUNDS[0]
+    assert bucket_of(-1.0) == BUCKET_BOUNDS[0]
+    assert bucket_of(2.0 ** (MAX_EXP + 1)) == math.inf
+
+
+def test_quantiles_track_the_exact_values():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(-3, 1) for _ in range(3 * FOLD_SIZE + 17)]
+    child = _HistogramChild()
+    for value in values:
+        child.observe(value)
+
+    ordered = sorted(values)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[math.ceil(q * len(ordered)) - 1]
+        assert exact <= child.quantile(q) <= exact * RESOLUTION
+    assert child.count == len(values)
+    assert child.sum == pytest.approx(sum(values))
+
+
+def test_empty_histogram_has_no_quantile():
+    assert _HistogramChild().quantile(0.99) is None
+
+
+def test_render_emits_cumulative_buckets():
+    registry = MetricsRegistry(prefix="test_")
+    histogram = registry.histogram("latency_seconds", "Test latency", ["stage"])
+    child = histogram.labels("ai")
+    for value in (0.01, 0.02, 0.02, 0.5):
+        child.observe(value)
+
+    lines = [line for line in registry.render().splitlines() if line.startswith("test_latency_seconds_bucket")]
+    counts = [int(line.rsplit(" ", 1)[1]) for line in lines]
+
+    assert counts == sorted(counts)
+    assert lines[-1] == 'test_latency_seconds_bucket{stage="ai",le="+Inf"} 4'
+    assert 'test_latency_seconds_count{stage="ai"} 4' in registry.render()
@@ -0,0 +1,81 @@
+# backend/tests/test_mood_tracker.py
+"""Mood aggregates: moving averages, idle expiry, the user cap and snapshots"""
+
+import asyncio
+
+import pytest
+
+from services import mood_tracker as mood_module
+from services.mood_tracker import FAST_ALPHA, SLOW_ALPHA, MoodTracker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the tracker module"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(mood_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_running_aggregates_and_moving_averages():
+    tracker = MoodTracker(snapshot_path="")
+    for score in (-0.5, 0.5, 1.0):
+        snapshot = tracker.record("u1", score, "swahili")
+
+    fast = slow = -0.5
+    for score in (0.5, 1.0):
+        fast += FAST_ALPHA * (score - fast)
+        slow += SLOW_ALPHA * (score - slow)
+
+    assert snapshot.count == 3
+    assert snapshot.average == pytest.approx(1.0 / 3)
+    assert snapshot.ewma_fast == pytest.approx(fast)
+    assert snapshot.ewma_slow == pytest.approx(slow)
+    assert snapshot.trend == "improving"
+    assert snapshot.primary_language == "swahili"
+
+
+def test_idle_users_expire(clock):
+    tracker = MoodTracker(idle_ttl_seconds=60, snapshot_path="")
+    tracker.record("idle", 0.1)
+    clock[0] += 30
+    tracker.record("active", 0.1)
+    clock[0] += 45
+
+    assert "idle" not in tracker
+    assert tracker.get("active").count == 1
+    assert tracker.stats["expired"] == 1
+
+
+def test_least_recently_updated_user_is_evicted_and_row_reused(clock):
+    tracker = MoodTracker(max_users=2, snapshot_path="")
+    tracker.record("a", 0.1)
+    tracker.record("b", 0.1)
+    tracker.record("a", 0.2)  # "b" is now the least recently updated
+    tracker.record("c", 0.3)
+
+    assert "b" not in tracker
+    assert tracker.get("a").count == 2
+    assert tracker.get("c").count == 1
+    assert tracker.memory_usage()["allocated_rows"] == 3
+
+    tracker.record("d", 0.3)  # evicts "a"; the next new user reuses a freed row
+    tracker.record("e", 0.3)
+    assert tracker.memory_usage()["allocated_rows"] == 3
+    assert tracker.stats["evicted"] == 3
+
+
+def test_snapshot_round_trip_keeps_newest_rows(tmp_path, clock):
+    path = str(tmp_path / "mood.json")
+    saved = MoodTracker(snapshot_path=path)
+    saved.record("u1", -0.4)
+    saved.record("u1", 0.2)
+    assert asyncio.run(saved.save_snapshot()) == 1
+
+    restored = MoodTracker(snapshot_path=path)
+    clock[0] += 10
+    restored.record("u2", 0.5)
+
+    assert restored.load_snapshot() == 1
+    assert restored.get("u1") == saved.get("u1")
+    assert restored.get("u2").count == 1
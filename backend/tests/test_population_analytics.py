@@ -0,0 +1,58 @@
+# backend/tests/test_population_analytics.py
+"""Population analytics: cohort aggregates, compaction and the report cache"""
+
+import numpy as np
+
+from services.population_analytics import PopulationAnalytics
+from utils.config import settings
+
+NOW = 1_800_000_000.0
+
+
+def test_cohorts_aggregate_per_platform_and_language():
+    analytics = PopulationAnalytics(max_users=100)
+    analytics.record_turn("a", "web", "en", 1.0, "improving", now=NOW)
+    analytics.record_turn("a", "web", "en", 2.0, "improving", now=NOW)
+    analytics.record_turn("b", "sms", "sw", -1.0, "declining", 0.9, True, now=NOW)
+
+    cohorts = {(c["platform"], c["language"]): c for c in analytics.cohorts(now=NOW)}
+    assert cohorts[("web", "en")]["users"] == 1
+    assert cohorts[("web", "en")]["turns"] == 2
+    assert cohorts[("web", "en")]["average_mood"] == 2.0
+    assert cohorts[("sms", "sw")]["users_with_crisis"] == 1
+    assert cohorts[("sms", "sw")]["escalations"] == 1
+    assert analytics.hourly_rates(1, now=NOW)[0]["crisis_rate"] == 0.3333
+
+
+def test_compact_drops_idle_users_then_oldest_tenth():
+    analytics = PopulationAnalytics(max_users=100, retention_days=1)
+    analytics.record_turn("idle", "web", "en", 0.0, "stable", now=NOW - 2 * 86400)
+    analytics.record_turn("active", "web", "en", 0.0, "stable", now=NOW)
+    analytics.compact(now=NOW)
+    assert analytics.size == 1
+    assert analytics.cohorts(now=NOW)[0]["users"] == 1
+
+
+def test_compact_keeps_newest_rows_when_timestamps_tie():
+    analytics = PopulationAnalytics(max_users=1000)
+    users = [f"u{i}" for i in range(20)]
+    analytics.bulk_load(users, last_seen=np.full(20, NOW))
+    analytics.compact(now=NOW)
+    assert analytics.size == 18
+
+
+def test_report_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(settings, "analytics_cache_entries", 3)
+    analytics = PopulationAnalytics(max_users=100)
+    analytics.record_turn("a", "web", "en", 0.0, "stable")
+
+    for hours in range(1, 11):
+        analytics.report(("platform",), None, hours)
+    assert len(analytics._report_cache) == 3
+
+    analytics.report(("platform",), None, 10)
+    assert analytics.stats["cache_hits"] == 1
+    # Out-of-range hours share the clamped entry
+    analytics.report(("platform",), None, 10_000)
+    analytics.report(("platform",), None, 20_000)
+    assert analytics.stats["cache_hits"] == 2
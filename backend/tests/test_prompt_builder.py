@@ -0,0 +1,102 @@
+# backend/tests/test_prompt_builder.py
+"""Incremental prompt windows: message limits, token budgets, trimming and fit"""
+
+import json
+
+from models.session_models import ConversationMessage, MessageRole
+from services.prompt_builder import (
+    PromptBuilder,
+    encode_messages,
+    estimate_tokens,
+    request_body,
+    request_prefix,
+    system_prompt,
+    window_from_history,
+)
+
+
+def contents(window):
+    return [json.loads(encoded)["content"] for encoded in window.messages]
+
+
+def builder_with(*texts):
+    builder = PromptBuilder()
+    for i, text in enumerate(texts):
+        builder.append(MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT, text)
+    return builder
+
+
+def test_window_keeps_the_newest_messages_in_order():
+    builder = builder_with("one", "two", "three", "four")
+
+    window = builder.window(limit=2)
+
+    assert contents(window) == ["three", "four"]
+    assert window.start == 2
+    assert window.dropped_tokens == estimate_tokens("one") + estimate_tokens("two")
+
+
+def test_system_messages_are_not_sent_but_keep_positions():
+    builder = PromptBuilder()
+    builder.append(MessageRole.USER, "hello")
+    builder.append(MessageRole.SYSTEM, "internal note")
+    builder.append(MessageRole.ASSISTANT, "hi there")
+
+    assert contents(builder.window()) == ["hello", "hi there"]
+    assert len(builder) == 3
+    assert builder.token_estimate == estimate_tokens("hello") + estimate_tokens("hi there")
+
+
+def test_budget_reserves_room_for_the_summary():
+    builder = builder_with("first message", "second message", "third message")
+    builder.set_summary("The user talked about exams.", upto=1)
+    budget = builder.summary.tokens + estimate_tokens("third message")
+
+    window = builder.window(budget=budget)
+
+    assert contents(window) == ["third message"]
+    assert window.context_summary is builder.summary
+    assert window.unsummarized == 1  # "second message" is dropped but not yet summarized
+    assert window.tokens <= budget
+
+
+def test_summary_is_not_sent_when_everything_fits():
+    builder = builder_with("a", "b")
+    builder.set_summary("Nothing yet.", upto=0)
+
+    assert builder.window().context_summary is None
+
+
+def test_trim_mirrors_history_and_keeps_positions_stable():
+    builder = builder_with("one", "two", "three", "four")
+    builder.trim(2)
+
+    window = builder.window()
+    assert contents(window) == ["three", "four"]
+    assert window.start == 2
+    assert builder.end == 4
+    assert builder.index(3) == 1
+    assert builder.token_estimate == estimate_tokens("three") + estimate_tokens("four")
+
+
+def test_fit_narrows_a_window_to_a_provider_budget():
+    window = builder_with("one", "two", "three").window()
+
+    fitted = window.fit(estimate_tokens("three"))
+
+    assert contents(fitted) == ["three"]
+    assert fitted.dropped_tokens == estimate_tokens("one") + estimate_tokens("two")
+    assert fitted.unsummarized == 2
+    assert window.fit(10_000) is window
+
+
+def test_request_body_is_valid_json():
+    history = [ConversationMessage(role=MessageRole.USER, content="Habari"),
+               ConversationMessage(role=MessageRole.ASSISTANT, content="Nzuri, asante")]
+    window = window_from_history(history)
+    body = request_body(request_prefix(model="m", temperature=0.7), encode_messages(system_prompt("sw"), window, "Nimechoka"))
+
+    parsed = json.loads(body)
+    assert parsed["model"] == "m"
+    assert [m["role"] for m in parsed["messages"]] == ["system", "user", "assistant", "user"]
+    assert parsed["messages"][-1]["content"] == "Nimechoka"
@@ -0,0 +1,90 @@
+# backend/tests/test_providers.py
+"""Provider registry and router: configuration, weighted ranking and fallback"""
+
+import asyncio
+import random
+from collections import Counter
+
+import httpx
+
+from services.providers import ProviderRegistry, ProviderRouter
+from utils.config import settings
+
+BUILTINS_OFF = [{"name": "cerebras", "enabled": False}, {"name": "openrouter", "enabled": False}]
+
+
+def registry(*entries):
+    return ProviderRegistry(BUILTINS_OFF + [
+        {"base_url": f"https://{entry['name']}.example/v1", "model": "m", "api_key": "k", **entry}
+        for entry in entries
+    ])
+
+
+def first_picks(router, draws=2000):
+    random.seed(11)
+    return Counter(router.rank()[0].name for _ in range(draws))
+
+
+def test_registry_adds_and_overrides_entries_by_name():
+    providers = ProviderRegistry([{"name": "cerebras", "api_key": "k", "model": "override"}, {"name": "bad"}])
+
+    assert providers.get("cerebras").model == "override"
+    assert providers.get("bad") is None  # missing required fields: ignored, not fatal
+    assert "cerebras" in [p.name for p in providers.configured()]
+
+
+def test_faster_provider_gets_most_first_picks_but_not_all():
+    router = ProviderRouter(registry({"name": "fast", "expected_latency": 0.5}, {"name": "slow", "expected_latency": 2.0}))
+
+    picks = first_picks(router)
+
+    assert picks["fast"] > 0.9 * sum(picks.values())
+    assert picks["slow"] > 0  # exploration keeps the slower provider sampled
+    assert {p.name for p in router.rank()} == {"fast", "slow"}  # the other provider is always a fallback
+
+
+def test_errors_and_cost_push_a_provider_down():
+    router = ProviderRouter(registry(
+        {"name": "a", "expected_latency": 1.0},
+        {"name": "b", "expected_latency": 1.0, "input_price": 50.0},
+    ))
+    assert router.preferred == "a"
+
+    for _ in range(10):
+        router.record("a", ok=False)
+    assert router.preferred == "b"
+
+
+def test_rate_limited_provider_goes_last_until_retry_after():
+    router = ProviderRouter(registry({"name": "fast", "expected_latency": 0.5}, {"name": "slow", "expected_latency": 2.0}))
+
+    router.update_limits("fast", 429, {"retry-after": "30"})
+
+    assert [p.name for p in router.rank()] == ["slow", "fast"]
+    assert not router.saturated
+    router.update_limits("slow", 429, {})
+    assert router.saturated
+
+
+def test_generation_falls_back_to_the_next_provider(monkeypatch):
+    from services.ai_service import AIService
+
+    monkeypatch.setattr(settings, "ai_stream_cutoff", False)
+    monkeypatch.setattr(random, "choices", lambda population, weights: [0])
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.host)
+        if request.url.host == "broken.example":
+            return httpx.Response(500, text="upstream error")
+        return httpx.Response(200, json={"choices": [{"message": {"content": "Niko hapa kukusikiliza."}}]})
+
+    service = AIService(registry({"name": "broken", "expected_latency": 0.1}, {"name": "backup", "expected_latency": 3.0}))
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    reply = asyncio.run(service.generate_response("Nina huzuni leo", language="sw", user_id="test-fallback"))
+
+    assert seen == ["broken.example", "backup.example"]
+    assert reply == "Niko hapa kukusikiliza."
+    assert reply.provider == "backup"
+    assert service.router.get_stats()["broken"]["error_rate"] > 0
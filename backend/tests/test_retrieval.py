@@ -0,0 +1,55 @@
+# backend/tests/test_retrieval.py
+"""BM25 retrieval: ranking, language filtering and the knowledge base wrapper"""
+
+from services.retrieval import BM25Index, Snippet, knowledge_base, tokenize
+
+
+def snippet(doc_id, language="en"):
+    return Snippet(doc_id, doc_id, language, "topic", "coping")
+
+
+def build(*docs):
+    return BM25Index((snippet(doc_id, language), text) for doc_id, language, text in docs)
+
+
+def test_tokenize_stems_and_drops_stopwords():
+    assert tokenize("I was feeling worried and breathing slowly") == ["feel", "worri", "breath", "slowly"]
+
+
+def test_rarer_and_repeated_terms_rank_higher():
+    index = build(
+        ("sleep", "en", "sleep sleep sleep routine at night"),
+        ("sleep-once", "en", "sleep routine and exercise"),
+        ("exercise", "en", "exercise routine walking outside"),
+    )
+
+    ranked = [s.doc_id for _, s in index.search("sleep routine", k=3)]
+
+    # "exercise" matches only the common term "routine", so it scores lowest
+    assert ranked == ["sleep", "sleep-once", "exercise"]
+
+
+def test_language_filter_keeps_language_and_any():
+    index = build(
+        ("en", "en", "breathing exercise for anxiety"),
+        ("sw", "sw", "zoezi la kupumua anxiety"),
+        ("hotline", "any", "anxiety hotline"),
+    )
+
+    found = {s.doc_id for _, s in index.search("anxiety", k=5, language="sw")}
+
+    assert found == {"sw", "hotline"}
+
+
+def test_min_score_and_unknown_terms_return_nothing():
+    index = build(("a", "en", "breathing exercise"), ("b", "en", "walking outside"))
+
+    assert index.search("astronomy", k=3) == []
+    assert index.search("breathing", k=3, min_score=100.0) == []
+
+
+def test_knowledge_base_maps_language_names():
+    results = knowledge_base.search("nina wasiwasi siwezi kulala", language="swahili", k=3)
+
+    assert results
+    assert all(s.language in ("sw", "any") for s in results)
@@ -0,0 +1,110 @@
+# backend/tests/test_single_flight.py
+"""Single-flight cache: coalescing, stale-while-revalidate and error handling"""
+
+import asyncio
+
+import pytest
+
+from utils import single_flight
+from utils.single_flight import SingleFlightCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic() for the cache module"""
+    now = [100.0]
+    monkeypatch.setattr(single_flight.time, "monotonic", lambda: now[0])
+    return now
+
+
+class Source:
+    """Counts computations; each one can be held open until released"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = None
+
+    async def compute(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        return self.calls
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = SingleFlightCache("test-coalesce", ttl=10)
+    source = Source()
+
+    async def scenario():
+        source.release = asyncio.Event()
+        callers = [asyncio.create_task(cache.get("k", source.compute)) for _ in range(20)]
+        await asyncio.sleep(0)
+        source.release.set()
+        return await asyncio.gather(*callers)
+
+    assert asyncio.run(scenario()) == [1] * 20
+    assert source.calls == 1
+    assert cache.get_stats()["coalesced"] == 19
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(clock):
+    cache = SingleFlightCache("test", ttl=10, stale_ttl=30)
+    source = Source()
+
+    async def scenario():
+        await cache.get("k", source.compute)
+        clock[0] += 15  # past the TTL, inside the stale window
+        source.release = asyncio.Event()
+        stale = [await cache.get("k", source.compute) for _ in range(5)]
+        source.release.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return stale, await cache.get("k", source.compute)
+
+    stale, refreshed = asyncio.run(scenario())
+    assert stale == [1] * 5
+    assert refreshed == 2
+    assert source.calls == 2
+
+
+def test_entries_past_the_stale_window_are_recomputed(clock):
+    cache = SingleFlightCache("test", ttl=10, stale_ttl=5)
+    source = Source()
+
+    async def scenario():
+        await cache.get("k", source.compute)
+        clock[0] += 20
+        return await cache.get("k", source.compute)
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_failure_reaches_every_waiter_and_is_not_cached():
+    cache = SingleFlightCache("test", ttl=10)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0)
+        raise RuntimeError("provider down")
+
+    async def scenario():
+        results = await asyncio.gather(*(cache.get("k", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        with pytest.raises(RuntimeError):
+            await cache.get("k", failing)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_oldest_entries_are_dropped_past_max_entries():
+    cache = SingleFlightCache("test", ttl=10, max_entries=2)
+
+    async def scenario():
+        for key in ("a", "b", "c"):
+            await cache.get(key, lambda: asyncio.sleep(0, result=key))
+
+    asyncio.run(scenario())
+    assert cache.peek("a") is None
+    assert cache.peek("c") == "c"
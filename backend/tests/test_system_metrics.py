@@ -0,0 +1,33 @@
+# backend/tests/test_system_metrics.py
+"""Background system sampler"""
+
+import asyncio
+
+from services.system_metrics import SystemMetricsSampler
+
+
+def test_latest_reports_warming_up_without_sampling_inline():
+    sampler = SystemMetricsSampler(interval=60)
+    assert sampler.latest() == {"status": "warming_up", "interval_seconds": 60}
+    assert sampler.history() == []
+
+
+def test_first_sample_arrives_one_interval_after_start():
+    async def run():
+        sampler = SystemMetricsSampler(interval=0.2)
+        sampler.start()
+        try:
+            await asyncio.sleep(0.05)
+            assert sampler.latest()["status"] == "warming_up"
+            await asyncio.sleep(0.3)
+            latest = sampler.latest()
+        finally:
+            await sampler.stop()
+        return sampler, latest
+
+    sampler, latest = asyncio.run(run())
+    assert "status" not in latest
+    assert latest["age_seconds"] >= 0
+    assert set(latest) >= {"cpu", "memory", "disk", "process"}
+    assert sampler.history(seconds=60) == sampler.history()
+    assert sampler.history(seconds=0) == []
@@ -0,0 +1,49 @@
+# backend/tests/test_voice.py
+"""Voice endpoint: transcription goes through the same chat turn as typed messages"""
+
+from services.media_pipeline import media_pipeline
+
+
+def test_voice_message_is_answered(client, monkeypatch):
+    async def transcribe(media_url, language="sw"):
+        return "Nina wasiwasi sana kuhusu kazi yangu"
+
+    monkeypatch.setattr(media_pipeline, "process", transcribe)
+
+    response = client.post("/api/v1/voice", json={
+        "audio_url": "https://api.twilio.com/2010-04-01/Accounts/AC1/Messages/MM1/Media/ME1",
+        "user_id": "test-voice",
+    })
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["transcription"] == "Nina wasiwasi sana kuhusu kazi yangu"
+    assert body["response"]["response"]
+    assert body["voice_url"].endswith(".wav")
+
+
+def test_voice_rejects_media_off_the_allowlist(client):
+    response = client.post("/api/v1/voice", json={
+        "audio_url": "https://attacker.example/?x=twilio.com",
+        "user_id": "test-voice",
+    })
+
+    assert response.status_code == 400
+
+
+
+def test_voice_audio_only_serves_digest_keys(client, monkeypatch, tmp_path):
+    import asyncio
+
+    from services.tts_cache import tts_cache
+
+    monkeypatch.setattr(tts_cache, "cache_dir", tmp_path / "tts")
+    key, _ = asyncio.run(tts_cache.get_or_synthesize("Pole sana", "sw"))
+    assert client.get(f"/api/v1/voice/audio/{key}.wav").status_code == 200
+
+    # A file a 64-character non-hex key would resolve to is never served
+    planted = tts_cache._path_for("Z" * 64)
+    planted.parent.mkdir(parents=True)
+    planted.write_bytes(b"RIFF")
+    assert client.get(f"/api/v1/voice/audio/{'Z' * 64}.wav").status_code == 404
+    assert client.get(f"/api/v1/voice/audio/{key.upper()}.wav").status_code == 404
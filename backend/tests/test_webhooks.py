@@ -0,0 +1,91 @@
+# backend/tests/test_webhooks.py
+"""WhatsApp webhook: voice notes are acknowledged at once and answered out of band"""
+
+from urllib.parse import urlencode
+
+import pytest
+
+from utils.config import settings
+
+WEBHOOK = "http://testserver/api/v1/webhook/whatsapp"
+
+
+@pytest.fixture
+def twilio(monkeypatch):
+    """Twilio credentials plus a signer for webhook bodies"""
+    from twilio.request_validator import RequestValidator
+
+    import webhooks
+
+    monkeypatch.setattr(settings, "twilio_account_sid", "AC1")
+    monkeypatch.setattr(settings, "twilio_auth_token", "secret")
+    monkeypatch.setattr(webhooks, "_validator", None)
+
+    def sign(params):
+        return RequestValidator("secret").compute_signature(WEBHOOK, params)
+
+    return sign
+
+
+def post_webhook(client, sign, params):
+    return client.post(
+        WEBHOOK,
+        content=urlencode(params),
+        headers={"Content-Type": "application/x-www-form-urlencoded", "X-Twilio-Signature": sign(params)},
+    )
+
+
+def test_voice_note_is_acknowledged_and_answered_in_background(client, twilio, monkeypatch):
+    from services.container import container
+    from services.media_pipeline import media_pipeline
+
+    events = []
+
+    async def transcribe(media_url, language="sw"):
+        events.append("transcribed")
+        return "Nina wasiwasi sana kuhusu kazi yangu"
+
+    async def send(to_number, message, is_crisis=False, media_url=None):
+        events.append(("sent", to_number, media_url))
+        return True
+
+    monkeypatch.setattr(media_pipeline, "process", transcribe)
+    monkeypatch.setattr(container.whatsapp, "send_whatsapp_message", send)
+
+    response = post_webhook(client, twilio, {
+        "From": "whatsapp:+254700000001",
+        "Body": "",
+        "NumMedia": "1",
+        "MediaUrl0": "https://api.twilio.com/2010-04-01/Accounts/AC1/Messages/MM1/Media/ME1",
+    })
+
+    assert response.status_code == 200
+    assert "<Message>" not in response.text
+    assert events[0] == "transcribed"
+    _, to_number, media_url = events[1]
+    assert to_number == "+254700000001"
+    assert media_url.endswith(".wav")
+
+
+def test_twilio_form_parsing_keeps_blank_and_encoded_values():
+    from webhooks import parse_twilio_form
+
+    params = parse_twilio_form(b"From=whatsapp%3A%2B254700000001&Body=Habari+yako%3F&NumMedia=0&MediaUrl0=")
+
+    assert params == {"From": "whatsapp:+254700000001", "Body": "Habari yako?", "NumMedia": "0", "MediaUrl0": ""}
+
+
+def test_undecodable_webhook_body_is_rejected_not_crashed(client, twilio):
+    response = client.post(
+        WEBHOOK,
+        content=b"From=whatsapp%3A%2B254700000001&Body=\xff\xfe",
+        headers={"Content-Type": "application/x-www-form-urlencoded", "X-Twilio-Signature": "bad"},
+    )
+
+    assert response.status_code == 403
+
+
+def test_malformed_payload_is_a_400(client, twilio):
+    response = post_webhook(client, twilio, {"Body": "no sender"})
+
+    assert response.status_code == 400
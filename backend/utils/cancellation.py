@@ -0,0 +1,70 @@
+# backend/utils/cancellation.py
+"""
+Client disconnect handling for Mazungumzo AI
+
+run_until_disconnect() runs a coroutine as a task while waiting for the
+ASGI http.disconnect message. If the client goes away first (tab closed,
+reverse proxy timeout), the task is cancelled. The CancelledError unwinds
+through the provider HTTP call, which closes its connection, so upstream
+generation and the local slot are released at once instead of running to
+completion for nobody.
+"""
+
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi import Request
+
+from .logging_config import get_logger
+from .metrics import metrics
+
+logger = get_logger("cancellation")
+
+T = TypeVar("T")
+
+# Status recorded for requests abandoned by the client (nginx convention)
+CLIENT_CLOSED_REQUEST = 499
+
+DISCONNECTS = metrics.counter(
+    "client_disconnects_total", "Requests whose client disconnected before the response", ["stage"]
+)
+
+
+class ClientDisconnected(Exception):
+    """The client closed the connection before the work finished"""
+
+
+async def wait_for_disconnect(request: Request):
+    """Return once the client disconnects (the request body must already have been read)"""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_until_disconnect(request: Request, work: Awaitable[T], stage: str = "request") -> T:
+    """
+    Await `work`, cancelling it if the client disconnects first
+
+    Raises ClientDisconnected after the cancelled work has finished
+    unwinding, so its cleanup (closing provider connections, metrics)
+    is complete when the caller gives up on the request.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        await asyncio.wait((task, watcher), return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+
+    if task.done():
+        return task.result()
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    DISCONNECTS.labels(stage).inc()
+    logger.info(f"🔌 Client disconnected during {stage}; work cancelled")
+    raise ClientDisconnected(stage)
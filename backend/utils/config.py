@@ -60,14 +60,110 @@ class Settings(BaseSettings):
     max_tokens: int = 200
     temperature: float = 0.7
     ai_timeout: float = 15.0
+    ai_stream_cutoff: bool = True  # stream short-channel replies and stop at the channel limit
+    ai_chars_per_token: float = 3.0  # conservative reply size estimate for per-platform max_tokens
+    
+    # Adaptive AI timeouts (from recent latency quantiles; ai_timeout applies until enough samples)
+    ai_timeout_adaptive: bool = True
+    ai_timeout_quantile: float = 0.99
+    ai_timeout_multiplier: float = 1.5
+    ai_timeout_min_samples: int = 20
+    ai_timeout_window: int = 200  # recent calls kept per provider and model
+    ai_timeout_refresh: float = 5.0  # seconds between recomputations
+    ai_connect_timeout: float = 3.0
+    ai_ttfb_timeout_floor: float = 1.5
+    ai_ttfb_timeout_ceiling: float = 10.0
+    ai_total_timeout_floor: float = 3.0
+    ai_total_timeout_ceiling: float = 30.0
+    health_probe_timeout: float = 5.0
+    
+    # AI Provider Routing
+    # Extra OpenAI-compatible providers (JSON list of entries: name, base_url, api_key, model,
+    # rpm_limit, input_price, output_price, context_tokens, headers); an entry named
+    # "cerebras" or "openrouter" overrides fields of the built-in provider
+    ai_providers: list = []
+    router_error_weight: float = 4.0  # expected latency multiplier at a 100% error rate
+    router_cost_weight: float = 1.0  # seconds of latency one US cent of request cost is worth
+    router_headroom_weight: float = 2.0  # score multiplier as the rate limit runs out
+    router_sharpness: float = 4.0  # higher sends more of the load to the best provider
+    router_exploration: float = 0.05  # minimum pick weight, keeps every provider's latency fresh
+    router_smoothing: float = 0.2  # weight of the newest call in latency and error averages
+    router_rate_limit_cooldown: float = 10.0  # seconds to skip a provider after a 429 without Retry-After
+    ai_max_inflight: int = 32  # provider calls in flight before non-crisis turns get local replies (0: no limit)
     
     # Crisis Detection Configuration
     crisis_confidence_threshold: float = 0.5
     max_conversation_history: int = 6
     
+    # Context Window (token budgets are estimates for history plus summary)
+    context_max_messages: int = 20
+    context_token_budget: int = 1200  # providers without their own budget
+    cerebras_context_tokens: int = 1500
+    openrouter_context_tokens: int = 1000
+    context_summary_min_messages: int = 4  # dropped messages before the summary is refreshed
+    context_summary_max_chars: int = 800
+    context_summary_tokens: int = 160  # max_tokens for the summary completion
+    
+    # Local Retrieval (BM25 over coping strategies, psychoeducation and resources)
+    retrieval_enabled: bool = True
+    retrieval_top_k: int = 3
+    retrieval_min_score: float = 2.0  # BM25 score below which a snippet is not injected
+    
+    # Voice Media Pipeline
+    stt_engine: str = "stub"  # stub (offline) or whisper
+    stt_workers: int = 2
+    stt_queue_limit: int = 32
+    voice_max_bytes: int = 16 * 1024 * 1024  # WhatsApp media limit
+    voice_max_duration_seconds: float = 300.0
+    media_download_timeout: float = 20.0
+    # Hosts voice media may be fetched from (".example.com" also matches subdomains); Twilio media
+    # URLs redirect to its CDN. Anything else, including redirect targets, is refused.
+    media_allowed_hosts: list = ["api.twilio.com", ".twilio.com", ".twiliocdn.com"]
+    media_max_redirects: int = 3
+    
+    # Voice Reply Synthesis
+    tts_engine: str = "stub"
+    tts_voice: str = "default"
+    tts_cache_dir: str = "data/tts_cache"
+    tts_cache_max_bytes: int = 256 * 1024 * 1024
+    voice_public_base_url: str = "/api/v1/voice/audio"
+    
+    # Mood Tracking
+    mood_max_users: int = 50000
+    mood_idle_ttl_hours: float = 72.0
+    mood_snapshot_path: str = "data/mood_snapshot.json"  # empty disables persistence
+    mood_snapshot_interval: int = 300  # seconds
+    
+    # Population Analytics
+    analytics_max_users: int = 2_000_000
+    analytics_retention_days: float = 30.0
+    analytics_history_hours: int = 168
+    analytics_cache_seconds: int = 30
+    analytics_cache_entries: int = 64  # cached reports (one per parameter set), least recently used evicted
+    
+    # System Metrics Sampling
+    metrics_sample_interval: float = 5.0  # seconds
+    metrics_history_size: int = 120
+    
+    # Response Caching (single-flight, stale-while-revalidate)
+    health_cache_ttl: float = 60.0
+    health_cache_stale: float = 240.0
+    stats_cache_ttl: float = 5.0
+    stats_cache_stale: float = 30.0
+    resources_cache_ttl: float = 300.0
+    resources_cache_stale: float = 3600.0
+    
+    # Request Tracing
+    tracing_server_timing: bool = True  # Server-Timing header on every response
+    tracing_sample_rate: float = 0.0  # fraction of requests logged as JSON traces
+    
     # Session Management
     session_cleanup_hours: int = 24
     max_sessions: int = 10000
+    session_backend: str = "json"  # json or memory
+    session_store_path: str = "data/user_sessions.json"
+    session_max_messages: int = 50
+    session_flush_delay: float = 0.5  # seconds of changes coalesced into one write
     
     # Rate Limiting
     rate_limit_requests: int = 100
@@ -76,6 +172,11 @@ class Settings(BaseSettings):
     # Logging Configuration
     log_level: str = "INFO"
     log_format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    log_file: Optional[str] = None
+    log_json: bool = False  # one JSON object per line (includes trace_id)
+    log_queue: bool = True  # format and write logs on a background thread
+    log_sample_per_second: float = 10.0  # per high-volume event type; 0 logs all
+    log_sample_burst: int = 20
     
     class Config:
         env_file = ".env"
@@ -100,7 +201,9 @@ class Settings(BaseSettings):
     @property
     def has_ai_config(self) -> bool:
         """Check if any AI service is configured"""
-        return self.has_cerebras_config or self.has_openrouter_config
+        return self.has_cerebras_config or self.has_openrouter_config or any(
+            provider.get("api_key") for provider in self.ai_providers
+        )
 
 
 # Global settings instance
@@ -138,7 +241,7 @@ def validate_environment():
     issues = []
     
     if not settings.has_ai_config:
-        issues.append("No AI service configured (CEREBRAS_API_KEY or OPENROUTER_API_KEY required)")
+        issues.append("No AI service configured (CEREBRAS_API_KEY, OPENROUTER_API_KEY or an AI_PROVIDERS entry required)")
     
     if settings.environment == "production":
         if settings.cors_origins == ["*"]:
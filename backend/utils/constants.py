@@ -36,6 +36,15 @@ MENTAL_HEALTH_TOPICS = {
     "financial": ["money", "debt", "poor", "poverty", "bills", "expenses"]
 }
 
+# Mood keywords for simple per-message mood scoring
+MOOD_KEYWORDS = {
+    "positive": ["happy", "good", "better", "hopeful", "furaha", "nzuri"],
+    "negative": ["sad", "bad", "worse", "hopeless", "huzuni", "mbaya"]
+}
+
+# Words that trigger family-focused cultural context
+FAMILY_KEYWORDS = ["family", "familia"]
+
 # Response templates for different scenarios
 RESPONSE_TEMPLATES = {
     "crisis_detected": {
@@ -3,12 +3,42 @@
 Logging configuration for Mazungumzo AI
 """
 
+import atexit
+import copy
+import functools
+import json
 import logging
+import logging.handlers
+import queue
+import re
 import sys
-from typing import Optional
+import threading
+import time
+from typing import Dict, Optional, Tuple
 from datetime import datetime
 import os
 
+from .metrics import AI_DURATION, AI_ERRORS, CRISIS_DETECTIONS, STAGE_DURATION, STAGE_ERRORS, metrics
+from .tracing import current_trace, span
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and goes into JSON output
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "app_name", "timestamp_iso", "trace_id"
+}
+
+# `api_key=...`, `"token": "..."`, `Authorization: Bearer ...` and similar, matched in one pass
+_SENSITIVE_RE = re.compile(
+    r"""(?i)((?:api[_-]?key|token|password|secret|authorization)["']?\s*[:=]\s*["']?(?:bearer\s+)?)[^\s"',;&]+"""
+)
+REDACTED = "***REDACTED***"
+
+LOGS_SUPPRESSED = metrics.counter(
+    "log_events_suppressed_total", "High-volume log events dropped by sampling", ["event"]
+)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_traceback_formatter = logging.Formatter()
+
 
 class ColoredFormatter(logging.Formatter):
     """Custom formatter with colors for different log levels"""
@@ -24,6 +54,9 @@ class ColoredFormatter(logging.Formatter):
     }
     
     def format(self, record):
+        # Color a copy so other handlers sharing the record see plain names
+        record = copy.copy(record)
+        
         # Add color to levelname
         if record.levelname in self.COLORS:
             record.levelname = f"{self.COLORS[record.levelname]}{record.levelname}{self.COLORS['RESET']}"
@@ -34,30 +67,131 @@ class ColoredFormatter(logging.Formatter):
         return super().format(record)
 
 
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, trace id and `extra=` fields"""
+    
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            payload["trace_id"] = trace_id
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def redact(text: str) -> str:
+    """Mask credential values (api_key=..., token: ..., Bearer ...) in a log message"""
+    return _SENSITIVE_RE.sub(lambda m: m.group(1) + REDACTED, text)
+
+
+def _stamp_trace(record: logging.LogRecord):
+    if not hasattr(record, "trace_id"):
+        trace = current_trace()
+        record.trace_id = trace.trace_id if trace is not None else None
+
+
 class MazungumzoFilter(logging.Filter):
     """Custom filter for Mazungumzo-specific logging"""
     
     def filter(self, record):
         # Add custom attributes
         record.app_name = "Mazungumzo"
-        record.timestamp_iso = datetime.now().isoformat()
+        record.timestamp_iso = datetime.fromtimestamp(record.created).isoformat()
+        _stamp_trace(record)
         
-        # Filter out sensitive information
-        if hasattr(record, 'msg') and isinstance(record.msg, str):
-            # Don't log API keys or tokens
-            sensitive_patterns = ['api_key', 'token', 'password', 'secret']
-            for pattern in sensitive_patterns:
-                if pattern.lower() in record.msg.lower():
-                    record.msg = record.msg.replace(pattern, '***REDACTED***')
+        # Filter out sensitive information with a single precompiled pass
+        msg = record.msg
+        if isinstance(msg, str):
+            if record.args:
+                msg = record.getMessage()
+                record.args = None
+            record.msg = redact(msg)
         
         return True
 
 
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that captures the request trace id before the record leaves the request's context"""
+    
+    def prepare(self, record):
+        # Lighter than QueueHandler.prepare (which formats and copies every
+        # record): only merge args and render tracebacks, leaving formatting
+        # to the listener's handlers
+        _stamp_trace(record)
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogSampler:
+    """
+    Per-event token bucket for high-volume log lines
+    
+    Each event key may log `burst` lines at once and `per_second` lines per
+    second after that; the rest are counted and reported on the next line
+    that gets through. per_second <= 0 disables sampling.
+    """
+    
+    def __init__(self, per_second: float = 0.0, burst: int = 10):
+        self.configure(per_second, burst)
+    
+    def configure(self, per_second: float, burst: int = 10):
+        self.per_second = per_second
+        self.burst = max(burst, 1)
+        # key -> [tokens, last refill time, suppressed since last emitted line]
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+    
+    def allow(self, key: str) -> Tuple[bool, int]:
+        """(should log, events suppressed since the previous logged one)"""
+        if self.per_second <= 0:
+            return True, 0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.per_second)
+                bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                LOGS_SUPPRESSED.labels(key).inc()
+                return False, 0
+            bucket[0] -= 1.0
+            suppressed, bucket[2] = bucket[2], 0
+            return True, suppressed
+
+
+# Global sampler for high-volume events (configured by setup_logging)
+log_sampler = LogSampler()
+
+
 def setup_logging(
     level: str = "INFO",
     log_file: Optional[str] = None,
     use_colors: bool = True,
-    include_timestamp: bool = True
+    include_timestamp: bool = True,
+    json_format: bool = False,
+    queued: bool = False,
+    sample_per_second: float = 0.0,
+    sample_burst: int = 10,
+    console_format: Optional[str] = None
 ) -> logging.Logger:
     """
     Setup logging configuration for the application
@@ -67,40 +201,50 @@ def setup_logging(
         log_file: Optional file path to write logs to
         use_colors: Whether to use colored output for console
         include_timestamp: Whether to include timestamps in logs
+        json_format: Emit one JSON object per line instead of text
+        queued: Hand records to a background QueueListener thread so
+            formatting, redaction and I/O stay off the request path
+        sample_per_second: Rate limit per high-volume event (API call and
+            user interaction lines); 0 logs every event
+        sample_burst: Events per key logged before sampling kicks in
+        console_format: Override for the console text format
         
     Returns:
         Configured logger instance
     """
     
-    # Clear any existing handlers
+    # Clear any existing handlers (and stop a previous listener)
+    stop_logging()
     logging.getLogger().handlers.clear()
     
     # Set logging level
     log_level = getattr(logging, level.upper(), logging.INFO)
     logging.getLogger().setLevel(log_level)
+    log_sampler.configure(sample_per_second, sample_burst)
     
     # Create formatters
     if include_timestamp:
-        console_format = "%(asctime)s | %(app_name)s | %(name)s | %(levelname)s | %(message)s"
+        default_console_format = "%(asctime)s | %(app_name)s | %(name)s | %(levelname)s | %(message)s"
         file_format = "%(timestamp_iso)s | %(app_name)s | %(name)s | %(levelname)s | %(funcName)s:%(lineno)d | %(message)s"
     else:
-        console_format = "%(app_name)s | %(name)s | %(levelname)s | %(message)s"
+        default_console_format = "%(app_name)s | %(name)s | %(levelname)s | %(message)s"
         file_format = "%(app_name)s | %(name)s | %(levelname)s | %(funcName)s:%(lineno)d | %(message)s"
+    console_format = console_format or default_console_format
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level)
     
-    if use_colors and sys.stdout.isatty():  # Only use colors if outputting to terminal
+    if json_format:
+        console_formatter = JSONFormatter()
+    elif use_colors and sys.stdout.isatty():  # Only use colors if outputting to terminal
         console_formatter = ColoredFormatter(console_format)
     else:
         console_formatter = logging.Formatter(console_format)
     
     console_handler.setFormatter(console_formatter)
     console_handler.addFilter(MazungumzoFilter())
-    
-    # Add console handler to root logger
-    logging.getLogger().addHandler(console_handler)
+    handlers = [console_handler]
     
     # File handler (if specified)
     if log_file:
@@ -111,45 +255,95 @@ def setup_logging(
         
         file_handler = logging.FileHandler(log_file, encoding='utf-8')
         file_handler.setLevel(log_level)
-        file_formatter = logging.Formatter(file_format)
+        file_formatter = JSONFormatter() if json_format else logging.Formatter(file_format)
         file_handler.setFormatter(file_formatter)
         file_handler.addFilter(MazungumzoFilter())
-        
-        logging.getLogger().addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    if queued:
+        # Request threads only enqueue; the listener thread runs the filters and writers
+        global _listener
+        log_queue = queue.SimpleQueue()
+        logging.getLogger().addHandler(_ContextQueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+    else:
+        for handler in handlers:
+            logging.getLogger().addHandler(handler)
     
     # Get the main logger
     logger = logging.getLogger("mazungumzo")
     
     # Log startup message
     logger.info("🚀 Mazungumzo AI logging system initialized")
-    logger.info(f"📊 Log level: {level}")
+    logger.info(f"📊 Log level: {level}{' (queued)' if queued else ''}{' (json)' if json_format else ''}")
     if log_file:
         logger.info(f"📁 Log file: {log_file}")
     
     return logger
 
 
+def stop_logging():
+    """
+    Flush and stop the background listener started by setup_logging(queued=True)
+    
+    Its handlers move onto the root logger, so records logged afterwards
+    (e.g. late in shutdown) are still written, synchronously.
+    """
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, _ContextQueueHandler):
+            root.removeHandler(handler)
+    for handler in listener.handlers:
+        root.addHandler(handler)
+
+
 def get_logger(name: str) -> logging.Logger:
     """Get a logger instance for a specific module"""
     return logging.getLogger(f"mazungumzo.{name}")
 
 
 def log_api_call(logger: logging.Logger, service: str, endpoint: str, status: str, duration_ms: float):
-    """Log API calls with standardized format"""
-    logger.info(f"🔗 API Call | {service} | {endpoint} | {status} | {duration_ms:.2f}ms")
+    """Log API calls with standardized format (successful calls are sampled)"""
+    provider = service.lower()
+    AI_DURATION.labels(provider, status).observe(duration_ms / 1000)
+    if status != "SUCCESS":
+        if status != "CANCELLED":  # the client left; the provider did nothing wrong
+            AI_ERRORS.labels(provider, status).inc()
+        logger.info(f"🔗 API Call | {service} | {endpoint} | {status} | {duration_ms:.2f}ms")
+        return
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    allowed, suppressed = log_sampler.allow("api_call")
+    if allowed:
+        note = f" | +{suppressed} similar" if suppressed else ""
+        logger.info(f"🔗 API Call | {service} | {endpoint} | {status} | {duration_ms:.2f}ms{note}")
 
 
 def log_user_interaction(logger: logging.Logger, user_id: str, action: str, platform: str = "web"):
-    """Log user interactions with privacy protection"""
+    """Log user interactions with privacy protection (sampled)"""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    allowed, suppressed = log_sampler.allow("user_interaction")
+    if not allowed:
+        return
     # Hash user_id for privacy
     user_hash = hash(user_id) % 10000
-    logger.info(f"👤 User Interaction | user_{user_hash} | {action} | {platform}")
+    note = f" | +{suppressed} similar" if suppressed else ""
+    logger.info(f"👤 User Interaction | user_{user_hash} | {action} | {platform}{note}")
 
 
 def log_crisis_detection(logger: logging.Logger, user_id: str, confidence: float, keywords: list):
     """Log crisis detection events (with special attention)"""
     user_hash = hash(user_id) % 10000
     logger.warning(f"🚨 CRISIS DETECTED | user_{user_hash} | confidence: {confidence:.2f} | keywords: {len(keywords)}")
+    CRISIS_DETECTIONS.inc()
 
 
 def log_error_with_context(logger: logging.Logger, error: Exception, context: dict = None):
@@ -164,20 +358,29 @@ def log_error_with_context(logger: logging.Logger, error: Exception, context: di
 
 # Performance logging decorator
 def log_performance(func_name: str):
-    """Decorator to log function performance"""
+    """Decorator to log function performance, record it in the stage histogram and trace it as a span"""
     def decorator(func):
+        duration_metric = STAGE_DURATION.labels(func_name)
+        error_metric = STAGE_ERRORS.labels(func_name)
+        logger = get_logger("performance")
+        
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            logger = get_logger("performance")
-            start_time = datetime.now()
+            start_time = time.perf_counter()
             
             try:
-                result = func(*args, **kwargs)
-                duration = (datetime.now() - start_time).total_seconds() * 1000
-                logger.debug(f"⚡ Performance | {func_name} | {duration:.2f}ms | SUCCESS")
+                with span(func_name):
+                    result = func(*args, **kwargs)
+                duration = time.perf_counter() - start_time
+                duration_metric.observe(duration)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"⚡ Performance | {func_name} | {duration * 1000:.2f}ms | SUCCESS")
                 return result
             except Exception as e:
-                duration = (datetime.now() - start_time).total_seconds() * 1000
-                logger.warning(f"⚡ Performance | {func_name} | {duration:.2f}ms | ERROR: {str(e)}")
+                duration = time.perf_counter() - start_time
+                duration_metric.observe(duration)
+                error_metric.inc()
+                logger.warning(f"⚡ Performance | {func_name} | {duration * 1000:.2f}ms | ERROR: {str(e)}")
                 raise
         return wrapper
     return decorator
@@ -185,20 +388,29 @@ def log_performance(func_name: str):
 
 # Async performance logging decorator
 def log_async_performance(func_name: str):
-    """Decorator to log async function performance"""
+    """Decorator to log async function performance, record it in the stage histogram and trace it as a span"""
     def decorator(func):
+        duration_metric = STAGE_DURATION.labels(func_name)
+        error_metric = STAGE_ERRORS.labels(func_name)
+        logger = get_logger("performance")
+        
+        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            logger = get_logger("performance")
-            start_time = datetime.now()
+            start_time = time.perf_counter()
             
             try:
-                result = await func(*args, **kwargs)
-                duration = (datetime.now() - start_time).total_seconds() * 1000
-                logger.debug(f"⚡ Async Performance | {func_name} | {duration:.2f}ms | SUCCESS")
+                with span(func_name):
+                    result = await func(*args, **kwargs)
+                duration = time.perf_counter() - start_time
+                duration_metric.observe(duration)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"⚡ Async Performance | {func_name} | {duration * 1000:.2f}ms | SUCCESS")
                 return result
             except Exception as e:
-                duration = (datetime.now() - start_time).total_seconds() * 1000
-                logger.warning(f"⚡ Async Performance | {func_name} | {duration:.2f}ms | ERROR: {str(e)}")
+                duration = time.perf_counter() - start_time
+                duration_metric.observe(duration)
+                error_metric.inc()
+                logger.warning(f"⚡ Async Performance | {func_name} | {duration * 1000:.2f}ms | ERROR: {str(e)}")
                 raise
         return wrapper
     return decorator
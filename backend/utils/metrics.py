@@ -0,0 +1,333 @@
+# backend/utils/metrics.py
+"""
+In-process metrics registry for Mazungumzo AI
+
+Counters, gauges and log-linear (HDR-style) histograms that render in the
+Prometheus text exposition format. Recording is a few attribute updates, so
+it is cheap enough for hot paths:
+- Resolve labelled children once (`metric.labels(...)`) and keep them
+- Histograms use 8 sub-buckets per power of two, roughly 12% relative
+  precision from 1µs to ~2000s. Observing is a list append; values are
+  bucketed in bulk with NumPy frexp/bincount (NumPy is imported on the
+  first fold, not with this module)
+- Gauges and counters can be backed by a callback that runs only at scrape time
+"""
+
+import math
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histogram layout: values in [2**MIN_EXP, 2**MAX_EXP) seconds
+SUB_BUCKETS = 8
+MIN_EXP = -20  # ~1µs
+MAX_EXP = 11   # ~2048s
+BUCKET_COUNT = (MAX_EXP - MIN_EXP) * SUB_BUCKETS
+# frexp gives value = m * 2**e with m in [0.5, 1): index = e*SUB + ceil(m*2*SUB) - 1 + offset,
+# so a value equal to a bucket's upper bound is counted in that bucket (Prometheus `le`)
+INDEX_OFFSET = -(MIN_EXP + 1) * SUB_BUCKETS - SUB_BUCKETS
+FOLD_SIZE = 4096
+
+
+def _bucket_upper_bound(index: int) -> float:
+    exponent, sub = divmod(index, SUB_BUCKETS)
+    return math.ldexp(0.5 + (sub + 1) / (2 * SUB_BUCKETS), exponent + MIN_EXP + 1)
+
+
+BUCKET_BOUNDS = [_bucket_upper_bound(i) for i in range(BUCKET_COUNT)]
+INF_LABEL = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class _HistogramChild:
+    """
+    Observations are appended to a pending list and folded into bucket
+    counts in bulk with NumPy (at FOLD_SIZE, or when read), which keeps the
+    per-observation cost to a list append.
+    """
+    __slots__ = ("_pending", "_counts", "_sum")
+
+    def __init__(self):
+        self._pending: List[float] = []
+        self._counts = None  # bucket counts, allocated on the first fold; last slot: above the top bound
+        self._sum = 0.0
+
+    def observe(self, value: float):
+        """Record one value (seconds for latency histograms)"""
+        pending = self._pending
+        pending.append(value)
+        if len(pending) >= FOLD_SIZE:
+            self._fold()
+
+    def _fold(self):
+        import numpy as np
+
+        pending, self._pending = self._pending, []
+        if self._counts is None:
+            self._counts = np.zeros(BUCKET_COUNT + 1, np.int64)
+        if not pending:
+            return
+        values = np.asarray(pending, np.float64)
+        self._sum += float(values.sum())
+        mantissa, exponent = np.frexp(values)
+        index = exponent * SUB_BUCKETS + np.ceil(mantissa * (2 * SUB_BUCKETS)).astype(np.int64) - 1 + INDEX_OFFSET
+        index[values <= 0.0] = 0
+        np.clip(index, 0, BUCKET_COUNT, out=index)
+        self._counts += np.bincount(index, minlength=BUCKET_COUNT + 1)
+
+    @property
+    def count(self) -> int:
+        self._fold()
+        return int(self._counts.sum())
+
+    @property
+    def sum(self) -> float:
+        self._fold()
+        return self._sum
+
+    def snapshot(self) -> Tuple["np.ndarray", float]:
+        """(bucket counts, sum) with pending observations folded in"""
+        self._fold()
+        return self._counts.copy(), self._sum
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile, or None when empty"""
+        if self._counts is None and not self._pending:
+            return None
+        import numpy as np
+
+        counts, _ = self.snapshot()
+        cumulative = np.cumsum(counts)
+        total = int(cumulative[-1])
+        if not total:
+            return None
+        index = int(np.searchsorted(cumulative, max(q * total, 1), side="left"))
+        return BUCKET_BOUNDS[index] if index < BUCKET_COUNT else math.inf
+
+
+class _Metric:
+    kind = ""
+    child_class = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 callback: Callable[[], float] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lookup: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames and callback is None:
+            self.labels()  # unlabelled metrics report zero before their first update
+
+    def labels(self, *values):
+        """Child for one label combination; keep the result to avoid repeat lookups"""
+        child = self._lookup.get(values)
+        if child is None:
+            key = tuple(str(value) for value in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self.child_class())
+                # Also index by the raw values (e.g. int status codes) to skip str() next time
+                self._lookup[values] = child
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        if self.callback is not None:
+            return [(self.name, "", float(self.callback()))]
+        return [
+            (self.name, _format_labels(self.labelnames, key), child.value)
+            for key, child in list(self._children.items())
+        ]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+    child_class = _CounterChild
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    child_class = _GaugeChild
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    child_class = _HistogramChild
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def render(self) -> List[str]:
+        import numpy as np
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            counts, total_sum = child.snapshot()
+            used = np.flatnonzero(counts[:BUCKET_COUNT])
+            cumulative = np.cumsum(counts)
+            # Emit every bucket between the lowest and highest ever used, so the
+            # set of `le` series only grows between scrapes
+            if len(used):
+                for index in range(used[0], used[-1] + 1):
+                    le = f'le="{BUCKET_BOUNDS[index]:.6g}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative[index]}")
+            count = int(cumulative[-1])
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, INF_LABEL)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics, created on first use and rendered together"""
+
+    def __init__(self, prefix: str = "mazungumzo_"):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Iterable[str],
+                       callback: Callable[[], float] = None):
+        full_name = self.prefix + name
+        metric = self._metrics.get(full_name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(full_name)
+                if metric is None:
+                    metric = cls(full_name, documentation, labelnames, callback)
+                    self._metrics[full_name] = metric
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {full_name} already registered as {metric.kind}")
+        elif callback is not None:
+            metric.callback = callback
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                callback: Callable[[], float] = None) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames, callback)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+              callback: Callable[[], float] = None) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames, callback)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(self.prefix + name)
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+# Shared metric families fed by the logging helpers and request middleware
+STAGE_DURATION = metrics.histogram("stage_duration_seconds", "Duration of instrumented stages", ["stage"])
+STAGE_ERRORS = metrics.counter("stage_errors_total", "Instrumented stages that raised", ["stage"])
+HTTP_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+AI_DURATION = metrics.histogram(
+    "ai_provider_request_duration_seconds", "AI provider call latency", ["provider", "status"]
+)
+AI_ERRORS = metrics.counter("ai_provider_errors_total", "Failed AI provider calls", ["provider", "status"])
+AI_CANCELLED = metrics.counter(
+    "ai_generations_cancelled_total", "AI provider calls cancelled because the client went away", ["provider"]
+)
+AI_CANCELLED_SECONDS_SAVED = metrics.counter(
+    "ai_cancelled_seconds_saved_total",
+    "Estimated provider seconds saved by cancelling (median call time minus time already spent)",
+    ["provider"]
+)
+AI_EARLY_STOPS = metrics.counter(
+    "ai_early_stops_total", "Streamed replies cut off once they filled the channel budget", ["provider"]
+)
+AI_TURNS_SERVED = metrics.counter("ai_turns_served_total", "Chat replies by the provider that generated them", ["provider"])
+AI_LOCAL_REPLIES = metrics.counter(
+    "ai_local_replies_total", "Replies from the local responder instead of a provider", ["reason"]
+)
+PROMPT_TOKENS = metrics.counter("ai_prompt_tokens_total", "Estimated prompt tokens sent to AI providers", ["provider"])
+PROMPT_TOKENS_SAVED = metrics.counter(
+    "ai_prompt_tokens_saved_total", "Estimated history tokens left out of prompts by the context budget", ["provider"]
+)
+CRISIS_DETECTIONS = metrics.counter("crisis_detections_total", "Messages flagged as a crisis")
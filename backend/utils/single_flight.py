@@ -0,0 +1,131 @@
+# backend/utils/single_flight.py
+"""
+Single-flight cache with stale-while-revalidate
+
+At most one computation per key is in flight; concurrent callers for the
+same key await that computation instead of starting their own. Once an
+entry is older than its TTL it is still served for a stale window while a
+single background refresh runs, so expiry never turns into a burst of
+recomputations (or, for health checks, a burst of live provider calls).
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from .logging_config import get_logger
+from .metrics import metrics
+
+logger = get_logger("single_flight")
+
+REQUESTS = metrics.counter(
+    "single_flight_requests_total",
+    "Single-flight cache lookups by outcome (hit, stale, miss, coalesced)",
+    ["cache", "outcome"]
+)
+COMPUTATIONS = metrics.counter(
+    "single_flight_computations_total", "Computations started by single-flight caches", ["cache", "result"]
+)
+
+
+class SingleFlightCache:
+    """Per-key cache where each key has at most one computation in flight"""
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0.0, max_entries: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+
+        # key -> (value, computed_at)
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._outcomes = {outcome: REQUESTS.labels(name, outcome) for outcome in ("hit", "stale", "miss", "coalesced")}
+        self._computed = COMPUTATIONS.labels(name, "success")
+        self._failed = COMPUTATIONS.labels(name, "error")
+
+    def _start(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """Run compute() once as a task and publish the result into the cache"""
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+
+        async def runner():
+            try:
+                value = await compute()
+            except BaseException as e:
+                self._failed.inc()
+                logger.warning(f"⚠️ {self.name} cache computation for {key!r} failed: {e!r}")
+                future.set_exception(e)
+                future.exception()  # mark retrieved so background refresh failures don't warn
+                if not isinstance(e, Exception):
+                    raise
+            else:
+                self._computed.inc()
+                self._store(key, value)
+                future.set_result(value)
+            finally:
+                self._in_flight.pop(key, None)
+
+        task = asyncio.create_task(runner())
+        self._tasks.add(task)  # keep a reference until it finishes
+        task.add_done_callback(self._tasks.discard)
+        return future
+
+    def _store(self, key: Hashable, value: Any):
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic())
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached value for key, computing it with compute() at most once at a time
+
+        Fresh entries are returned directly. Stale entries are returned while a
+        single background refresh runs; a failed refresh keeps the stale value
+        until the stale window ends. Otherwise the caller awaits the shared
+        computation, and its exception (if any) is raised to every waiter.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, computed_at = entry
+            age = time.monotonic() - computed_at
+            if age < self.ttl:
+                self._outcomes["hit"].inc()
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self._outcomes["stale"].inc()
+                if key not in self._in_flight:
+                    self._start(key, compute)
+                return value
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self._outcomes["coalesced"].inc()
+        else:
+            self._outcomes["miss"].inc()
+            future = self._start(key, compute)
+
+        # Shield so one cancelled caller doesn't cancel the shared computation
+        return await asyncio.shield(future)
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def invalidate(self, key: Hashable = None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "ttl_seconds": self.ttl,
+            "stale_seconds": self.stale_ttl,
+            **{outcome: int(child.value) for outcome, child in self._outcomes.items()},
+        }
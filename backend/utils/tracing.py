@@ -0,0 +1,135 @@
+# backend/utils/tracing.py
+"""
+Request-scoped span tracing for Mazungumzo AI
+
+A Trace is bound to the current request through a contextvar, so spans
+opened anywhere below the request (services, database, AI calls, including
+awaited coroutines) attach to it without passing objects around. Spans
+produce a Server-Timing header and, for sampled requests, one JSON trace
+log line.
+
+When no trace is active, span() returns a shared no-op context manager, so
+instrumented code costs one contextvar lookup.
+"""
+
+import json
+import logging
+import random
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Plain logging (not get_logger) because logging_config imports this module
+trace_logger = logging.getLogger("mazungumzo.trace")
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("mazungumzo_trace", default=None)
+_current_span: ContextVar[int] = ContextVar("mazungumzo_span", default=-1)
+
+
+class Trace:
+    """Spans recorded for one request"""
+
+    __slots__ = ("trace_id", "name", "sampled", "started", "spans")
+
+    def __init__(self, name: str, sampled: bool = False):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        # (name, parent index, start offset seconds, duration seconds or None while open)
+        self.spans: List[list] = []
+
+    def server_timing(self, total_seconds: float = None) -> str:
+        """Server-Timing header value: total duration per span name, in first-seen order"""
+        totals: Dict[str, float] = {}
+        for name, _, _, duration in self.spans:
+            if duration is not None:
+                totals[name] = totals.get(name, 0.0) + duration
+        entries = [f"{_token(name)};dur={seconds * 1000:.1f}" for name, seconds in totals.items()]
+        if total_seconds is not None:
+            entries.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_dict(self, **attributes) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            **attributes,
+            "spans": [
+                {
+                    "name": name,
+                    "parent": parent,
+                    "start_ms": round(start * 1000, 3),
+                    "duration_ms": round(duration * 1000, 3) if duration is not None else None,
+                }
+                for name, parent, start, duration in self.spans
+            ],
+        }
+
+
+def _token(name: str) -> str:
+    """Server-Timing metric names must be HTTP tokens"""
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in name)
+
+
+class _Span:
+    __slots__ = ("trace", "name", "index", "token", "started")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        trace = self.trace
+        self.started = time.perf_counter()
+        self.index = len(trace.spans)
+        trace.spans.append([self.name, _current_span.get(), self.started - trace.started, None])
+        self.token = _current_span.set(self.index)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace.spans[self.index][3] = time.perf_counter() - self.started
+        _current_span.reset(self.token)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str):
+    """Context manager timing a block under the current request's trace (no-op without one)"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def start_trace(name: str, sample_rate: float = 0.0) -> Tuple[Trace, object]:
+    """Bind a new trace to the current context; returns (trace, token for end_trace)"""
+    trace = Trace(name, sampled=sample_rate > 0 and random.random() < sample_rate)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(trace: Trace, token, **attributes) -> float:
+    """Unbind the trace, log it if sampled, and return its total duration in seconds"""
+    total = time.perf_counter() - trace.started
+    _current_trace.reset(token)
+    if trace.sampled:
+        payload = trace.to_dict(duration_ms=round(total * 1000, 3), **attributes)
+        trace_logger.info(json.dumps(payload, separators=(",", ":")))
+    return total
@@ -3,17 +3,22 @@
 Webhook handlers for external services (WhatsApp, etc.)
 """
 
-from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, Request, HTTPException, Depends
 from fastapi.responses import JSONResponse, Response
-from pydantic import BaseModel
-from typing import Optional, Dict
+from pydantic import BaseModel, ValidationError
+from typing import Optional, Dict, TYPE_CHECKING
+from urllib.parse import parse_qsl
 import logging
-from twilio.request_validator import RequestValidator
-from twilio.twiml.messaging_response import MessagingResponse
 
 from utils.config import settings
-from services.json_database import db, add_message, log_crisis
+from services.json_database import add_message, log_crisis
 from services.advanced_features import enhance_ai_response, voice_service
+from services.media_pipeline import MediaPipelineError
+from services.container import container
+
+if TYPE_CHECKING:
+    from twilio.request_validator import RequestValidator
+    from twilio.twiml.messaging_response import MessagingResponse
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -28,66 +33,118 @@ class WhatsAppMessage(BaseModel):
     MediaUrl0: Optional[str] = None
     NumMedia: Optional[int] = 0
 
-# Twilio validator
-validator = RequestValidator(settings.twilio_auth_token)
+# Twilio validator (created on first use so the module imports without Twilio config or the twilio package)
+_validator: Optional["RequestValidator"] = None
+
+def get_twilio_validator() -> "RequestValidator":
+    """Get the shared Twilio request validator"""
+    global _validator
+    if _validator is None:
+        from twilio.request_validator import RequestValidator
+        _validator = RequestValidator(settings.twilio_auth_token or "")
+    return _validator
+
+def twiml_response() -> "MessagingResponse":
+    """Empty TwiML reply (twilio is imported on the first webhook)"""
+    from twilio.twiml.messaging_response import MessagingResponse
+    return MessagingResponse()
+
+def parse_twilio_form(body: bytes) -> Dict[str, str]:
+    """
+    Parse a url-encoded Twilio webhook body into a flat parameter dict
+    
+    Invalid UTF-8 is replaced rather than raised; the signature check then
+    rejects the request with 403 instead of it failing with a 500.
+    """
+    return dict(parse_qsl(body.decode("utf-8", errors="replace"), keep_blank_values=True))
 
-async def validate_twilio_request(request: Request):
-    """Validate incoming Twilio requests"""
+async def ingest_twilio_webhook(request: Request) -> WhatsAppMessage:
+    """
+    Read, verify and parse an incoming Twilio webhook exactly once.
+    
+    The raw body is read a single time, the signature is checked against the
+    parameters parsed from those bytes, and the typed message is cached on
+    ``request.state`` so every downstream consumer reuses the same object.
+    """
+    cached = getattr(request.state, "twilio_message", None)
+    if cached is not None:
+        return cached
+    
     if not settings.has_twilio_config:
         raise HTTPException(status_code=403, detail="Twilio not configured")
     
-    # Get the URL and POST data
-    url = str(request.url)
-    form_data = await request.form()
+    body = await request.body()
+    params = parse_twilio_form(body)
     
-    # Validate the request
-    if not validator.validate(url, form_data, request.headers.get("X-Twilio-Signature", "")):
+    signature = request.headers.get("X-Twilio-Signature", "")
+    if not get_twilio_validator().validate(str(request.url), params, signature):
         raise HTTPException(status_code=403, detail="Invalid Twilio signature")
+    
+    try:
+        message = WhatsAppMessage(**params)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed Twilio payload: {e.error_count()} errors")
+    
+    request.state.twilio_params = params
+    request.state.twilio_message = message
+    return message
 
-@router.post("/webhook/whatsapp")
-async def whatsapp_webhook(request: Request):
-    """Handle incoming WhatsApp messages"""
+async def reply_to_voice_note(media_url: str, user_id: str):
+    """
+    Transcribe a WhatsApp voice note and send the reply as an outbound message
+
+    Runs after the webhook has been acknowledged, so a slow download or a
+    long transcription queue never holds Twilio's request open.
+    """
+    whatsapp = container.whatsapp
     try:
-        # Validate request
-        await validate_twilio_request(request)
+        try:
+            # Download is streamed, transcription runs off the event loop
+            transcription = await voice_service.process_voice_message(media_url, user_id)
+        except MediaPipelineError as e:
+            logger.warning(f"Voice message rejected for {user_id}: {e}")
+            await whatsapp.send_whatsapp_message(
+                user_id,
+                "Pole, sikuweza kusikiliza ujumbe huu wa sauti. Tafadhali andika ujumbe wako. "
+                "(Sorry, I couldn't process that voice note. Please type your message.)"
+            )
+            return
+        
+        # Add transcription to chat
+        await add_message(user_id, "user", transcription, "sw")
         
-        # Parse message
-        form_data = await request.form()
-        message = WhatsAppMessage(**form_data)
+        # Get AI response
+        enhanced = await enhance_ai_response(
+            transcription,
+            user_id,
+            "I understand your voice message. Let's talk about it.",
+            platform="whatsapp"
+        )
         
+        # Convert response to voice
+        voice_url = await voice_service.convert_response_to_voice(
+            enhanced["response"],
+            "sw"
+        )
+        
+        await whatsapp.send_whatsapp_message(user_id, enhanced["response"], media_url=voice_url)
+    except Exception as e:
+        logger.error(f"Voice note reply failed for {user_id}: {str(e)}")
+
+@router.post("/webhook/whatsapp")
+async def whatsapp_webhook(
+    background_tasks: BackgroundTasks,
+    message: WhatsAppMessage = Depends(ingest_twilio_webhook)
+):
+    """Handle incoming WhatsApp messages"""
+    try:
         # Extract user ID from WhatsApp number
         user_id = message.From.replace("whatsapp:", "")
         
-        # Handle voice message
+        # Handle voice message: acknowledge now, reply once transcription is done
         if message.NumMedia and message.MediaUrl0:
-            # Process voice message
-            transcription = await voice_service.process_voice_message(
-                message.MediaUrl0,
-                user_id
-            )
-            
-            # Add transcription to chat
-            await add_message(user_id, "user", transcription, "sw")
-            
-            # Get AI response
-            enhanced = await enhance_ai_response(
-                transcription,
-                user_id,
-                "I understand your voice message. Let's talk about it."
-            )
-            
-            # Convert response to voice
-            voice_url = await voice_service.convert_response_to_voice(
-                enhanced["response"],
-                "sw"
-            )
-            
-            # Create TwiML response
-            response = MessagingResponse()
-            response.message(enhanced["response"])
-            response.message().media(voice_url)
-            
-            return Response(content=str(response), media_type="application/xml")
+            background_tasks.add_task(reply_to_voice_note, message.MediaUrl0, user_id)
+            return Response(content=str(twiml_response()), media_type="application/xml")
         
         # Handle text message
         else:
@@ -98,11 +155,12 @@ async def whatsapp_webhook(request: Request):
             enhanced = await enhance_ai_response(
                 message.Body,
                 user_id,
-                "I understand. Let's talk about it."
+                "I understand. Let's talk about it.",
+                platform="whatsapp"
             )
             
             # Create TwiML response
-            response = MessagingResponse()
+            response = twiml_response()
             response.message(enhanced["response"])
             
             return Response(content=str(response), media_type="application/xml")